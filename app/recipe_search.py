@@ -0,0 +1,185 @@
+"""Full-text recipe search with BM25 ranking.
+
+Every recipe is one document made of its PL/EN names, tags, steps and the
+names of its ingredients' products. Text goes through the same
+normalization as product search (:func:`app.search._normalize`), so
+"zupa grzybowa" also matches "Zupa Grzybową". Fields are weighted by
+repeating their terms: a name hit counts more than a step hit.
+
+The index is kept in sync with the loaded recipe sources (see
+:mod:`app.utils.recipe_views`). On a reload every recipe is fingerprinted
+and only added, changed or removed recipes are re-tokenized.
+"""
+
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .search import _normalize
+
+# term-frequency multiplier per field
+FIELD_WEIGHTS = {"names": 3.0, "tags": 2.0, "ingredients": 2.0, "steps": 1.0}
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+# product id -> product entry (or None)
+ProductLookup = Callable[[Any], Optional[Dict[str, Any]]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the normalized terms of ``text``."""
+    return _TOKEN.findall(_normalize(text))
+
+
+def _product_names(pid: Any, products: ProductLookup) -> List[str]:
+    entry = products(pid)
+    if entry:
+        names = [n for n in (entry.get("names") or {}).values() if n]
+        if names or entry.get("name"):
+            return names or [entry["name"]]
+    # "prod.oyster-mushrooms" -> "oyster-mushrooms"
+    return [str(pid).split(".", 1)[-1]]
+
+
+def _fields(recipe: Dict[str, Any], products: ProductLookup) -> Dict[str, List[str]]:
+    ingredients: List[str] = []
+    for ing in recipe.get("ingredients", []):
+        pid = ing.get("productId")
+        if pid:
+            ingredients.extend(_product_names(pid, products))
+    return {
+        "names": [n for n in (recipe.get("names") or {}).values() if n],
+        "tags": list(recipe.get("tags", [])),
+        "ingredients": ingredients,
+        "steps": list(recipe.get("steps", [])),
+    }
+
+
+def _fingerprint(fields: Dict[str, List[str]]) -> str:
+    return json.dumps(fields, sort_keys=True)
+
+
+class _Doc:
+    __slots__ = ("fingerprint", "terms", "length")
+
+    def __init__(self, fields: Dict[str, List[str]], fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        terms: Counter = Counter()
+        for field, texts in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for text in texts:
+                for term in tokenize(str(text)):
+                    terms[term] += weight
+        self.terms: Dict[str, float] = dict(terms)
+        self.length = sum(terms.values())
+
+
+class RecipeSearchIndex:
+    """Inverted index over recipes ranked with BM25."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._source: Any = None
+        self.docs: Dict[Any, _Doc] = {}
+        # term -> {recipe id: weighted term frequency}
+        self.postings: Dict[str, Dict[Any, float]] = {}
+        self._total_length = 0.0
+        self.version = 0
+
+    def sync(self, source: Any, recipes: Iterable[Dict[str, Any]], products: ProductLookup) -> int:
+        """Index ``recipes`` unless ``source`` is already indexed.
+
+        ``source`` identifies the loaded data (the recipe sources object);
+        ``products`` resolves ingredient product ids. Returns the number of
+        re-indexed recipes.
+        """
+        with self._lock:
+            if source is self._source:
+                return 0
+            seen = set()
+            changed = 0
+            for recipe in recipes:
+                rid = recipe.get("id")
+                if rid is None or rid in seen:
+                    continue
+                seen.add(rid)
+                fields = _fields(recipe, products)
+                fingerprint = _fingerprint(fields)
+                old = self.docs.get(rid)
+                if old is not None and old.fingerprint == fingerprint:
+                    continue
+                if old is not None:
+                    self._remove(rid)
+                self._add(rid, _Doc(fields, fingerprint))
+                changed += 1
+            for rid in [rid for rid in self.docs if rid not in seen]:
+                self._remove(rid)
+                changed += 1
+            self._source = source
+            if changed:
+                self.version += 1
+            return changed
+
+    def _add(self, rid: Any, doc: _Doc) -> None:
+        self.docs[rid] = doc
+        self._total_length += doc.length
+        for term, tf in doc.terms.items():
+            self.postings.setdefault(term, {})[rid] = tf
+
+    def _remove(self, rid: Any) -> None:
+        doc = self.docs.pop(rid)
+        self._total_length -= doc.length
+        for term in doc.terms:
+            posting = self.postings[term]
+            del posting[rid]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query: str) -> List[Tuple[Any, float]]:
+        """Return ``(recipe id, score)`` of matching recipes, best first.
+
+        A recipe matches when it contains any query term; ties are ordered
+        by recipe id.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.docs)
+            if not n or not terms:
+                return []
+            avgdl = self._total_length / n or 1.0
+            scores: Dict[Any, float] = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for rid, tf in posting.items():
+                    norm = K1 * (1 - B + B * self.docs[rid].length / avgdl)
+                    scores[rid] = scores.get(rid, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+        return [(rid, round(score, 6)) for rid, score in ranked]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._source = None
+            self.docs = {}
+            self.postings = {}
+            self._total_length = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recipes": len(self.docs),
+                "terms": len(self.postings),
+                "version": self.version,
+            }
+
+
+RECIPE_SEARCH = RecipeSearchIndex()
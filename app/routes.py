@@ -1,31 +1,60 @@
 import json
 import logging
 import os
+import re
 from datetime import date, datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-from email.utils import parsedate_to_datetime
 from flask import Blueprint, current_app, g, jsonify, render_template, request
 
 from .errors import DomainError, error_response
-
-from .search import search_products
+from .recipe_search import RECIPE_SEARCH
+
+from .search import (
+    SEARCH_CACHE,
+    SEARCH_INDEX,
+    index_stats,
+    search_products_batch,
+    search_products_page,
+)
 from .utils import (
+    DATASETS,
+    SCHEMAS,
     file_lock,
-    file_etag,
-    file_mtime_rfc1123,
     load_json,
     load_json_validated,
     normalize_product,
     normalize_recipe,
+    resolve_alias,
     _safe_float,
     save_json,
+    thaw,
     validate_file,
     validate_items,
     _validate,
     validate_payload,
 )
-from .utils.product_io import load_products_nested, save_products_nested
+from .utils import storage
+from .utils import conditional, product_query
+from .utils.alias_scanner import scan_text
+from .utils.cookable import COOKABLE
+from .utils.dataset_cache import file_signature
+from .utils.history_log import decode_cursor, encode_cursor, history_store
+from .utils.product_io import (
+    deficit,
+    load_products_nested,
+    product_repository,
+    save_products_nested,
+)
+from .utils.recipe_views import (
+    RECIPE_VIEWS,
+    decode_page_cursor,
+    encode_page_cursor,
+    normalize_locale,
+)
+from .utils.response_cache import RESPONSES
+from .utils.shopping_matrix import SHOPPING_MATRICES, stock_map
+from .utils.shopping_plan import SHOPPING_PLANS
 from .utils.logging import log_error_with_trace, log_warning_with_trace
 
 
@@ -56,6 +85,17 @@ PRODUCTS_SCHEMA = os.path.join(SCHEMA_DIR, "product.schema.json")
 RECIPES_SCHEMA = os.path.join(SCHEMA_DIR, "recipe.schema.json")
 UNITS_PATH = os.path.join(DATA_DIR, "units.json")
 HISTORY_PATH = os.path.join(DATA_DIR, "history.json")
+HISTORY_MAX_LIMIT = 500
+COOKABLE_DEFAULT_LIMIT = 20
+PRODUCTS_MAX_LIMIT = 500
+LOW_STOCK_DEFAULT_LIMIT = 50
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+SEARCH_BATCH_MAX_QUERIES = 500
+SEARCH_BATCH_DEFAULT_LIMIT = 5
+OCR_DEFAULT_LIMIT = 5
+# words of a receipt line worth searching on their own (no digits)
+_OCR_WORD = re.compile(r"[^\W\d_]{3,}")
 FAVORITES_PATH = os.path.join(DATA_DIR, "favorites.json")
 SHOPPING_PATH = os.path.join(DATA_DIR, "shopping_list.json")
 
@@ -94,6 +134,13 @@ def _to_base(qty: float, unit: str) -> Tuple[float, str]:
     return converted, base
 
 
+def _product_base(prod: Dict[str, Any]) -> Tuple[float, str]:
+    """Return a product's stock in its base unit."""
+    unit_name = prod.get("unit", "")
+    unit_id = UNIT_NAME_TO_ID.get(unit_name, unit_name)
+    return _to_base(prod.get("quantity", 0), unit_id)
+
+
 def _validate_products_file() -> Tuple[int, List[str]]:
     """Validate the products file against the product schema."""
     data, errors = load_json(
@@ -112,12 +159,15 @@ def _validate_products_file() -> Tuple[int, List[str]]:
 
 def run_initial_validation() -> None:
     """Validate core datasets once on application startup."""
+    SCHEMAS.preload(SCHEMA_DIR)
     count, errors = _validate_products_file()
     for err in errors:
         logger.info("products.json: %s", err)
     count, errors = validate_file(RECIPES_PATH, [], RECIPES_SCHEMA, normalize_recipe)
     for err in errors:
         logger.info("recipes.json: %s", err)
+    for locale, stats in index_stats().items():
+        logger.info("search index %s: %s", locale, stats)
 
 
 def _load_products_compat(context: Dict[str, Any]):
@@ -128,99 +178,32 @@ def _load_products_compat(context: Dict[str, Any]):
         raise ValueError(str(exc))
 
 
-def _load_recipes(locale: str = "pl", context: Optional[Dict[str, Any]] = None):
+def _recipe_view(locale: str = "pl", context: Optional[Dict[str, Any]] = None):
     """Return normalized recipes enriched with display names.
 
     Ingredients keep their identifiers while ``productName`` and ``unitName``
     are resolved for the requested locale. Missing references are kept so the
-    caller can decide how to handle unknown items.
+    caller can decide how to handle unknown items. The enriched view is cached
+    per locale until products, units or recipes change and carries its sort
+    orders (see :mod:`app.utils.recipe_views`).
     """
 
-    try:
-        products_list = load_products_nested(PRODUCTS_PATH)
-    except Exception as exc:  # pragma: no cover - defensive
-        raise ValueError(str(exc))
-
-    products = {p.get("id") or p.get("name"): p for p in products_list}
-    units_list = load_json(UNITS_PATH, [])
-    units = {u.get("id"): u for u in units_list}
-
-    try:
-        recipes, errors = load_json(
-            RECIPES_PATH,
-            [],
-            RECIPES_SCHEMA,
-            normalize_recipe,
-            return_errors=True,
-        )
-    except Exception as exc:  # pragma: no cover - defensive
-        raise ValueError(str(exc))
-    if errors:
+    def _warn(errors: List[str]) -> None:
         log_warning_with_trace("; ".join(errors), context or {})
 
-    result = []
-    for rec in recipes:
-        ing_list = []
-        for ing in rec.get("ingredients", []):
-            pid = ing.get("productId")
-            uid = ing.get("unitId")
-
-            prod = products.get(pid)
-            prod_name = None
-            if prod:
-                prod_name = (
-                    prod.get("names", {}).get(locale)
-                    or prod.get("names", {}).get("en")
-                    or prod.get("id")
-                )
-
-            unit = units.get(uid)
-            unit_name = None
-            if unit:
-                unit_name = (
-                    unit.get("names", {}).get(locale)
-                    or unit.get("names", {}).get("en")
-                    or unit.get("id")
-                )
-
-            ing_list.append(
-                {
-                    "productId": pid,
-                    "productName": prod_name,
-                    "qty": ing.get("qty"),
-                    "unitId": uid,
-                    "unitName": unit_name,
-                    "optional": ing.get("optional", False),
-                    "note": ing.get("note"),
-                }
-            )
-
-        result.append(
-            {
-                "id": rec.get("id"),
-                "names": rec.get("names", {}),
-                "time": rec.get("time"),
-                "servings": rec.get("portions"),
-                "steps": rec.get("steps", []),
-                "ingredients": ing_list,
-                "amount": 0,
-                "threshold": 0,
-                "storage": "pantry",
-                "flags": False,
-            }
-        )
-
-    result.sort(key=lambda r: r.get("names", {}).get("pl", "").lower())
-    if recipes and not result:
+    view = RECIPE_VIEWS.view(
+        locale, (PRODUCTS_PATH, UNITS_PATH, RECIPES_PATH, RECIPES_SCHEMA), _warn
+    )
+    if view.sources.recipes and not view.items:
         log_warning_with_trace("no valid recipes emitted", context or {})
-    return result
+    return view
 
 
 def remove_used_products(used_ingredients):
     """Remove used ingredients from stored products."""
     with file_lock(PRODUCTS_PATH):
-        products = load_products_nested(PRODUCTS_PATH)
-        products = [p for p in products if p.get("name") not in used_ingredients]
+        products = product_repository(PRODUCTS_PATH).snapshot().products()
+        products = [thaw(p) for p in products if p.get("name") not in used_ingredients]
         save_products_nested(PRODUCTS_PATH, products)
 
 
@@ -233,7 +216,6 @@ def _compute_app_version() -> str:
     for root, _, files in os.walk(static_dir):
         for fn in files:
             paths.append(os.path.join(root, fn))
-    paths.extend([PRODUCTS_PATH, RECIPES_PATH])
 
     mtimes: List[str] = []
     for p in paths:
@@ -241,6 +223,12 @@ def _compute_app_version() -> str:
             mtimes.append(str(os.path.getmtime(p)))
         except OSError:  # pragma: no cover - missing file
             continue
+    backend = storage.get_backend()
+    for p in (PRODUCTS_PATH, RECIPES_PATH):
+        try:
+            mtimes.append(str(backend.last_modified(p)))
+        except OSError:  # pragma: no cover - missing dataset
+            continue
     digest = hashlib.sha256("".join(sorted(mtimes)).encode("utf-8")).hexdigest()
     return digest[:8]
 
@@ -275,17 +263,22 @@ def service_worker():
 def ui_strings(lang):
     """Return UI translation strings for a given locale."""
     path = os.path.join(BASE_DIR, "static", "translations", f"{lang}.json")
-    if not os.path.exists(path):
+    sig = file_signature(path)
+    if sig is None:
         return error_response("not found", 404)
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as exc:  # pragma: no cover - defensive
-        trace_id = _log_error(
-            exc, {"endpoint": "/api/ui/<lang>", "lang": lang}
-        )
-        return error_response("Internal Server Error", 500, trace_id)
-    return jsonify(data)
+
+    def build():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as exc:  # pragma: no cover - defensive
+            trace_id = _log_error(
+                exc, {"endpoint": "/api/ui/<lang>", "lang": lang}
+            )
+            return error_response("Internal Server Error", 500, trace_id)
+        return jsonify(data)
+
+    return _cached_json(("ui", lang, sig), build)
 
 
 @bp.route("/api/domain")
@@ -294,85 +287,256 @@ def domain():
 
     context = {"endpoint": "/api/domain", "args": request.args.to_dict()}
     try:
-        products = load_products_nested(PRODUCTS_PATH)
-    except Exception as exc:  # pragma: no cover - defensive
-        trace_id = _log_error(exc, context)
-        return error_response("Internal Server Error", 500, trace_id)
+        key = ("domain", conditional.validators((PRODUCTS_PATH, UNITS_PATH)).etag)
+    except OSError:
+        key = None
 
-    units = load_json(UNITS_PATH, [])
-    categories = sorted(
-        {p.get("category") for p in products if p.get("category")}
-    )
-    first_name = products[0].get("name") if products else None
-    logger.info(
-        "domain products=%d units=%d categories=%d first_product=%s",
-        len(products),
-        len(units),
-        len(categories),
-        first_name,
-    )
-    return jsonify(
-        {"products": products, "units": units, "categories": categories}
-    )
+    def build():
+        try:
+            snap = product_repository(PRODUCTS_PATH).snapshot()
+        except Exception as exc:  # pragma: no cover - defensive
+            trace_id = _log_error(exc, context)
+            return error_response("Internal Server Error", 500, trace_id)
+
+        products = snap.products()
+        units = load_json(UNITS_PATH, [])
+        categories = snap.categories()
+        first_name = products[0].get("name") if products else None
+        logger.info(
+            "domain products=%d units=%d categories=%d first_product=%s",
+            len(products),
+            len(units),
+            len(categories),
+            first_name,
+        )
+        return jsonify(
+            {"products": products, "units": units, "categories": categories}
+        )
+
+    return _cached_json(key, build)
+
+
+def _int_arg(name: str, default: Optional[int], minimum: int) -> Optional[int]:
+    """Return integer query parameter ``name`` or raise ``DomainError``."""
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+    kind = "positive" if minimum > 0 else "non-negative"
+    try:
+        value = int(raw)
+    except ValueError:
+        raise DomainError(f"{name} must be a {kind} integer") from None
+    if value < minimum:
+        raise DomainError(f"{name} must be a {kind} integer")
+    return value
 
 
 @bp.route("/api/search")
 def search():
-    """Search products in the domain using query and locale."""
+    """Search products in the domain using query and locale.
+
+    ``limit`` (default 50, at most 200) and ``offset`` select a page of the
+    ranked matches; the total number of matches is returned in the
+    ``X-Total-Count`` header.
+    """
     query = request.args.get("q", "")
     locale = request.args.get("locale", "pl")
+    limit = min(_int_arg("limit", SEARCH_DEFAULT_LIMIT, 1), SEARCH_MAX_LIMIT)
+    offset = _int_arg("offset", 0, 0)
     try:
-        results = search_products(query, locale)
+        results, total = search_products_page(query, locale, limit, offset)
     except ValueError as exc:
         logger.info(str(exc))
         return error_response(str(exc), 400)
-    return jsonify(results)
+    resp = jsonify(results)
+    resp.headers["X-Total-Count"] = str(total)
+    return resp
+
+
+@bp.route("/api/search/batch", methods=["POST"])
+def search_batch():
+    """Search many queries in one request.
+
+    Body: ``{"queries": [...], "locale": "pl", "limit": 5}``. Returns one
+    ``{"query", "total", "results"}`` object per query, in request order.
+    """
+    payload = request.get_json(silent=True)
+    validate_payload(payload, "search-batch.schema.json")
+    queries = payload["queries"]
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise DomainError(f"at most {SEARCH_BATCH_MAX_QUERIES} queries per batch")
+    limit = payload.get("limit", SEARCH_BATCH_DEFAULT_LIMIT)
+    if limit < 1:
+        raise DomainError("limit must be a positive integer")
+    limit = min(int(limit), SEARCH_MAX_LIMIT)
+    pages = search_products_batch(queries, payload.get("locale", "pl"), limit)
+    return jsonify(
+        [
+            {"query": query, "total": total, "results": results}
+            for query, (results, total) in zip(queries, pages)
+        ]
+    )
+
+
+def _not_modified(current: conditional.Validators):
+    """Return a 304 response if the request's validators still match."""
+    if not conditional.not_modified(
+        current,
+        request.headers.get("If-None-Match"),
+        request.headers.get("If-Modified-Since"),
+    ):
+        return None
+    return _with_validators(current_app.response_class(status=304), current)
+
+
+def _cached_json(key: Optional[Tuple[Any, ...]], build):
+    """Serve the JSON response for ``key`` from :data:`RESPONSES`.
+
+    ``build`` produces the response on a miss; only ``200`` responses are
+    stored. The body is sent in the best encoding the client accepts. A
+    ``None`` key bypasses the cache.
+    """
+    entry = RESPONSES.get(key) if key is not None else None
+    if entry is None:
+        resp = build()
+        if key is None or resp.status_code != 200:
+            return resp
+        headers = [(k, v) for k, v in resp.headers if k != "Content-Length"]
+        entry = RESPONSES.put(key, resp.get_data(), headers)
+    encoding, body = entry.negotiate(request.accept_encodings.quality)
+    RESPONSES.record(encoding)
+    resp = current_app.response_class(body, headers=entry.headers)
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def _with_validators(resp, current: conditional.Validators):
+    resp.headers["ETag"] = current.etag
+    resp.headers["Last-Modified"] = current.last_modified
+    return resp
+
+
+_PRODUCT_QUERY_ARGS = (
+    "storage",
+    "category",
+    "q",
+    "low_stock",
+    "sort_by",
+    "order",
+    "limit",
+    "cursor",
+    "fields",
+)
+
+
+def _list_arg(name: str, prefix: str = "") -> Optional[List[str]]:
+    """Return comma separated query parameter ``name`` as a list."""
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    values = [v.strip() for v in raw.split(",") if v.strip()]
+    if prefix:
+        values = [v if v.startswith(prefix) else prefix + v for v in values]
+    return values
+
+
+def _bool_arg(name: str) -> Optional[bool]:
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    value = raw.strip().lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    raise DomainError(f"{name} must be true or false")
 
 
 @bp.route("/api/products")
 def products():
-    """Return product dataset used by the frontend."""
+    """Return product dataset used by the frontend.
+
+    Optional filters: ``storage`` and ``category`` (comma separated, with or
+    without the ``storage.``/``category.`` prefix), ``q`` (name substring)
+    and ``low_stock`` (``quantity < threshold``). ``sort_by`` is one of
+    ``name``, ``quantity``, ``threshold``, ``storage``, ``category`` or
+    ``status`` with ``order`` ``asc``/``desc``; without it products keep file
+    order. ``limit`` and ``cursor`` page the result, ``fields`` limits the
+    keys of every product. The number of matches is returned in
+    ``X-Total-Count`` and the next cursor in ``X-Next-Cursor``.
+    """
     context = {"endpoint": "/api/products", "args": request.args.to_dict()}
+    limit = _int_arg("limit", None, 1)
+    filters = {
+        "storages": _list_arg("storage", "storage."),
+        "categories": _list_arg("category", "category."),
+        "low_stock": _bool_arg("low_stock"),
+        "q": request.args.get("q") or None,
+        "sort_by": request.args.get("sort_by") or None,
+        "order": request.args.get("order", "asc").lower(),
+        "limit": None if limit is None else min(limit, PRODUCTS_MAX_LIMIT),
+        "cursor": request.args.get("cursor") or None,
+        "fields": _list_arg("fields"),
+    }
     try:
-        products = load_products_nested(PRODUCTS_PATH)
-    except Exception as exc:
-        trace_id = _log_error(exc, context)
-        return error_response("Unable to load product data", 500, trace_id)
-
-    if not products:
-        trace_id = log_error_with_trace("empty product list", context)
-        return error_response("Unable to load product data", 500, trace_id)
-
-    units = load_json(UNITS_PATH, [])
-    categories = sorted({p.get("category") for p in products if p.get("category")})
-
-    etag = file_etag(PRODUCTS_PATH)
-    last_modified = file_mtime_rfc1123(PRODUCTS_PATH)
-    inm = request.headers.get("If-None-Match")
-    ims = request.headers.get("If-Modified-Since")
-    mtime = datetime.fromtimestamp(os.path.getmtime(PRODUCTS_PATH), timezone.utc)
-    mtime = mtime.replace(microsecond=0)
-    if inm == etag:
-        resp = current_app.response_class(status=304)
-        resp.headers["ETag"] = etag
-        resp.headers["Last-Modified"] = last_modified
-        return resp
-    if ims:
+        current = conditional.validators(
+            (PRODUCTS_PATH, UNITS_PATH),
+            [request.args.get(k) for k in _PRODUCT_QUERY_ARGS],
+        )
+    except OSError:
+        current = None  # loading below reports the failure
+    else:
+        cached = _not_modified(current)
+        if cached is not None:
+            return cached
+
+    def build():
         try:
-            since = parsedate_to_datetime(ims)
-            if since >= mtime:
-                resp = current_app.response_class(status=304)
-                resp.headers["ETag"] = etag
-                resp.headers["Last-Modified"] = last_modified
-                return resp
-        except (TypeError, ValueError, OverflowError):
-            pass
+            snap = product_repository(PRODUCTS_PATH).snapshot()
+        except Exception as exc:
+            trace_id = _log_error(exc, context)
+            return error_response("Unable to load product data", 500, trace_id)
+
+        if not len(snap):
+            trace_id = log_error_with_trace("empty product list", context)
+            return error_response("Unable to load product data", 500, trace_id)
+
+        items, total, next_cursor = product_query.query(snap, **filters)
+        units = load_json(UNITS_PATH, [])
+        categories = snap.categories()
+        resp = jsonify({"products": items, "units": units, "categories": categories})
+        resp.headers["X-Total-Count"] = str(total)
+        if next_cursor:
+            resp.headers["X-Next-Cursor"] = next_cursor
+        return resp
+
+    if current is None:
+        return build()
+    resp = _cached_json(("products", current.etag), build)
+    return _with_validators(resp, current) if resp.status_code == 200 else resp
+
+
+@bp.route("/api/products/low-stock")
+def products_low_stock():
+    """Return products with ``quantity < threshold``, largest deficit first.
 
-    resp = jsonify({"products": products, "units": units, "categories": categories})
-    resp.headers["ETag"] = etag
-    resp.headers["Last-Modified"] = last_modified
+    Accepts the ``storage`` and ``category`` filters of ``/api/products``
+    and ``limit`` (default 50). Every product carries its ``deficit``
+    (``threshold - quantity``); the number of matches is returned in
+    ``X-Total-Count``.
+    """
+    limit = min(_int_arg("limit", LOW_STOCK_DEFAULT_LIMIT, 1), PRODUCTS_MAX_LIMIT)
+    snap = product_repository(PRODUCTS_PATH).snapshot()
+    items, total = snap.low_stock(
+        _list_arg("storage", "storage."), _list_arg("category", "category."), limit
+    )
+    resp = jsonify([dict(p, deficit=deficit(p)) for p in items])
+    resp.headers["X-Total-Count"] = str(total)
     return resp
 
+
 @bp.route("/api/units", methods=["GET", "PUT"])
 def units():
     if request.method == "PUT":
@@ -384,118 +548,283 @@ def units():
 
 @bp.route("/api/ocr-match", methods=["POST"])
 def ocr_match():
+    """Match receipt lines to products.
+
+    Body: ``{"items": [line, ...], "locale": "pl", "limit": 5}``. A line that
+    is a known alias (see ``resolve_alias``) matches with score 4; the rest
+    come from the search index (scores 1-3). When the whole line finds fewer
+    than ``limit`` products its words are searched as well, since receipt
+    lines usually carry prices and quantities. Every line gets up to
+    ``limit`` matches with ``productId``, ``score``, ``name``, ``category``
+    and ``storage``.
+    """
     payload = request.json or {}
     items = payload.get("items", [])
-    products = load_products_nested(PRODUCTS_PATH)
+    locale = payload.get("locale", "pl")
+    limit = payload.get("limit", OCR_DEFAULT_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise DomainError("limit must be a positive integer")
+    limit = min(limit, SEARCH_MAX_LIMIT)
+    lines = [str(raw).strip() for raw in items]
+    words = [_OCR_WORD.findall(line) for line in lines]
+    queries = lines + [word for line_words in words for word in line_words]
+    try:
+        pages = search_products_batch(queries, locale, limit)
+    except ValueError as exc:
+        raise DomainError(str(exc)) from None
+    found = dict(zip(queries, (page for page, _ in pages)))
+    products = product_repository(PRODUCTS_PATH).snapshot()
+
     results = []
-    for raw in items:
-        text = str(raw).strip().lower()
-        matches = [p for p in products if text and text in p.get("name", "").lower()]
-        results.append(
-            {
-                "original": raw,
-                "matches": [
-                    {
-                        "name": m.get("name"),
-                        "category": m.get("category"),
-                        "storage": m.get("storage"),
-                    }
-                    for m in matches
-                ],
-            }
-        )
+    for raw, line, line_words in zip(items, lines, words):
+        scored: Dict[str, int] = {}
+        alias_id = resolve_alias(line)
+        if alias_id:
+            scored[alias_id] = 4
+        for query in [line] + line_words:
+            if len(scored) >= limit:
+                break
+            for hit in found[query]:
+                scored.setdefault(hit["productId"], hit["score"])
+        matches = []
+        for pid, score in list(scored.items())[:limit]:
+            product = products.get(pid, {})
+            matches.append(
+                {
+                    "productId": pid,
+                    "score": score,
+                    "name": product.get("name", pid),
+                    "category": product.get("category"),
+                    "storage": product.get("storage"),
+                }
+            )
+        results.append({"original": raw, "matches": matches})
     return jsonify(results)
 
 
+@bp.route("/api/ocr-scan", methods=["POST"])
+def ocr_scan():
+    """Find product names and aliases anywhere in a raw receipt text.
+
+    Body: ``{"text": "..."}``. Returns hits ordered by position, each with
+    ``productId`` and the ``start``/``end`` character offsets and ``text``
+    of the match in the submitted text.
+    """
+    payload = request.get_json(silent=True) or {}
+    text = payload.get("text")
+    if not isinstance(text, str):
+        raise DomainError("text must be a string")
+    return jsonify(scan_text(text, PRODUCTS_PATH))
+
+
+_RECIPE_PAGE_ARGS = ("sort_by", "order", "page", "page_size", "cursor", "q")
+
+
+def _recipe_matches(view, query: str) -> List[Tuple[int, float]]:
+    """Return ``(position in view.items, score)`` of recipes matching ``query``."""
+    sources = view.sources
+    RECIPE_SEARCH.sync(sources, sources.recipes, sources.products.get)
+    rank = view.order(None).rank
+    return [(rank[rid], score) for rid, score in RECIPE_SEARCH.search(query) if rid in rank]
+
+
 @bp.route("/api/recipes")
 def recipes():
-    """Return normalized recipes with resolved display names."""
+    """Return normalized recipes with resolved display names.
+
+    Pages are addressed with ``page``/``page_size`` or with the opaque
+    ``cursor`` returned in ``X-Next-Cursor``; a cursor carries its own sort
+    key and order. With ``q`` only matching recipes are returned, best
+    match first (see :mod:`app.recipe_search`).
+    """
 
     context = {"endpoint": "/api/recipes", "args": request.args.to_dict()}
-    locale = request.args.get("locale", "pl")
+    locale = normalize_locale(request.args.get("locale", "pl"))
     try:
+        # the body depends on all three datasets and on the paging params
+        current = conditional.validators(
+            (RECIPES_PATH, PRODUCTS_PATH, UNITS_PATH),
+            [locale] + [request.args.get(k) for k in _RECIPE_PAGE_ARGS],
+        )
+    except OSError as exc:  # pragma: no cover - defensive
+        trace_id = _log_error(exc, context)
+        return error_response("Internal Server Error", 500, trace_id)
+    cached = _not_modified(current)
+    if cached is not None:
+        return cached
+
+    sort_by = request.args.get("sort_by", "name")
+    order = request.args.get("order", "asc").lower()
+    cursor = request.args.get("cursor")
+    if cursor:
+        # an explicit sort_by/order must be the one the cursor was made for
+        sort_by, order, after_id, after_pos = decode_page_cursor(
+            cursor,
+            request.args.get("sort_by"),
+            request.args["order"].lower() if "order" in request.args else None,
+        )
+    query = request.args.get("q", "").strip()
+
+    def build():
         try:
-            recipes = _load_recipes(locale, context)
+            view = _recipe_view(locale, context)
         except ValueError as exc:  # pragma: no cover - defensive
             trace_id = _log_error(exc, context)
             return error_response("Internal Server Error", 500, trace_id)
 
-        sort_by = request.args.get("sort_by", "name")
-        order = request.args.get("order", "asc").lower()
         page = int(max(1, _safe_float(request.args.get("page", 1), 1)))
         page_size = int(
             max(1, min(200, _safe_float(request.args.get("page_size", 50), 50)))
         )
-
-        if sort_by:
-            def _key(r):
-                if sort_by == "name":
-                    nm = (
-                        r.get("names", {}).get(locale)
-                        or r.get("names", {}).get("en")
-                        or r.get("id")
-                    )
-                    return nm.lower()
-                val = r.get(sort_by)
-                if isinstance(val, str):
-                    return val.lower()
-                return val
-
-            recipes.sort(key=_key)
-            if order == "desc":
-                recipes.reverse()
-
-        total = len(recipes)
-        start = (page - 1) * page_size
-        end = start + page_size
-        items = recipes[start:end]
+        descending = bool(sort_by) and order == "desc"
+        if cursor:
+            # continue after the last item served; fall back to its old
+            # position if that recipe is gone (search results resume at
+            # their offset)
+            start = None if query else view.position_after(sort_by, descending, after_id)
+            if start is None:
+                start = after_pos
+            page = start // page_size + 1
+        else:
+            start = (page - 1) * page_size
+
+        if query:
+            matches = _recipe_matches(view, query)
+            total = len(matches)
+            items = [view.items[pos] for pos, _ in matches[start : start + page_size]]
+        else:
+            total = len(view.items)
+            items = view.page(sort_by, descending, start, page_size)
         first_id = items[0].get("id") if items else None
         logger.info("recipes count=%d first=%s", total, first_id)
 
-        etag = file_etag(RECIPES_PATH)
-        last_modified = file_mtime_rfc1123(RECIPES_PATH)
-        inm = request.headers.get("If-None-Match")
-        ims = request.headers.get("If-Modified-Since")
-        mtime = datetime.fromtimestamp(os.path.getmtime(RECIPES_PATH), timezone.utc)
-        mtime = mtime.replace(microsecond=0)
-        if inm == etag:
-            resp = current_app.response_class(status=304)
-            resp.headers["ETag"] = etag
-            resp.headers["Last-Modified"] = last_modified
-            return resp
-        if ims:
-            try:
-                since = parsedate_to_datetime(ims)
-                if since >= mtime:
-                    resp = current_app.response_class(status=304)
-                    resp.headers["ETag"] = etag
-                    resp.headers["Last-Modified"] = last_modified
-                    return resp
-            except (TypeError, ValueError, OverflowError):
-                pass
         resp = jsonify(
             {"items": items, "page": page, "page_size": page_size, "total": total}
         )
-        resp.headers["ETag"] = etag
-        resp.headers["Last-Modified"] = last_modified
+        if items and start + len(items) < total:
+            resp.headers["X-Next-Cursor"] = encode_page_cursor(
+                sort_by, order, items[-1].get("id"), start + len(items)
+            )
         return resp
+
+    try:
+        # the etag already covers locale and paging params
+        resp = _cached_json(("recipes", current.etag), build)
+        return _with_validators(resp, current) if resp.status_code == 200 else resp
     except Exception as exc:  # pragma: no cover - defensive
         trace_id = _log_error(exc, context)
         return error_response("Internal Server Error", 500, trace_id)
 
 
+@bp.route("/api/recipes/search")
+def recipes_search():
+    """Full-text search over recipe names, tags, steps and ingredients.
+
+    Returns enriched recipes (as in ``/api/recipes``) with their BM25
+    ``score``, best first. ``limit`` (default 50, at most 200) and ``offset``
+    select a page; the number of matches is returned in ``X-Total-Count``.
+    """
+    context = {"endpoint": "/api/recipes/search", "args": request.args.to_dict()}
+    query = request.args.get("q", "").strip()
+    locale = request.args.get("locale", "pl")
+    limit = min(_int_arg("limit", SEARCH_DEFAULT_LIMIT, 1), SEARCH_MAX_LIMIT)
+    offset = _int_arg("offset", 0, 0)
+    try:
+        view = _recipe_view(locale, context)
+    except ValueError as exc:  # pragma: no cover - defensive
+        trace_id = _log_error(exc, context)
+        return error_response("Internal Server Error", 500, trace_id)
+    matches = _recipe_matches(view, query) if query else []
+    resp = jsonify(
+        [dict(view.items[pos], score=score) for pos, score in matches[offset : offset + limit]]
+    )
+    resp.headers["X-Total-Count"] = str(len(matches))
+    return resp
+
+
+@bp.route("/api/recipes/cookable")
+def recipes_cookable():
+    """Return recipes ranked by how many required ingredients are in stock.
+
+    ``servings`` scales every recipe (default: its own portions),
+    ``max_missing`` drops recipes lacking more required ingredients and
+    ``limit`` (default 20) caps the result. Each recipe lists its
+    ``coverage`` and the ``missing`` ingredients with the amount needed and
+    available in base units.
+    """
+    context = {"endpoint": "/api/recipes/cookable", "args": request.args.to_dict()}
+    servings = None
+    raw = request.args.get("servings")
+    if raw is not None:
+        servings = _safe_float(raw, 0)
+        if not 0 < servings < float("inf"):
+            raise DomainError("servings must be a positive number")
+    max_missing = _int_arg("max_missing", None, 0)
+    limit = _int_arg("limit", COOKABLE_DEFAULT_LIMIT, 1)
+    try:
+        recipes = load_json_validated(
+            RECIPES_PATH, RECIPES_SCHEMA, normalize=normalize_recipe
+        )
+    except ValueError as exc:
+        trace_id = _log_error(exc, context)
+        return error_response("Internal Server Error", 500, trace_id)
+    index = COOKABLE.index_for(recipes, _to_base, _product_base)
+    index.update_stock(product_repository(PRODUCTS_PATH).snapshot())
+    return jsonify(index.rank(servings, max_missing, limit))
+
+
+# extended ISO-8601 only: basic ``20240102`` would sort apart from ``2024-01-02``
+_ISO_DATE = re.compile(
+    r"\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}:\d{2})?)?"
+)
+
+
+def _check_iso_date(value: Any) -> None:
+    """Raise ``DomainError`` unless ``value`` is an ISO-8601 date or datetime.
+
+    Only the extended ``YYYY-MM-DD[THH:MM[:SS]]`` form is accepted.
+    """
+    if isinstance(value, str) and _ISO_DATE.fullmatch(value):
+        try:
+            datetime.fromisoformat(value)
+            return
+        except ValueError:
+            pass
+    raise DomainError("date must be an ISO-8601 date (YYYY-MM-DD[THH:MM[:SS]])")
+
+
 @bp.route("/api/history", methods=["GET", "POST"])
 def history():
+    """Append a history entry or return entries ordered by date.
+
+    GET accepts ``from``/``to`` (inclusive ISO dates), ``limit`` and
+    ``cursor``; when more entries remain the next cursor is returned in the
+    ``X-Next-Cursor`` header. POST returns only the stored entry.
+    """
+    store = history_store(HISTORY_PATH)
     if request.method == "POST":
         entry = request.json or {}
         entry.setdefault("date", date.today().isoformat())
-        history = load_json(HISTORY_PATH, [])
-        history.append(entry)
-        save_json(HISTORY_PATH, history)
+        _check_iso_date(entry["date"])
+        store.append(entry)
         if entry.get("used_ingredients"):
             remove_used_products(entry["used_ingredients"])
-        return jsonify(history)
-    return jsonify(load_json(HISTORY_PATH, []))
+        return jsonify(entry)
+
+    limit = _int_arg("limit", None, 1)
+    if limit is not None:
+        limit = min(limit, HISTORY_MAX_LIMIT)
+    cursor = request.args.get("cursor")
+    items, more = store.query(
+        request.args.get("from"),
+        request.args.get("to"),
+        limit,
+        decode_cursor(cursor) if cursor else None,
+    )
+    resp = jsonify(items)
+    if more is not None:
+        resp.headers["X-Next-Cursor"] = encode_cursor(more)
+    return resp
 
 
 @bp.route("/api/favorites", methods=["GET", "PUT"])
@@ -514,62 +843,37 @@ def favorites():
 
 
 def _generate_shopping_list(selection: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return what to buy for ``selection`` after subtracting the stock.
+
+    Quantities are aggregated per product and base unit over the recipe
+    matrix compiled once per recipes version (see
+    :mod:`app.utils.shopping_matrix`).
+    """
+    snap = product_repository(PRODUCTS_PATH).snapshot()
+    return _shopping_matrix().shopping_list(selection, snap, _product_base)
+
+
+def _shopping_matrix():
     recipes = load_json_validated(
         RECIPES_PATH, RECIPES_SCHEMA, normalize=normalize_recipe
     )
-    recipes_map = {r.get("id"): r for r in recipes}
-    aggregate: Dict[Tuple[str, str], float] = {}
-    optional_map: Dict[Tuple[str, str], bool] = {}
-    for sel in selection:
-        rid = sel.get("id")
-        servings = max(0.0, _safe_float(sel.get("servings", 0)))
-        recipe = recipes_map.get(rid)
-        if not recipe:
-            continue
-        scale = servings / (recipe.get("portions") or 1)
-        for ing in recipe.get("ingredients", []):
-            pid = ing.get("productId")
-            unit = ing.get("unitId")
-            qty = ing.get("qty")
-            if not pid or not unit or qty is None:
-                continue
-            qty_scaled = qty * scale
-            qty_base, base_unit = _to_base(qty_scaled, unit)
-            key = (pid, base_unit)
-            aggregate[key] = aggregate.get(key, 0) + qty_base
-            if ing.get("optional"):
-                optional_map[key] = True
-            else:
-                optional_map.setdefault(key, False)
-    try:
-        products = load_products_nested(PRODUCTS_PATH)
-    except ValueError:
-        products = []
-    stock: Dict[Tuple[str, str], float] = {}
-    for prod in products:
-        pid = prod.get("name")
-        unit_name = prod.get("unit", "")
-        unit_id = UNIT_NAME_TO_ID.get(unit_name, unit_name)
-        qty_base, base_unit = _to_base(prod.get("quantity", 0), unit_id)
-        key = (pid, base_unit)
-        stock[key] = stock.get(key, 0) + qty_base
-    items: List[Dict[str, Any]] = []
-    for key, total in aggregate.items():
-        available = stock.get(key, 0)
-        remaining = max(total - available, 0)
-        if remaining <= 0:
-            continue
-        pid, unit = key
-        items.append(
-            {
-                "productId": pid,
-                "unitId": unit,
-                "quantity_to_buy": remaining,
-                "optional": optional_map.get(key, False),
-                "in_cart": False,
-            }
-        )
-    return items
+    return SHOPPING_MATRICES.matrix_for(recipes, _to_base)
+
+
+def _shopping_plan():
+    """Return the plan of the shopping list, its selection stored alongside."""
+    root, _ = os.path.splitext(SHOPPING_PATH)
+    return SHOPPING_PLANS.plan(SHOPPING_PATH, f"{root}_selection.json")
+
+
+def _change_shopping(recipe_id: str, servings: Optional[float], add: bool = False):
+    snap = product_repository(PRODUCTS_PATH).snapshot()
+    items = _shopping_plan().change(
+        _shopping_matrix(), snap, _product_base, recipe_id, servings, add=add
+    )
+    if items is None:
+        return error_response("not found", 404)
+    return jsonify(items)
 
 
 @bp.route("/api/shopping", methods=["GET", "POST"])
@@ -578,17 +882,44 @@ def shopping():
         payload = request.get_json(silent=True)
         validate_payload(payload, "shopping-selection.schema.json")
         selection = payload.get("recipes", [])
-        items = _generate_shopping_list(selection)
+        snap = product_repository(PRODUCTS_PATH).snapshot()
+        matrix = _shopping_matrix()
+        items = matrix.shopping_list(selection, snap, _product_base)
         save_json(SHOPPING_PATH, items)
+        _shopping_plan().reset(matrix, selection, stock_map(snap, _product_base))
         return jsonify(items)
     return jsonify(load_json(SHOPPING_PATH, []))
 
 
+@bp.route("/api/shopping/recipes", methods=["GET", "POST"])
+def shopping_recipes():
+    """Return the selected recipes or add one to the shopping list.
+
+    Only the rows of the added recipe's products change; ``in_cart`` marks
+    are kept. Returns the updated list.
+    """
+    if request.method == "GET":
+        return jsonify(_shopping_plan().selection())
+    payload = request.get_json(silent=True)
+    validate_payload(payload, "shopping-recipe.schema.json")
+    return _change_shopping(payload["id"], payload["servings"], add=True)
+
+
+@bp.route("/api/shopping/recipes/<string:recipe_id>", methods=["PATCH", "DELETE"])
+def shopping_recipe(recipe_id: str):
+    """Change the servings of a selected recipe or remove it from the list."""
+    if request.method == "DELETE":
+        return _change_shopping(recipe_id, None)
+    payload = request.get_json(silent=True)
+    validate_payload(payload, "shopping-servings.schema.json")
+    return _change_shopping(recipe_id, payload["servings"])
+
+
 @bp.route("/api/shopping/<string:product_id>", methods=["PATCH"])
 def shopping_mark(product_id: str):
     payload = request.get_json(silent=True)
     validate_payload(payload, "shopping-mark.schema.json")
-    items = load_json(SHOPPING_PATH, [])
+    items = thaw(load_json(SHOPPING_PATH, []))
     flag = payload.get("inCart")
     updated = False
     for item in items:
@@ -603,18 +934,17 @@ def shopping_mark(product_id: str):
 
 def _update_pantry(items: List[Dict[str, Any]]) -> None:
     with file_lock(PRODUCTS_PATH):
-        try:
-            products = load_products_nested(PRODUCTS_PATH)
-        except ValueError:
-            products = []
+        products = thaw(product_repository(PRODUCTS_PATH).snapshot().products())
+        # products sharing a name collapse into the last one, kept at the
+        # first one's position
         prod_map = {p.get("name"): p for p in products}
         for it in items:
             pid = it.get("productId")
             qty = max(0.0, _safe_float(it.get("quantity_to_buy", 0)))
             unit_id = it.get("unitId")
             unit_name = UNIT_ID_TO_NAME.get(unit_id, unit_id)
-            if pid in prod_map:
-                product = prod_map[pid]
+            product = prod_map.get(pid)
+            if product is not None:
                 prod_unit_id = UNIT_NAME_TO_ID.get(
                     product.get("unit", unit_name), unit_name
                 )
@@ -648,6 +978,12 @@ def shopping_confirm():
         _update_pantry(purchased)
     remaining = [i for i in items if not i.get("in_cart")]
     save_json(SHOPPING_PATH, remaining)
+    if purchased:
+        # rows of products whose stock changed follow the new stock
+        snap = product_repository(PRODUCTS_PATH).snapshot()
+        refreshed = _shopping_plan().refresh(_shopping_matrix(), snap, _product_base)
+        if refreshed is not None:
+            remaining = refreshed
     return jsonify(remaining)
 
 
@@ -672,8 +1008,9 @@ def health_new():
         recipes = load_json_validated(
             RECIPES_PATH, RECIPES_SCHEMA, normalize=normalize_recipe
         )
+        backend = storage.get_backend()
         last_updated_ts = max(
-            os.path.getmtime(PRODUCTS_PATH), os.path.getmtime(RECIPES_PATH)
+            backend.last_modified(PRODUCTS_PATH), backend.last_modified(RECIPES_PATH)
         )
         last_updated = datetime.fromtimestamp(
             last_updated_ts, tz=timezone.utc
@@ -682,9 +1019,19 @@ def health_new():
             {
                 "status": "ok",
                 "schemaVersion": "normalized@1",
+                "storage": backend.name,
                 "productsCount": len(products),
                 "recipesCount": len(recipes),
                 "lastUpdated": last_updated,
+                "searchIndexVersion": SEARCH_INDEX.version,
+                "caches": {
+                    "datasets": DATASETS.stats(),
+                    "schemas": SCHEMAS.stats(),
+                    "search": SEARCH_CACHE.stats(),
+                    "recipeViews": RECIPE_VIEWS.stats(),
+                    "recipeSearch": RECIPE_SEARCH.stats(),
+                    "responses": RESPONSES.stats(),
+                },
             }
         )
     except Exception as exc:  # pragma: no cover - defensive
@@ -700,6 +1047,6 @@ def validate_route():
     summary["products"] = {"count": count, "errors": errors[:5]}
     count, errors = validate_file(RECIPES_PATH, [], RECIPES_SCHEMA, normalize_recipe)
     summary["recipes"] = {"count": count, "errors": errors[:5]}
-    count, errors = validate_file(HISTORY_PATH, [], None)
-    summary["history"] = {"count": count, "errors": errors[:5]}
+    store = history_store(HISTORY_PATH)
+    summary["history"] = {"count": store.count(), "errors": store.errors[:5]}
     return jsonify(summary)
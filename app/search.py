@@ -1,14 +1,23 @@
+import heapq
+import itertools
 import json
 import os
 import re
+import sys
+import threading
 import unicodedata
-from typing import Dict, List
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
 
-from .utils.product_io import load_products_nested
+from .utils.product_io import load_products_nested, on_products_saved
+from .utils.storage import get_backend
 
 # Path to products data
 _DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "products.json")
 
+LOCALES = ("pl", "en")
+
 
 def _strip_diacritics(text: str) -> str:
     """Return text stripped from diacritics."""
@@ -51,79 +60,626 @@ def _distance_leq_one(a: str, b: str) -> bool:
     return prev[-1] <= 1
 
 
-# Build search index at module import time
-_INDEX: Dict[str, List[Dict[str, object]]] = {"pl": [], "en": []}
+def _product_key(prod: Dict[str, Any]) -> str:
+    return prod.get("id") or prod.get("name")
+
+
+def _product_entries(prod: Dict[str, Any]) -> Dict[str, Dict[str, object]]:
+    """Return the per-locale index entries for one product."""
+    aliases = []
+    for alias in prod.get("aliases", []) or []:
+        alias_norm = _normalize(str(alias))
+        if alias_norm:
+            aliases.append(alias_norm)
+    entries: Dict[str, Dict[str, object]] = {}
+    for locale in LOCALES:
+        name = prod.get("names", {}).get(locale) or prod.get("name")
+        if not name:
+            continue
+        name_norm = _normalize(name)
+        tokens = set(name_norm.split())
+        for al in aliases:
+            tokens.update(al.split())
+        strings = [name_norm] + aliases
+        entries[locale] = {
+            "id": _product_key(prod),
+            "tokens": tokens,
+            "strings": strings,
+            "name": name_norm,
+            "owned": prod.get("quantity", 0),
+            "level": prod.get("level"),
+        }
+    return entries
+
+
+def _product_fingerprint(prod: Dict[str, Any]) -> str:
+    """Return a string that changes whenever the product's entries would."""
+    fields = [
+        prod.get("id"),
+        prod.get("name"),
+        prod.get("names"),
+        prod.get("aliases"),
+        prod.get("quantity", 0),
+        prod.get("level"),
+    ]
+    return json.dumps(fields, sort_keys=True, default=str)
+
+
+def _deletions(text: str) -> Set[str]:
+    """Return ``text`` and every string obtained by deleting one character."""
+    return {text} | {text[:i] + text[i + 1 :] for i in range(len(text))}
+
+
+def _grams(text: str) -> Set[str]:
+    """Return all 1-, 2- and 3-character substrings of ``text``."""
+    return {
+        text[i : i + n]
+        for n in (1, 2, 3)
+        for i in range(len(text) - n + 1)
+    }
+
+
+# every built or copied ``_LocaleIndex`` gets a new version number
+_INDEX_VERSIONS = itertools.count(1)
+
+
+class _LocaleIndex:
+    """Lookup structures over one locale's item list.
+
+    ``grams`` maps every 1-3 character substring of an item's strings to the
+    positions of items containing it, so only candidates are checked for the
+    prefix and substring tiers. ``deletes`` maps every string and each of its
+    single-character deletions to ``(item, string)`` positions; two strings
+    within edit distance one always share such a key, so the edit-distance
+    tier only verifies the positions found under the query's own deletions.
+
+    Removed items leave a ``None`` slot behind so other positions stay
+    valid. :meth:`copy` shares all posting sets with the original; a copy
+    duplicates a posting set the first time it modifies it, so the original
+    can keep serving readers unchanged.
+    """
+
+    def __init__(self, items: List[Dict[str, object]]):
+        self.version = next(_INDEX_VERSIONS)
+        self.items: List[Optional[Dict[str, object]]] = []
+        self.size = len(items)
+        self.dead = 0
+        self.grams: Dict[str, Set[int]] = {}
+        self.deletes: Dict[str, Set[Tuple[int, int]]] = {}
+        self._owned: Set[int] = set()
+        for item in items:
+            self.add(item)
+        self.seal()
+
+    def copy(self) -> "_LocaleIndex":
+        clone = _LocaleIndex.__new__(_LocaleIndex)
+        clone.version = next(_INDEX_VERSIONS)
+        clone.items = list(self.items)
+        clone.size = self.size
+        clone.dead = self.dead
+        clone.grams = dict(self.grams)
+        clone.deletes = dict(self.deletes)
+        clone._owned = set()
+        return clone
+
+    def seal(self) -> None:
+        """Stop tracking owned posting sets once the index is published."""
+        self._owned = set()
+
+    def _posting(self, table: Dict[str, set], key: str) -> set:
+        """Return a posting set of ``table`` that this index may modify."""
+        posting = table.get(key)
+        if posting is None:
+            posting = table[key] = set()
+            self._owned.add(id(posting))
+        elif id(posting) not in self._owned:
+            posting = table[key] = set(posting)
+            self._owned.add(id(posting))
+        return posting
+
+    def _drop(self, table: Dict[str, set], key: str, value: Any) -> None:
+        posting = self._posting(table, key)
+        posting.discard(value)
+        if not posting:
+            del table[key]
+            self._owned.discard(id(posting))
+
+    def add(self, item: Dict[str, object]) -> int:
+        """Index ``item`` and return its position."""
+        pos = len(self.items)
+        self.items.append(item)
+        for sidx, text in enumerate(item["strings"]):
+            for gram in _grams(text):
+                self._posting(self.grams, gram).add(pos)
+            for key in _deletions(text):
+                self._posting(self.deletes, key).add((pos, sidx))
+        return pos
+
+    def remove(self, pos: int) -> None:
+        """Remove the item at ``pos`` from every posting set."""
+        item = self.items[pos]
+        if item is None:
+            return
+        for sidx, text in enumerate(item["strings"]):
+            for gram in _grams(text):
+                self._drop(self.grams, gram, pos)
+            for key in _deletions(text):
+                self._drop(self.deletes, key, (pos, sidx))
+        self.items[pos] = None
+        self.dead += 1
+
+    def live_items(self) -> List[Dict[str, object]]:
+        return [item for item in self.items if item is not None]
+
+    def substring_candidates(self, query: str) -> Set[int]:
+        """Return positions of items that may contain ``query``."""
+        keys = [query] if len(query) <= 3 else [
+            query[i : i + 3] for i in range(len(query) - 2)
+        ]
+        postings = []
+        for key in set(keys):
+            posting = self.grams.get(key)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def fuzzy_candidates(self, query: str) -> Set[Tuple[int, int]]:
+        """Return ``(item, string)`` positions possibly within distance one."""
+        found: Set[Tuple[int, int]] = set()
+        for key in _deletions(query):
+            found.update(self.deletes.get(key, ()))
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry counts and an estimate of the index size in bytes."""
+        size = sys.getsizeof(self.grams) + sys.getsizeof(self.deletes)
+        for key, posting in self.grams.items():
+            size += sys.getsizeof(key) + sys.getsizeof(posting)
+        for key, positions in self.deletes.items():
+            size += sys.getsizeof(key) + sys.getsizeof(positions)
+            size += len(positions) * _POSITION_SIZE
+        return {
+            "items": len(self.items) - self.dead,
+            "grams": len(self.grams),
+            "deletes": len(self.deletes),
+            "bytes": size,
+        }
+
+
+# approximate size of one ``(item, string)`` tuple stored in ``deletes``
+_POSITION_SIZE = sys.getsizeof((0, 0))
 
-if os.path.exists(_DATA_PATH):
-    products = load_products_nested(_DATA_PATH)
+
+class _Snapshot:
+    """Immutable state of a :class:`SearchIndex` at one version."""
+
+    __slots__ = ("version", "locales", "products")
+
+    def __init__(
+        self,
+        version: int,
+        locales: Dict[str, _LocaleIndex],
+        products: Dict[str, Tuple[str, List[Dict[str, int]]]],
+    ) -> None:
+        self.version = version
+        self.locales = locales
+        # product key -> (fingerprints, [{locale: position}] per duplicate)
+        self.products = products
+
+
+class SearchIndex(Mapping):
+    """Versioned product search index kept in sync with ``products.json``.
+
+    The index is loaded on first use. Every save of the products file
+    through :func:`save_products_nested` is diffed per product and only
+    added, changed or removed products are re-indexed. Updates are applied
+    to a copy which then replaces the current snapshot in one assignment, so
+    a search always works on a single consistent version.
+
+    As a mapping it returns the live entries of a locale, like the plain
+    ``{locale: [entry, ...]}`` dict it replaces.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._signature: Any = None
+
+    # -- reading ---------------------------------------------------------------
+
+    def snapshot(self) -> _Snapshot:
+        """Return the current snapshot, catching up with the file if needed.
+
+        Changes made without :func:`save_products_nested` (an edited file,
+        an import into SQLite) are noticed through the storage signature
+        and applied as a diff like any other save.
+        """
+        snap = self._snapshot
+        sig = get_backend().signature(self.path)
+        if snap is None or sig != self._signature:
+            products = load_products_nested(self.path)
+            with self._lock:
+                self._apply(products)
+                self._signature = sig
+                snap = self._snapshot
+        return snap
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    def __getitem__(self, locale: str) -> List[Dict[str, object]]:
+        return self.snapshot().locales[locale].live_items()
+
+    def __contains__(self, locale: object) -> bool:
+        return locale in LOCALES
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(LOCALES)
+
+    def __len__(self) -> int:
+        return len(LOCALES)
+
+    # -- writing ---------------------------------------------------------------
+
+    @staticmethod
+    def _build(products: List[Dict[str, Any]], version: int) -> _Snapshot:
+        locales = {locale: _LocaleIndex([]) for locale in LOCALES}
+        snap = _Snapshot(version, locales, {})
+        for key, group in _group_products(products).items():
+            _add_group(snap, key, group)
+        for idx in locales.values():
+            idx.seal()
+        return snap
+
+    def rebuild(self, products: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Re-index everything from ``products`` (or the file) and return the version."""
+        if products is None:
+            products = load_products_nested(self.path)
+        with self._lock:
+            current = self._snapshot
+            version = current.version + 1 if current else 1
+            self._snapshot = self._build(products, version)
+            self._signature = get_backend().signature(self.path)
+            return version
+
+    def apply(self, products: List[Dict[str, Any]]) -> int:
+        """Bring the index in line with ``products`` and return the version.
+
+        Only products whose searchable fields changed are re-indexed; the
+        version is bumped when at least one product was added, changed or
+        removed.
+        """
+        with self._lock:
+            return self._apply(products)
+
+    def _apply(self, products: List[Dict[str, Any]]) -> int:
+        current = self._snapshot
+        if current is None:
+            self._snapshot = self._build(products, 1)
+            return 1
+        groups = _group_products(products)
+        changed = [
+            key
+            for key, group in groups.items()
+            if current.products.get(key, (None,))[0] != _group_fingerprint(group)
+        ]
+        removed = [key for key in current.products if key not in groups]
+        if not changed and not removed:
+            return current.version
+        locales = {loc: idx.copy() for loc, idx in current.locales.items()}
+        snap = _Snapshot(current.version + 1, locales, dict(current.products))
+        for key in changed + removed:
+            _remove_group(snap, key)
+        for key in changed:
+            _add_group(snap, key, groups[key])
+        for idx in locales.values():
+            idx.seal()
+        if any(idx.dead > max(64, len(idx.items) // 2) for idx in locales.values()):
+            snap = self._build(products, snap.version)
+        self._snapshot = snap
+        return snap.version
+
+    def products_saved(self, path: str, products: List[Dict[str, Any]]) -> None:
+        """Listener for :func:`save_products_nested`."""
+        if os.path.abspath(path) != self.path or self._snapshot is None:
+            return
+        with self._lock:
+            self._apply(products)
+            self._signature = get_backend().signature(self.path)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {loc: idx.stats() for loc, idx in self.snapshot().locales.items()}
+
+
+def _group_products(products: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
     for prod in products:
-        aliases = []
-        for alias in prod.get("aliases", []) or []:
-            alias_norm = _normalize(str(alias))
-            if alias_norm:
-                aliases.append(alias_norm)
-        for locale in ("pl", "en"):
-            name = prod.get("names", {}).get(locale) or prod.get("name")
-            if not name:
-                continue
-            name_norm = _normalize(name)
-            tokens = set(name_norm.split())
-            for al in aliases:
-                tokens.update(al.split())
-            strings = [name_norm] + aliases
-            _INDEX[locale].append(
-                {
-                    "id": prod.get("id") or prod.get("name"),
-                    "tokens": tokens,
-                    "strings": strings,
-                    "name": name_norm,
-                    "owned": prod.get("quantity", 0),
-                    "level": prod.get("level"),
-                }
+        groups.setdefault(_product_key(prod), []).append(prod)
+    return groups
+
+
+def _group_fingerprint(group: List[Dict[str, Any]]) -> str:
+    return "\n".join(_product_fingerprint(prod) for prod in group)
+
+
+def _add_group(snap: _Snapshot, key: str, group: List[Dict[str, Any]]) -> None:
+    positions = []
+    for prod in group:
+        placed = {}
+        for locale, entry in _product_entries(prod).items():
+            placed[locale] = snap.locales[locale].add(entry)
+        positions.append(placed)
+    snap.products[key] = (_group_fingerprint(group), positions)
+
+
+def _remove_group(snap: _Snapshot, key: str) -> None:
+    _, positions = snap.products.pop(key, (None, []))
+    for placed in positions:
+        for locale, pos in placed.items():
+            snap.locales[locale].remove(pos)
+
+
+SEARCH_INDEX = SearchIndex(_DATA_PATH)
+on_products_saved(SEARCH_INDEX.products_saved)
+
+# ``{locale: [entry, ...]}`` consulted by :func:`search_products`; a plain
+# dict in that shape may be substituted (tests do so).
+_INDEX: Mapping = SEARCH_INDEX
+
+_AUX: Dict[str, Tuple[List[Dict[str, object]], _LocaleIndex]] = {}
+
+
+def _locale_index(locale: str) -> _LocaleIndex:
+    """Return the lookup index for ``_INDEX[locale]``.
+
+    Plain item lists get an index built on first use and rebuilt if the
+    list is replaced.
+    """
+    if isinstance(_INDEX, SearchIndex):
+        return _INDEX.snapshot().locales[locale]
+    items = _INDEX[locale]
+    cached = _AUX.get(locale)
+    if cached is None or cached[0] is not items or cached[1].size != len(items):
+        cached = (items, _LocaleIndex(items))
+        _AUX[locale] = cached
+    return cached[1]
+
+
+def _match_scores(
+    index: _LocaleIndex, query: str, candidates: Optional[Iterable[int]] = None
+) -> Dict[int, Dict[int, int]]:
+    """Return ``{item position: {string index: score}}`` for ``query``.
+
+    ``candidates`` narrows the prefix and substring tiers to the given
+    positions, which must include every item containing ``query``.
+    """
+    if candidates is None:
+        candidates = index.substring_candidates(query)
+    scores: Dict[int, Dict[int, int]] = {}
+    for pos in candidates:
+        for sidx, text in enumerate(index.items[pos]["strings"]):
+            if text.startswith(query):
+                scores.setdefault(pos, {})[sidx] = 3
+            elif query in text:
+                scores.setdefault(pos, {})[sidx] = 2
+    for pos, sidx in index.fuzzy_candidates(query):
+        item_scores = scores.get(pos)
+        if item_scores and sidx in item_scores:
+            continue
+        if _distance_leq_one(query, index.items[pos]["strings"][sidx]):
+            scores.setdefault(pos, {})[sidx] = 1
+    return scores
+
+
+class _Ranking:
+    """Cached outcome of one query against one index version."""
+
+    __slots__ = ("rows", "contains", "size")
+
+    def __init__(self, rows: Tuple[Tuple[Any, ...], ...], contains: FrozenSet[int]):
+        self.rows = rows
+        # positions of items with a name or alias containing the query
+        self.contains = contains
+        self.size = (
+            sys.getsizeof(rows)
+            + len(rows) * _ROW_SIZE
+            + sys.getsizeof(contains)
+        )
+
+
+# approximate size of one rank tuple including its numbers
+_ROW_SIZE = sys.getsizeof((0,) * 6) + 4 * sys.getsizeof(0.0)
+
+
+class SearchCache:
+    """LRU cache of rankings keyed by ``(normalized query, locale, version)``.
+
+    ``version`` is the ``_LocaleIndex`` version, so entries for an outdated
+    index are never returned and simply age out. On a miss the longest
+    cached prefix of the query supplies the candidates for the prefix and
+    substring tiers: every string containing the query also contains its
+    prefix. Entries are evicted by count and by estimated size in bytes.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, int], _Ranking]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefix_hits = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str, int]) -> Optional[_Ranking]:
+        with self._lock:
+            ranking = self._entries.get(key)
+            if ranking is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ranking
+
+    def prefix(self, key: Tuple[str, str, int]) -> Optional[_Ranking]:
+        """Return the ranking of the longest cached prefix of the query."""
+        query, locale, version = key
+        with self._lock:
+            for end in range(len(query) - 1, 0, -1):
+                ranking = self._entries.get((query[:end], locale, version))
+                if ranking is not None:
+                    self._entries.move_to_end((query[:end], locale, version))
+                    self.prefix_hits += 1
+                    return ranking
+        return None
+
+    def put(self, key: Tuple[str, str, int], ranking: _Ranking) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if ranking.size > self.max_bytes:
+                return
+            self._entries[key] = ranking
+            self._bytes += ranking.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "prefixHits": self.prefix_hits,
+                "evictions": self.evictions,
+            }
+
+
+SEARCH_CACHE = SearchCache()
+
+
+def index_stats() -> Dict[str, Dict[str, int]]:
+    """Return size statistics of the search index for every locale."""
+    return {locale: _locale_index(locale).stats() for locale in _INDEX}
+
+
+def _rank(index: _LocaleIndex, locale: str, query: str) -> _Ranking:
+    """Score ``query`` against ``index``, reusing cached work where possible."""
+    key = (query, locale, index.version)
+    ranking = SEARCH_CACHE.get(key)
+    if ranking is not None:
+        return ranking
+    shorter = SEARCH_CACHE.prefix(key)
+    scores = _match_scores(index, query, shorter.contains if shorter else None)
+    rows = []
+    contains = []
+    for pos, item_scores in scores.items():
+        item = index.items[pos]
+        best = max(item_scores.values())
+        if best > 1:
+            contains.append(pos)
+        rows.append(
+            (
+                -best,
+                -int(item_scores.get(0, 0) == best),
+                -float(item.get("owned", 0)),
+                -_LEVEL_ORDER.get(item.get("level"), 0),
+                item.get("name", ""),
+                item["id"],
             )
+        )
+    ranking = _Ranking(tuple(rows), frozenset(contains))
+    SEARCH_CACHE.put(key, ranking)
+    return ranking
+
 
+def _ranked(query: str, locale: str) -> Tuple[Tuple[Any, ...], ...]:
+    """Return unsorted rank tuples for every product matching ``query``.
 
-def search_products(query: str, locale: str) -> List[Dict[str, object]]:
-    """Search products returning list of {productId, score}."""
+    Tuples order like the result list: by score, name over alias match,
+    owned quantity, spice level, name and finally product id.
+    """
     if locale not in _INDEX:
         raise ValueError("locale must be 'pl' or 'en'")
     norm_query = _normalize(query)
     if not norm_query:
-        return []
-    results: List[Dict[str, object]] = []
-    for item in _INDEX[locale]:
-        best = 0
-        matched_name = False
-        for idx, s in enumerate(item["strings"]):
-            score = 0
-            if s.startswith(norm_query):
-                score = 3
-            elif norm_query in s:
-                score = 2
-            elif _distance_leq_one(norm_query, s):
-                score = 1
-            if score > best or (score == best and idx == 0 and not matched_name):
-                best = score
-                matched_name = idx == 0
-        if best:
-            results.append(
-                {
-                    "productId": item["id"],
-                    "score": best,
-                    "is_name": matched_name,
-                    "owned": item.get("owned", 0),
-                    "level": item.get("level"),
-                    "name": item.get("name", ""),
-                }
-            )
-    results.sort(
-        key=lambda r: (
-            -r["score"],
-            -int(r["is_name"]),
-            -float(r.get("owned", 0)),
-            -_LEVEL_ORDER.get(r.get("level"), 0),
-            r.get("name", ""),
-            r["productId"],
-        )
-    )
-    return [{"productId": r["productId"], "score": r["score"]} for r in results]
+        return ()
+    return _rank(_locale_index(locale), locale, norm_query).rows
+
+
+def _page(
+    rows: Tuple[Tuple[Any, ...], ...], limit: Optional[int], offset: int
+) -> List[Dict[str, object]]:
+    if limit is None:
+        top = sorted(rows)[offset:]
+    else:
+        wanted = offset + limit
+        top = sorted(rows) if wanted >= len(rows) else heapq.nsmallest(wanted, rows)
+        top = top[offset:wanted]
+    return [{"productId": row[5], "score": -row[0]} for row in top]
+
+
+def search_products_page(
+    query: str, locale: str, limit: Optional[int] = None, offset: int = 0
+) -> Tuple[List[Dict[str, object]], int]:
+    """Return one page of :func:`search_products` results and the match count.
+
+    Only the first ``offset + limit`` rows are selected (with a heap), so a
+    short query matching most of the catalog does not sort every match.
+    """
+    rows = _ranked(query, locale)
+    return _page(rows, limit, offset), len(rows)
+
+
+def search_products_batch(
+    queries: List[str], locale: str, limit: Optional[int] = None
+) -> List[Tuple[List[Dict[str, object]], int]]:
+    """Run :func:`search_products_page` for many queries at once.
+
+    Queries are normalized once and identical ones are searched only once,
+    shortest first so longer queries can reuse cached prefixes. All queries
+    see the same index snapshot and result cache; ranking is CPU-bound, so
+    they run one after another. Returns ``(page, total)`` per input query.
+    """
+    if locale not in _INDEX:
+        raise ValueError("locale must be 'pl' or 'en'")
+    index = _locale_index(locale)
+    normalized = [_normalize(q) for q in queries]
+    distinct = sorted({q for q in normalized if q}, key=lambda q: (len(q), q))
+
+    pages = {}
+    for query in distinct:
+        rows = _rank(index, locale, query).rows
+        pages[query] = (_page(rows, limit, 0), len(rows))
+    return [pages.get(query, ([], 0)) for query in normalized]
+
+
+def search_products(
+    query: str, locale: str, limit: Optional[int] = None, offset: int = 0
+) -> List[Dict[str, object]]:
+    """Search products returning list of {productId, score}.
+
+    Scores: 3 for a prefix match, 2 for a substring match and 1 for an edit
+    distance of at most one, taking the best over the product name and its
+    aliases. Only candidates from the n-gram and deletion indexes are checked.
+    """
+    return search_products_page(query, locale, limit, offset)[0]
@@ -55,7 +55,7 @@ export async function handleReceiptUpload(file) {
   try {
     data = await fetchJson("/api/ocr-match", {
       method: "POST",
-      body: { items: lines },
+      body: { items: lines, locale: state.currentLang || "pl" },
     });
   } catch (err) {
     toast.error(t("notify_error_title"), err.message);
@@ -10,14 +10,14 @@ import logging
 import math
 import os
 import threading
-import hashlib
 from datetime import datetime, timezone
 from email.utils import format_datetime
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import jsonschema
-
 from ..errors import DomainError
+from .dataset_cache import DATASETS, file_signature, freeze, thaw
+from .schema_registry import SCHEMAS
+from .storage import get_backend
 
 DEFAULT_UNIT = "szt"
 
@@ -29,6 +29,7 @@ logger = logging.getLogger(__name__)
 _DOMAIN_PRODUCTS: Dict[str, Dict[str, Any]] = {}
 _ALIAS_TO_ID: Dict[str, str] = {}
 _DOMAIN_LOCK = threading.Lock()
+_DOMAIN_LOADED = False
 
 _UNIT_TEXT_MAP = {
     "pcs": DEFAULT_UNIT,
@@ -73,10 +74,11 @@ def _normalize_alias(alias: str) -> str:
 def _load_domain_data() -> None:
     """Load domain products and aliases once into memory."""
 
-    if _DOMAIN_PRODUCTS:
+    global _DOMAIN_LOADED
+    if _DOMAIN_LOADED or _DOMAIN_PRODUCTS:
         return
     with _DOMAIN_LOCK:
-        if _DOMAIN_PRODUCTS:
+        if _DOMAIN_LOADED or _DOMAIN_PRODUCTS:
             return
         from .product_io import load_products_nested
 
@@ -90,12 +92,13 @@ def _load_domain_data() -> None:
             prod_id = prod.get("id") or prod.get("name")
             if not prod_id:
                 continue
-    if "names" not in prod and prod.get("name"):
-        prod["names"] = {"pl": prod["name"], "en": prod["name"]}
-    _DOMAIN_PRODUCTS[prod_id] = prod
-    for alias in prod.get("aliases", []):
-        _ALIAS_TO_ID[_normalize_alias(alias)] = prod_id
-    _ALIAS_TO_ID.setdefault(_normalize_alias(prod_id), prod_id)
+            if "names" not in prod and prod.get("name"):
+                prod["names"] = {"pl": prod["name"], "en": prod["name"]}
+            _DOMAIN_PRODUCTS[prod_id] = prod
+            for alias in prod.get("aliases", []):
+                _ALIAS_TO_ID[_normalize_alias(alias)] = prod_id
+            _ALIAS_TO_ID.setdefault(_normalize_alias(prod_id), prod_id)
+        _DOMAIN_LOADED = True
 
 
 def resolve_alias(alias: str) -> Optional[str]:
@@ -149,17 +152,17 @@ def file_etag(path: str) -> str:
 
     The ETag is stable for a given file content and can be used for HTTP
     caching. The file is read in binary mode to ensure the hash reflects the
-    exact bytes served.
+    exact bytes served. With the SQLite backend the digest covers the
+    dataset version instead.
     """
 
-    with open(path, "rb") as fh:
-        return hashlib.sha256(fh.read()).hexdigest()
+    return get_backend().etag(path)
 
 
 def file_mtime_rfc1123(path: str) -> str:
     """Return the file modification time formatted per RFC1123."""
 
-    ts = os.path.getmtime(path)
+    ts = get_backend().last_modified(path)
     dt = datetime.fromtimestamp(ts, tz=timezone.utc)
     return format_datetime(dt, usegmt=True)
 
@@ -175,15 +178,6 @@ def _safe_float(value: Any, default: float = 0.0) -> float:
         return default
 
 
-def _load_schema(schema_path: str) -> Optional[Dict[str, Any]]:
-    """Load JSON schema from path if it exists."""
-    try:
-        with open(schema_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
-
-
 def _validate(
     data: Any,
     schema_path: Optional[str] = None,
@@ -197,47 +191,41 @@ def _validate(
     backward-compatible coercion of values.
     """
 
-    if schema_path:
-        schema = _load_schema(schema_path)
-    else:
-        schema = None
+    compiled = SCHEMAS.get(schema_path) if schema_path else None
 
     if coerce and isinstance(data, list):
         data = [coerce(d) for d in data]
     elif coerce and data is not None:
         data = coerce(data)
 
-    if not schema:
+    if compiled is None or not compiled.schema:
         return data, []
 
-    validator = jsonschema.Draft7Validator(schema)
-    item_validator = None
-    if schema.get("type") == "array" and "items" in schema:
-        item_validator = jsonschema.Draft7Validator(schema["items"])
+    if compiled.schema.get("type") == "array":
+        check = compiled.item_errors
+    else:
+        check = compiled.errors
     errors: List[str] = []
 
     if isinstance(data, list):
         valid_items = []
         for idx, item in enumerate(data):
-            validator_to_use = item_validator or validator
-            item_errors = sorted(
-                validator_to_use.iter_errors(item), key=lambda e: e.path
-            )
+            item_errors = check(item)
             if item_errors:
-                for err in item_errors:
-                    path = ".".join(str(p) for p in err.path)
+                for err_path, message in item_errors:
+                    path = ".".join(str(p) for p in err_path)
                     errors.append(
-                        f"item {idx}{('.' + path) if path else ''}: {err.message}"
+                        f"item {idx}{('.' + path) if path else ''}: {message}"
                     )
             else:
                 valid_items.append(item)
         return valid_items, errors
 
-    item_errors = sorted(validator.iter_errors(data), key=lambda e: e.path)
+    item_errors = compiled.errors(data)
     if item_errors:
-        for err in item_errors:
-            path = ".".join(str(p) for p in err.path)
-            errors.append(f"{path}: {err.message}")
+        for err_path, message in item_errors:
+            path = ".".join(str(p) for p in err_path)
+            errors.append(f"{path}: {message}")
         return None, errors
 
     return data, []
@@ -259,15 +247,14 @@ def validate_payload(payload: Any, schema_name: str) -> Any:
 
     schema_dir = os.path.join(os.path.dirname(__file__), "..", "schemas")
     schema_path = os.path.join(schema_dir, schema_name)
-    schema = _load_schema(schema_path)
-    if schema is None:
+    compiled = SCHEMAS.get(schema_path)
+    if compiled is None:
         raise DomainError(f"schema {schema_name} not found")
-    validator = jsonschema.Draft7Validator(schema)
-    errors = sorted(validator.iter_errors(payload), key=lambda e: e.path)
+    errors = compiled.errors(payload)
     if errors:
-        err = errors[0]
-        path = ".".join(str(p) for p in err.path) or "(root)"
-        raise DomainError(f"{path}: {err.message}")
+        err_path, message = errors[0]
+        path = ".".join(str(p) for p in err_path) or "(root)"
+        raise DomainError(f"{path}: {message}")
     return payload
 
 
@@ -482,44 +469,60 @@ def load_json_validated(
     *,
     normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
 ) -> List[Dict[str, Any]]:
-    """Load JSON file, normalize entries and validate against schema."""
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    if not isinstance(data, list):
-        raise ValueError(f"{os.path.basename(path)}: root is not an array")
-    schema = _load_schema(schema_path) or {}
-    validator = jsonschema.Draft7Validator(schema.get("items", schema))
-    result: List[Dict[str, Any]] = []
-    for idx, raw in enumerate(data):
-        item = normalize(raw) if normalize else raw
-        errors = sorted(validator.iter_errors(item), key=lambda e: e.path)
-        if errors:
-            err = errors[0]
-            field = ".".join(str(p) for p in err.path) or "(root)"
-            raise ValueError(f"{os.path.basename(path)}[{idx}].{field}: {err.message}")
-        result.append(item)
-    return result
+    """Load JSON file, normalize entries and validate against schema.
+
+    Successful results are cached per file signature and returned as
+    read-only views; validation failures are re-raised on every call.
+    """
+
+    backend = get_backend()
+
+    def _load() -> Tuple[List[Dict[str, Any]], bool]:
+        data = backend.read(path)
+        if not isinstance(data, list):
+            raise ValueError(f"{os.path.basename(path)}: root is not an array")
+        compiled = SCHEMAS.get(schema_path)
+        result: List[Dict[str, Any]] = []
+        for idx, raw in enumerate(data):
+            item = normalize(raw) if normalize else raw
+            if compiled is None:
+                result.append(item)
+                continue
+            errors = compiled.item_errors(item)
+            if errors:
+                err_path, message = errors[0]
+                field = ".".join(str(p) for p in err_path) or "(root)"
+                raise ValueError(
+                    f"{os.path.basename(path)}[{idx}].{field}: {message}"
+                )
+            result.append(item)
+        return result, True
+
+    return DATASETS.get(
+        path,
+        (backend.name, "validated", schema_path, normalize),
+        _load,
+        backend.signature,
+    )
 
 
 def validate_items(items: List[Dict[str, Any]], schema_path: str) -> None:
     """Validate list of items against schema raising ValueError on failure."""
-    schema = _load_schema(schema_path) or {}
-    validator = jsonschema.Draft7Validator(schema.get("items", schema))
+    compiled = SCHEMAS.get(schema_path)
+    if compiled is None:
+        return
     for idx, item in enumerate(items):
-        errors = sorted(validator.iter_errors(item), key=lambda e: e.path)
+        errors = compiled.item_errors(item)
         if errors:
-            err = errors[0]
-            field = ".".join(str(p) for p in err.path) or "(root)"
-            raise ValueError(f"item {idx}.{field}: {err.message}")
+            err_path, message = errors[0]
+            field = ".".join(str(p) for p in err_path) or "(root)"
+            raise ValueError(f"item {idx}.{field}: {message}")
 
 
 def safe_write(path: str, data: Any) -> None:
     """Atomically persist JSON data to path."""
-    tmp = f"{path}.tmp"
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
+    get_backend().write(path, data, atomic=True)
+    DATASETS.invalidate(path)
 
 
 def load_json(
@@ -530,17 +533,31 @@ def load_json(
     *,
     return_errors: bool = False,
 ) -> Any:
-    """Load JSON from path returning default when missing or invalid."""
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = default
-    validated, errors = _validate(data, schema_path, coerce=coerce)
-    for err in errors:
-        logger.info("%s: %s", os.path.basename(path), err)
+    """Load JSON from path returning default when missing or invalid.
+
+    Parsed and validated data is cached per file signature; the returned
+    value is a shared read-only view (see :mod:`app.utils.dataset_cache`).
+    """
+
+    backend = get_backend()
+
+    def _load() -> Tuple[Tuple[Any, Tuple[str, ...]], bool]:
+        try:
+            data = backend.read(path)
+            cacheable = True
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = default
+            cacheable = False
+        validated, errors = _validate(data, schema_path, coerce=coerce)
+        for err in errors:
+            logger.info("%s: %s", os.path.basename(path), err)
+        return (validated, tuple(errors)), cacheable
+
+    validated, errors = DATASETS.get(
+        path, (backend.name, schema_path, coerce), _load, backend.signature
+    )
     if return_errors:
-        return validated if validated is not None else default, errors
+        return validated if validated is not None else default, list(errors)
     return validated if validated is not None else default
 
 
@@ -554,9 +571,8 @@ def save_json(
     validated, errors = _validate(data, schema_path, coerce=coerce)
     for err in errors:
         logger.info("%s: %s", os.path.basename(path), err)
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(validated, f, ensure_ascii=False, indent=2)
+    get_backend().write(path, validated)
+    DATASETS.invalidate(path)
 
 
 def validate_file(
@@ -568,8 +584,7 @@ def validate_file(
     """Validate file returning number of valid entries and list of errors."""
     if schema_path and os.path.basename(schema_path) == "product.schema.json":
         try:
-            with open(path, "r", encoding="utf-8") as fh:
-                raw = json.load(fh)
+            raw = get_backend().read(path)
         except (FileNotFoundError, json.JSONDecodeError):
             raw = default
         if isinstance(raw, list):
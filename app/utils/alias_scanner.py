@@ -0,0 +1,159 @@
+"""Aho–Corasick scanner finding product names and aliases in free text.
+
+Patterns are the product names (``name`` and every ``names`` entry) and
+aliases, normalized with ``_normalize_alias``. A whole OCR blob is scanned
+in one pass over its normalized form; hits carry character offsets into the
+original text. Only hits standing on word boundaries are reported, and when
+hits overlap the leftmost, then longest, one wins.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+from . import _normalize_alias
+from .product_io import load_products_nested
+from .storage import get_backend
+
+
+def build_patterns(products: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Return ``{normalized pattern: product id}`` for ``products``.
+
+    Names take precedence over aliases; the first product claiming a
+    pattern keeps it.
+    """
+    names: Dict[str, str] = {}
+    aliases: Dict[str, str] = {}
+    for prod in products:
+        prod_id = prod.get("id") or prod.get("name")
+        if not prod_id:
+            continue
+        for name in [prod.get("name")] + list((prod.get("names") or {}).values()):
+            if isinstance(name, str) and name.strip():
+                names.setdefault(_normalize_alias(name.strip()), prod_id)
+        for alias in prod.get("aliases") or []:
+            if isinstance(alias, str) and alias.strip():
+                aliases.setdefault(_normalize_alias(alias.strip()), prod_id)
+    aliases.update(names)
+    return aliases
+
+
+def _normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """Normalize ``text`` per character, remembering each source index."""
+    chars: List[str] = []
+    origin: List[int] = []
+    for idx, char in enumerate(text):
+        for norm in _normalize_alias(char):
+            chars.append(norm)
+            origin.append(idx)
+    return "".join(chars), origin
+
+
+class AliasScanner:
+    """Aho–Corasick automaton over a fixed ``{pattern: product id}`` map."""
+
+    def __init__(self, patterns: Dict[str, str]) -> None:
+        self.patterns = dict(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        # per state: (pattern length, product id) for every pattern ending here
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for pattern, prod_id in self.patterns.items():
+            if pattern:
+                self._insert(pattern, prod_id)
+        self._fail = self._link()
+
+    def _insert(self, pattern: str, prod_id: str) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), prod_id))
+
+    def _link(self) -> List[int]:
+        """Compute failure links breadth first, merging output lists."""
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                back = fail[state]
+                while back and char not in self._goto[back]:
+                    back = fail[back]
+                target = self._goto[back].get(char, 0)
+                fail[nxt] = target if target != nxt else 0
+                if self._out[fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[fail[nxt]]
+        return fail
+
+    def scan(self, text: str) -> List[Dict[str, Any]]:
+        """Return product hits in ``text`` ordered by position.
+
+        Each hit is ``{"productId", "start", "end", "text"}`` where
+        ``text[start:end]`` is the matched part of the original text.
+        """
+        norm, origin = _normalize_with_offsets(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found: List[Tuple[int, int, str]] = []
+        state = 0
+        for pos, char in enumerate(norm):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, prod_id in out[state]:
+                start = pos - length + 1
+                if _is_boundary(norm, start - 1) and _is_boundary(norm, pos + 1):
+                    found.append((start, pos + 1, prod_id))
+
+        hits: List[Dict[str, Any]] = []
+        covered = 0
+        for start, end, prod_id in sorted(found, key=lambda h: (h[0], -h[1])):
+            if start < covered:
+                continue
+            covered = end
+            first, last = origin[start], origin[end - 1] + 1
+            hits.append(
+                {"productId": prod_id, "start": first, "end": last, "text": text[first:last]}
+            )
+        return hits
+
+
+def _is_boundary(norm: str, pos: int) -> bool:
+    return pos < 0 or pos >= len(norm) or not norm[pos].isalnum()
+
+
+_SCANNERS: Dict[str, Tuple[Any, AliasScanner]] = {}
+_SCANNERS_LOCK = threading.Lock()
+
+
+def scanner_for(products_path: str) -> AliasScanner:
+    """Return the scanner for ``products_path``.
+
+    The product file is re-read when its storage signature changes, and the
+    automaton is rebuilt only if the resulting patterns differ.
+    """
+    sig = get_backend().signature(products_path)
+    cached = _SCANNERS.get(products_path)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+    with _SCANNERS_LOCK:
+        cached = _SCANNERS.get(products_path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        patterns = build_patterns(load_products_nested(products_path))
+        if cached is not None and cached[1].patterns == patterns:
+            scanner = cached[1]
+        else:
+            scanner = AliasScanner(patterns)
+        _SCANNERS[products_path] = (sig, scanner)
+        return scanner
+
+
+def scan_text(text: str, products_path: str) -> List[Dict[str, Any]]:
+    """Scan ``text`` for products stored at ``products_path``."""
+    return scanner_for(products_path).scan(text)
@@ -0,0 +1,104 @@
+"""HTTP validators for responses built from stored datasets.
+
+Hashing a dataset for its ETag means reading all of it, so digests are
+cached per path and recomputed only when the storage signature (mtime,
+size, inode or SQLite dataset version) changes. A conditional request can
+then be answered before any dataset is parsed.
+
+Responses built from several datasets, or shaped by query parameters, get
+one ETag combining the per-dataset digests with those parameters, and the
+newest modification time as ``Last-Modified``.
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .storage import get_backend
+
+
+class Validators(NamedTuple):
+    etag: str
+    # POSIX timestamp of the newest source
+    modified: float
+
+    @property
+    def last_modified(self) -> str:
+        """``modified`` formatted per RFC 1123."""
+        dt = datetime.fromtimestamp(self.modified, tz=timezone.utc)
+        return format_datetime(dt, usegmt=True)
+
+
+# (backend name, path) -> (signature, digest, modified)
+_DIGESTS: Dict[Tuple[str, str], Tuple[Any, str, float]] = {}
+_LOCK = threading.Lock()
+
+
+def _source(path: str) -> Tuple[str, float]:
+    backend = get_backend()
+    key = (backend.name, path)
+    sig = backend.signature(path)
+    cached = _DIGESTS.get(key)
+    if sig is not None and cached is not None and cached[0] == sig:
+        return cached[1], cached[2]
+    digest, modified = backend.etag(path), backend.last_modified(path)
+    if sig is not None:
+        with _LOCK:
+            _DIGESTS[key] = (sig, digest, modified)
+    return digest, modified
+
+
+def validators(paths: Iterable[str], params: Iterable[Any] = ()) -> Validators:
+    """Return the validators of a response built from ``paths``.
+
+    A single dataset without ``params`` keeps the dataset's own digest as
+    its ETag. Raises ``OSError`` when a dataset cannot be read.
+    """
+    sources = [_source(p) for p in paths]
+    params = tuple(params)
+    if len(sources) == 1 and not params:
+        etag = sources[0][0]
+    else:
+        parts = [digest for digest, _ in sources] + [repr(params)]
+        etag = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+    return Validators(etag, max(modified for _, modified in sources))
+
+
+def _etags(header: str) -> Iterable[str]:
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        yield tag.strip('"')
+
+
+def not_modified(
+    current: Validators,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+) -> bool:
+    """Return whether the request headers still match ``current``.
+
+    ``If-Modified-Since`` is only consulted without ``If-None-Match``
+    (RFC 9110, section 13.1.3).
+    """
+    if if_none_match:
+        return any(tag in ("*", current.etag) for tag in _etags(if_none_match))
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, OverflowError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = datetime.fromtimestamp(current.modified, timezone.utc)
+        return since >= modified.replace(microsecond=0)
+    return False
+
+
+def clear() -> None:
+    """Forget cached digests."""
+    with _LOCK:
+        _DIGESTS.clear()
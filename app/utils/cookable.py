@@ -0,0 +1,196 @@
+"""Rank recipes by how much of their ingredient list is in stock.
+
+A :class:`CookableIndex` is built once per loaded recipe set. For each
+recipe it keeps the required amounts per portion, keyed by
+``(productId, base unit)`` and summed over duplicates. As in the shopping
+list, optional ingredients and ones without a unit or quantity are left
+out. It also keeps an inverted index from product id to the recipes that
+need it.
+
+Stock is read from a :class:`~app.utils.product_io.ProductSnapshot`. When
+the snapshot changes, only products whose name bucket changed are looked up
+again, and only recipes using those products are re-counted. Counts are
+cached per servings value.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .product_io import ProductSnapshot
+
+# (qty, unit id) -> (qty in base unit, base unit id)
+ToBase = Callable[[float, str], Tuple[float, str]]
+# product -> (stock in base unit, base unit id)
+ProductBase = Callable[[Dict[str, Any]], Tuple[float, str]]
+
+# servings values whose counts are kept
+_SCALES_KEPT = 8
+_EPSILON = 1e-9
+
+
+class CookableIndex:
+    """Coverage counts of recipes against the current stock."""
+
+    def __init__(
+        self, recipes: Iterable[Dict[str, Any]], to_base: ToBase, product_base: ProductBase
+    ) -> None:
+        self.recipes = list(recipes)
+        self._product_base = product_base
+        # per recipe: {(productId, base unit): qty per portion}
+        self.needs: List[Dict[Tuple[str, str], float]] = []
+        self.by_product: Dict[str, Set[int]] = {}
+        for idx, recipe in enumerate(self.recipes):
+            portions = recipe.get("portions") or 1
+            needs: Dict[Tuple[str, str], float] = {}
+            for ing in recipe.get("ingredients", []):
+                pid, unit, qty = ing.get("productId"), ing.get("unitId"), ing.get("qty")
+                if not pid or not unit or qty is None or ing.get("optional"):
+                    continue
+                qty, base = to_base(qty, unit)
+                key = (pid, base)
+                needs[key] = needs.get(key, 0.0) + qty / portions
+                self.by_product.setdefault(pid, set()).add(idx)
+            self.needs.append(needs)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ProductSnapshot] = None
+        # productId -> {base unit: qty in stock}
+        self._stock: Dict[str, Dict[str, float]] = {}
+        # servings (None: each recipe's own portions) -> satisfied counts
+        self._counts: "OrderedDict[Optional[float], List[int]]" = OrderedDict()
+
+    # -- stock -----------------------------------------------------------------
+
+    def update_stock(self, snap: ProductSnapshot) -> Set[int]:
+        """Catch up with ``snap``; return the indexes of re-counted recipes."""
+        with self._lock:
+            old = self._snapshot
+            if old is snap:
+                return set()
+            if old is None:
+                changed: Iterable[str] = self.by_product
+            else:
+                # unchanged name buckets are shared between snapshots
+                changed = [
+                    pid
+                    for pid in self.by_product
+                    if snap.by_name.get(pid) is not old.by_name.get(pid)
+                ]
+            affected: Set[int] = set()
+            for pid in changed:
+                stock: Dict[str, float] = {}
+                for prod in snap.with_name(pid):
+                    qty, unit = self._product_base(prod)
+                    stock[unit] = stock.get(unit, 0.0) + qty
+                if stock != self._stock.get(pid, {}):
+                    self._stock[pid] = stock
+                    affected |= self.by_product[pid]
+            self._snapshot = snap
+            for servings, counts in self._counts.items():
+                for idx in affected:
+                    counts[idx] = self._satisfied(idx, servings)
+            return affected
+
+    def _scale(self, idx: int, servings: Optional[float]) -> float:
+        return servings if servings is not None else (self.recipes[idx].get("portions") or 1)
+
+    def _has(self, key: Tuple[str, str], qty: float) -> bool:
+        pid, unit = key
+        return self._stock.get(pid, {}).get(unit, 0.0) + _EPSILON >= qty
+
+    def _satisfied(self, idx: int, servings: Optional[float]) -> int:
+        scale = self._scale(idx, servings)
+        return sum(1 for key, qty in self.needs[idx].items() if self._has(key, qty * scale))
+
+    def _counts_for(self, servings: Optional[float]) -> List[int]:
+        counts = self._counts.get(servings)
+        if counts is None:
+            counts = [self._satisfied(idx, servings) for idx in range(len(self.recipes))]
+            self._counts[servings] = counts
+            while len(self._counts) > _SCALES_KEPT:
+                self._counts.popitem(last=False)
+        else:
+            self._counts.move_to_end(servings)
+        return counts
+
+    # -- queries ---------------------------------------------------------------
+
+    def rank(
+        self,
+        servings: Optional[float] = None,
+        max_missing: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return recipes ordered by coverage, best first.
+
+        ``servings`` scales every recipe to that many portions (default:
+        each recipe's own). Recipes missing more than ``max_missing``
+        required ingredients are left out. Each result lists what is
+        missing and how much of it is in stock.
+        """
+        with self._lock:
+            counts = self._counts_for(servings)
+            rows = []
+            for idx, satisfied in enumerate(counts):
+                required = len(self.needs[idx])
+                missing = required - satisfied
+                if max_missing is not None and missing > max_missing:
+                    continue
+                coverage = satisfied / required if required else 1.0
+                rows.append((-coverage, missing, str(self.recipes[idx].get("id")), idx))
+            rows.sort()
+            if limit is not None:
+                rows = rows[:limit]
+            return [self._result(idx, servings, -neg_cov) for neg_cov, _, _, idx in rows]
+
+    def _result(self, idx: int, servings: Optional[float], coverage: float) -> Dict[str, Any]:
+        recipe = self.recipes[idx]
+        scale = self._scale(idx, servings)
+        missing = []
+        for key, qty in self.needs[idx].items():
+            if self._has(key, qty * scale):
+                continue
+            pid, unit = key
+            missing.append(
+                {
+                    "productId": pid,
+                    "unitId": unit,
+                    "needed": round(qty * scale, 6),
+                    "available": round(self._stock.get(pid, {}).get(unit, 0.0), 6),
+                }
+            )
+        return {
+            "id": recipe.get("id"),
+            "names": recipe.get("names", {}),
+            "servings": scale,
+            "coverage": round(coverage, 4),
+            "required": len(self.needs[idx]),
+            "missing": missing,
+        }
+
+
+class CookableCache:
+    """One :class:`CookableIndex` per loaded recipe list."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._source: Any = None
+        self._index: Optional[CookableIndex] = None
+
+    def index_for(
+        self, recipes: List[Dict[str, Any]], to_base: ToBase, product_base: ProductBase
+    ) -> CookableIndex:
+        """Return the index of ``recipes``, rebuilt when a new list is passed."""
+        with self._lock:
+            if self._index is None or self._source is not recipes:
+                self._index = CookableIndex(recipes, to_base, product_base)
+                self._source = recipes
+            return self._index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._source = None
+            self._index = None
+
+
+COOKABLE = CookableCache()
@@ -0,0 +1,149 @@
+"""In-process cache for parsed and validated JSON datasets.
+
+Entries are keyed on the file path plus the loader options and are only
+reused while the file signature ``(mtime_ns, size, inode)`` is unchanged.
+Cached values are frozen so every caller shares the same read-only view;
+callers that need to mutate data must copy it first (``thaw`` does a deep
+copy into plain containers).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FileSignature = Tuple[int, int, int]
+
+
+def file_signature(path: str) -> Optional[FileSignature]:
+    """Return ``(mtime_ns, size, inode)`` for ``path`` or ``None`` if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_only(*_args, **_kwargs):
+    raise TypeError("cached dataset views are read-only")
+
+
+class FrozenDict(dict):
+    """``dict`` subclass rejecting mutation; serializes like a plain dict."""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # copy/deepcopy/pickle produce plain, mutable dicts
+        return (dict, (dict(self),))
+
+
+class FrozenList(list):
+    """``list`` subclass rejecting mutation; serializes like a plain list."""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Return a recursively read-only view of JSON-like ``value``."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    if isinstance(value, tuple):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Return a deep, mutable copy of a (possibly frozen) JSON-like value."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    return value
+
+
+class DatasetCache:
+    """Bounded cache of frozen dataset values keyed on file signatures."""
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Hashable, Any]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(
+        self,
+        path: str,
+        variant: Hashable,
+        loader: Callable[[], Tuple[Any, bool]],
+        signature: Callable[[str], Optional[Hashable]] = file_signature,
+    ) -> Any:
+        """Return the cached value for ``path``/``variant`` or load it.
+
+        ``loader`` returns ``(value, cacheable)``; values are frozen before
+        being stored. ``signature`` versions the underlying data (file stat
+        by default); data without a signature is never cached.
+        """
+        key = (os.path.abspath(path), variant)
+        sig = signature(path)
+        if sig is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == sig:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+        value, cacheable = loader()
+        with self._lock:
+            self.misses += 1
+            if sig is None or not cacheable:
+                return value
+            value = freeze(value)
+            self._entries[key] = (sig, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, path: str) -> None:
+        """Drop every cached variant of ``path``."""
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == abs_path]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared process-wide cache used by ``load_json`` and friends
+DATASETS = DatasetCache()
@@ -0,0 +1,313 @@
+"""Append-only history log with a date index and paginated reads.
+
+The JSON backend stores history as ``history.jsonl`` (one entry per line)
+plus a sidecar ``history.jsonl.idx`` holding ``date<TAB>offset<TAB>length``
+for every line. Appends write one line to each file; reads seek straight to
+the requested entries. With the SQLite backend the indexed ``history`` table
+is used instead.
+
+Entries are returned ordered by ``(date, append order)``. Paging uses an
+opaque cursor naming the last entry already returned.
+"""
+
+import base64
+import bisect
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..errors import DomainError
+from .dataset_cache import file_signature
+from .storage import SqliteBackend, get_backend
+
+# (date, position) where position is the byte offset (JSON) or row seq (SQLite)
+HistoryKey = Tuple[str, int]
+
+
+def encode_cursor(key: HistoryKey) -> str:
+    raw = f"{key[0]}|{key[1]}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> HistoryKey:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date, pos = base64.urlsafe_b64decode(padded).decode("utf-8").rsplit("|", 1)
+        return date, int(pos)
+    except (ValueError, UnicodeDecodeError):
+        raise DomainError("invalid cursor") from None
+
+
+def _entry_date(entry: Any) -> str:
+    date = entry.get("date") if isinstance(entry, dict) else None
+    if not isinstance(date, str) or any(c in date for c in "\t\r\n"):
+        # the sidecar index is tab and newline separated
+        return ""
+    return date
+
+
+def _date_limit(date_to: str) -> str:
+    """Return the smallest key after every date starting with ``date_to``.
+
+    ``to`` is inclusive of the whole day (or minute, ...) it names, so
+    ``2024-01-02T10:00:00`` is within ``to=2024-01-02``.
+    """
+    return date_to + "\U0010ffff"
+
+
+def _encode_line(entry: Any) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class HistoryLog:
+    """JSONL history log with a sidecar date -> offset index."""
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None) -> None:
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._keys: List[HistoryKey] = []
+        self._lengths: Dict[int, int] = {}
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self.errors: List[str] = []
+
+    # -- index maintenance ---------------------------------------------------
+
+    def _ensure(self) -> None:
+        """Load (or recover) the in-memory index if the log changed on disk."""
+        if not os.path.exists(self.path) and self.legacy_path:
+            migrate_json_array(self.legacy_path, self.path)
+        sig = file_signature(self.path)
+        if sig is not None and sig == self._signature:
+            return
+        keys: List[HistoryKey] = []
+        lengths: Dict[int, int] = {}
+        end = 0
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue
+                    offset, length = int(parts[1]), int(parts[2])
+                    keys.append((parts[0], offset))
+                    lengths[offset] = length
+                    end = max(end, offset + length)
+        except FileNotFoundError:
+            pass
+        size = sig[1] if sig else 0
+        if end > size:  # index ahead of a truncated log: rebuild it
+            keys, lengths, end = [], {}, 0
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+        if end < size:
+            self._recover(end, keys, lengths)
+        keys.sort()
+        self._keys, self._lengths = keys, lengths
+        self._signature = file_signature(self.path)
+
+    def _recover(self, start: int, keys: List[HistoryKey], lengths: Dict[int, int]) -> None:
+        """Index log lines written after ``start`` that the sidecar lacks."""
+        added = []
+        with open(self.path, "rb") as fh:
+            fh.seek(start)
+            offset = start
+            for raw in fh:
+                length = len(raw)
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    self.errors.append(f"{os.path.basename(self.path)}@{offset}: invalid line")
+                else:
+                    keys.append((_entry_date(entry), offset))
+                    lengths[offset] = length
+                    added.append(f"{_entry_date(entry)}\t{offset}\t{length}\n")
+                offset += length
+        if added:
+            with open(self.index_path, "a", encoding="utf-8") as fh:
+                fh.writelines(added)
+
+    # -- public API ----------------------------------------------------------
+
+    def append(self, entry: Dict[str, Any]) -> HistoryKey:
+        """Append ``entry`` in O(1) and return its index key."""
+        line = _encode_line(entry)
+        date = _entry_date(entry)
+        with self._lock:
+            self._ensure()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as fh:
+                offset = fh.tell()
+                fh.write(line)
+            with open(self.index_path, "a", encoding="utf-8") as fh:
+                fh.write(f"{date}\t{offset}\t{len(line)}\n")
+            key = (date, offset)
+            bisect.insort(self._keys, key)
+            self._lengths[offset] = len(line)
+            self._signature = file_signature(self.path)
+        return key
+
+    def count(self) -> int:
+        with self._lock:
+            self._ensure()
+            return len(self._keys)
+
+    def query(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[HistoryKey] = None,
+    ) -> Tuple[List[Any], Optional[HistoryKey]]:
+        """Return entries in ``[date_from, date_to]`` after ``after``.
+
+        Returns the page and the key of its last entry when more remain.
+        """
+        with self._lock:
+            self._ensure()
+            keys = self._keys
+            lo = 0
+            if date_from:
+                lo = bisect.bisect_left(keys, (date_from, -1))
+            if after is not None:
+                lo = max(lo, bisect.bisect_right(keys, after))
+            hi = len(keys)
+            if date_to:
+                hi = bisect.bisect_left(keys, (_date_limit(date_to), -1))
+            stop = hi if limit is None else min(hi, lo + limit)
+            page = keys[lo:stop]
+            items = []
+            if page:
+                with open(self.path, "rb") as fh:
+                    for _, offset in page:
+                        fh.seek(offset)
+                        items.append(json.loads(fh.read(self._lengths[offset])))
+        more = page[-1] if page and stop < hi else None
+        return items, more
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite the log ordered by date, dropping unreadable lines."""
+        with self._lock:
+            self._ensure()
+            entries, _ = self.query()
+            tmp_log, tmp_idx = f"{self.path}.tmp", f"{self.index_path}.tmp"
+            offset = 0
+            with open(tmp_log, "wb") as log, open(tmp_idx, "w", encoding="utf-8") as idx:
+                for entry in entries:
+                    line = _encode_line(entry)
+                    log.write(line)
+                    idx.write(f"{_entry_date(entry)}\t{offset}\t{len(line)}\n")
+                    offset += len(line)
+            dropped = len(self.errors)
+            os.replace(tmp_idx, self.index_path)
+            os.replace(tmp_log, self.path)
+            self._signature = None
+            self.errors = []
+            self._ensure()
+            return {"entries": len(entries), "dropped": dropped, "bytes": offset}
+
+
+class SqliteHistory:
+    """History stored in the SQLite backend's date-indexed ``history`` table."""
+
+    def __init__(self, path: str, backend: SqliteBackend) -> None:
+        self.path = path
+        self.backend = backend
+        self.errors: List[str] = []
+
+    def append(self, entry: Dict[str, Any]) -> HistoryKey:
+        seq = self.backend.append(self.path, entry)
+        return (_entry_date(entry), seq)
+
+    def count(self) -> int:
+        conn = self.backend.connect(self.path)
+        return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def query(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[HistoryKey] = None,
+    ) -> Tuple[List[Any], Optional[HistoryKey]]:
+        clauses, params = [], []
+        if date_from:
+            clauses.append("COALESCE(date, '') >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("COALESCE(date, '') < ?")
+            params.append(_date_limit(date_to))
+        if after is not None:
+            clauses.append("(COALESCE(date, '') > ? OR (COALESCE(date, '') = ? AND seq > ?))")
+            params.extend([after[0], after[0], after[1]])
+        sql = "SELECT COALESCE(date, ''), seq, doc FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY COALESCE(date, ''), seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self.backend.connect(self.path).execute(sql, params).fetchall()
+        more = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            more = (rows[-1][0], rows[-1][1])
+        return [json.loads(r[2]) for r in rows], more
+
+    def compact(self) -> Dict[str, int]:
+        conn = self.backend.connect(self.path)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"entries": self.count(), "dropped": 0, "bytes": 0}
+
+
+_LOGS: Dict[str, HistoryLog] = {}
+_LOGS_LOCK = threading.Lock()
+
+
+def history_store(json_path: str):
+    """Return the history store for the active backend.
+
+    ``json_path`` is the legacy ``history.json`` location; the JSON backend
+    keeps its log next to it as ``history.jsonl`` and migrates the legacy
+    array on first use.
+    """
+    backend = get_backend()
+    if isinstance(backend, SqliteBackend):
+        return SqliteHistory(json_path, backend)
+    log_path = os.path.splitext(os.path.abspath(json_path))[0] + ".jsonl"
+    with _LOGS_LOCK:
+        log = _LOGS.get(log_path)
+        if log is None:
+            log = _LOGS[log_path] = HistoryLog(log_path, legacy_path=json_path)
+    return log
+
+
+def migrate_json_array(json_path: str, log_path: str) -> int:
+    """Convert a legacy ``history.json`` array into a JSONL log.
+
+    Returns the number of migrated entries; an existing log is left intact.
+    """
+    if os.path.exists(log_path):
+        return 0
+    try:
+        with open(json_path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = []
+    if not isinstance(data, list):
+        data = []
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    tmp_log, tmp_idx = f"{log_path}.tmp", f"{log_path}.idx.tmp"
+    offset = 0
+    with open(tmp_log, "wb") as log, open(tmp_idx, "w", encoding="utf-8") as idx:
+        for entry in data:
+            line = _encode_line(entry)
+            log.write(line)
+            idx.write(f"{_entry_date(entry)}\t{offset}\t{len(line)}\n")
+            offset += len(line)
+    os.replace(tmp_idx, f"{log_path}.idx")
+    os.replace(tmp_log, log_path)
+    return len(data)
+
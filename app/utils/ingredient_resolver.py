@@ -0,0 +1,280 @@
+"""Resolve free-text ingredient notes into product, quantity and unit ids.
+
+Notes look like ``"product.sour_cream_18 2.0 lyzka"``: a product token, a
+quantity and a unit token. Product tokens are looked up in an alias table
+built from the products file and the product ids already used by recipes,
+then through ``resolve_alias``. Unit tokens are looked up in a table built
+from ``units.json``. Both tables are built once per run, and
+each distinct note is resolved once. Large corpora are spread over a
+process pool.
+
+``resolve_unresolved`` produces a reviewable patch (one entry per note)
+and resolution statistics; ``apply_patch`` writes reviewed entries back
+into recipes.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import _normalize_alias, _normalize_unit, resolve_alias
+
+# distinct notes from which resolution runs in worker processes
+PARALLEL_MIN = 2000
+_CHUNK_SIZE = 256
+
+_FRACTION = re.compile(r"^(\d+)/(\d+)$")
+
+# ``(aliases, units)``: normalized token -> product id / unit id
+Tables = Tuple[Dict[str, str], Dict[str, str]]
+
+
+def parse_quantity(token: str) -> Optional[float]:
+    """Return the number written as ``token`` (``2``, ``2,5``, ``1/2``, ``½``)."""
+    token = token.strip()
+    if not token:
+        return None
+    match = _FRACTION.match(token)
+    if match:
+        denominator = int(match.group(2))
+        return int(match.group(1)) / denominator if denominator else None
+    if len(token) == 1:
+        try:
+            return float(unicodedata.numeric(token))
+        except (TypeError, ValueError):
+            return None
+    try:
+        value = float(token.replace(",", "."))
+    except ValueError:
+        return None
+    # ``nan``/``inf`` parse as floats but are words, not quantities
+    return value if math.isfinite(value) else None
+
+
+def parse_note(note: str) -> Tuple[str, Optional[float], str]:
+    """Split ``note`` into ``(product token, quantity, unit token)``.
+
+    The first numeric token is the quantity. Text before it is the product
+    and text after it the unit; a note starting with the quantity reads
+    ``qty unit product``.
+    """
+    tokens = str(note).split()
+    for idx, token in enumerate(tokens):
+        qty = parse_quantity(token)
+        if qty is None:
+            continue
+        if idx == 0:
+            unit = tokens[1] if len(tokens) > 1 else ""
+            return " ".join(tokens[2:]), qty, unit
+        return " ".join(tokens[:idx]), qty, " ".join(tokens[idx + 1 :])
+    return " ".join(tokens), None, ""
+
+
+def _product_keys(token: str) -> List[str]:
+    """Return lookup keys for a product token, most literal first."""
+    norm = _normalize_alias(token.strip())
+    keys = [norm]
+    if norm.startswith("product."):
+        keys.append("prod." + norm[len("product.") :].replace("_", "-"))
+    keys.append(norm.replace("_", "-"))
+    return keys
+
+
+def build_tables(
+    products: Iterable[Dict[str, Any]],
+    units: Iterable[Dict[str, Any]],
+    recipes: Iterable[Dict[str, Any]] = (),
+) -> Tables:
+    """Return the product alias and unit lookup tables."""
+    aliases: Dict[str, str] = {}
+    for recipe in recipes:
+        for ing in recipe.get("ingredients", []) or []:
+            pid = ing.get("productId") if isinstance(ing, dict) else None
+            if isinstance(pid, str) and pid:
+                aliases.setdefault(_normalize_alias(pid), pid)
+    for prod in products:
+        pid = prod.get("id") or prod.get("name")
+        if not pid:
+            continue
+        texts = [pid, prod.get("name")] + list((prod.get("names") or {}).values())
+        texts += list(prod.get("aliases") or [])
+        for text in texts:
+            if isinstance(text, str) and text.strip():
+                aliases[_normalize_alias(text.strip())] = pid
+
+    unit_table: Dict[str, str] = {}
+    for unit in units:
+        uid = unit.get("id")
+        if not isinstance(uid, str) or not uid:
+            continue
+        texts = [uid, uid[len("unit.") :] if uid.startswith("unit.") else uid]
+        texts += list((unit.get("names") or {}).values())
+        for text in texts:
+            if isinstance(text, str) and text.strip():
+                unit_table.setdefault(_normalize_alias(text.strip()), uid)
+    return aliases, unit_table
+
+
+def resolve_note(note: str, tables: Tables) -> Dict[str, Any]:
+    """Resolve one note, returning the parsed fields and what is missing."""
+    aliases, units = tables
+    product_token, qty, unit_token = parse_note(note)
+    product_id = None
+    for key in _product_keys(product_token):
+        product_id = aliases.get(key) or resolve_alias(key)
+        if product_id:
+            break
+    unit_id = None
+    if unit_token:
+        unit_id = units.get(_normalize_alias(unit_token))
+        if unit_id is None:
+            unit_id = units.get(_normalize_alias(_normalize_unit(unit_token) or ""))
+    missing = [
+        field
+        for field, value in (("productId", product_id), ("qty", qty), ("unitId", unit_id))
+        if value is None
+    ]
+    return {
+        "productId": product_id,
+        "qty": qty,
+        "unitId": unit_id,
+        "productToken": product_token,
+        "unitToken": unit_token,
+        "missing": missing,
+    }
+
+
+_WORKER_TABLES: Optional[Tables] = None
+
+
+def _init_worker(tables: Tables) -> None:
+    global _WORKER_TABLES
+    _WORKER_TABLES = tables
+
+
+def _resolve_in_worker(note: str) -> Dict[str, Any]:
+    return resolve_note(note, _WORKER_TABLES)
+
+
+def resolve_notes(
+    notes: Iterable[str], tables: Tables, workers: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Resolve every distinct note, returning ``{note: resolution}``.
+
+    With ``PARALLEL_MIN`` or more distinct notes the work goes to a process
+    pool (``workers`` processes; ``0`` forces a single process).
+    """
+    distinct = list(dict.fromkeys(str(n) for n in notes))
+    if workers != 0 and len(distinct) >= PARALLEL_MIN:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(tables,)
+        ) as pool:
+            resolved = pool.map(_resolve_in_worker, distinct, chunksize=_CHUNK_SIZE)
+            return dict(zip(distinct, resolved))
+    return {note: resolve_note(note, tables) for note in distinct}
+
+
+def _ingredient_positions(recipes: Iterable[Dict[str, Any]]) -> Dict[Tuple[Any, str], List[int]]:
+    """Return ``{(recipe id, note): [ingredient index, ...]}`` for notes."""
+    positions: Dict[Tuple[Any, str], List[int]] = {}
+    for recipe in recipes:
+        for idx, ing in enumerate(recipe.get("ingredients", []) or []):
+            if isinstance(ing, dict) and ing.get("note") is not None:
+                positions.setdefault((recipe.get("id"), str(ing["note"])), []).append(idx)
+    return positions
+
+
+def resolve_unresolved(
+    entries: List[Dict[str, Any]],
+    tables: Tables,
+    recipes: Iterable[Dict[str, Any]] = (),
+    workers: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Resolve ``recipes_unresolved.json`` entries into a patch and stats.
+
+    Every patch entry names the recipe, the matching ingredient index in
+    ``recipes`` (``None`` if not found) and the resolved fields. Entries
+    whose ``missing`` list is empty are fully resolved.
+    """
+    resolved = resolve_notes((e.get("note", "") for e in entries), tables, workers)
+    positions = _ingredient_positions(recipes)
+    seen: Counter = Counter()
+    patch: List[Dict[str, Any]] = []
+    for entry in entries:
+        note = str(entry.get("note", ""))
+        key = (entry.get("recipeId"), note)
+        found = positions.get(key, [])
+        index = found[seen[key]] if seen[key] < len(found) else None
+        seen[key] += 1
+        result = resolved[note]
+        patch.append(
+            {
+                "recipeId": entry.get("recipeId"),
+                "ingredient": index,
+                "note": note,
+                "productId": result["productId"],
+                "qty": result["qty"],
+                "unitId": result["unitId"],
+                "missing": result["missing"],
+            }
+        )
+    return patch, _stats(patch, resolved)
+
+
+def _stats(patch: List[Dict[str, Any]], resolved: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    total = len(patch)
+    counts = {
+        "resolved": sum(1 for p in patch if not p["missing"]),
+        "productResolved": sum(1 for p in patch if p["productId"] is not None),
+        "qtyParsed": sum(1 for p in patch if p["qty"] is not None),
+        "unitResolved": sum(1 for p in patch if p["unitId"] is not None),
+    }
+    unknown_units: Counter = Counter()
+    unknown_products: Counter = Counter()
+    for p in patch:
+        result = resolved[p["note"]]
+        if p["unitId"] is None and result["unitToken"]:
+            unknown_units[result["unitToken"]] += 1
+        if p["productId"] is None and result["productToken"]:
+            unknown_products[result["productToken"]] += 1
+    stats: Dict[str, Any] = {"notes": total, "distinctNotes": len(resolved)}
+    stats.update(counts)
+    stats["resolutionRate"] = round(counts["resolved"] / total, 4) if total else 0.0
+    stats["unknownUnits"] = dict(unknown_units.most_common())
+    stats["unknownProducts"] = dict(unknown_products.most_common())
+    return stats
+
+
+def apply_patch(recipes: List[Dict[str, Any]], patch: Iterable[Dict[str, Any]]) -> int:
+    """Write resolved fields from ``patch`` into ``recipes`` in place.
+
+    Only fields that were resolved are set; the ``unresolved`` flag is
+    dropped once nothing is missing. Returns the number of updated
+    ingredients.
+    """
+    by_id = {r.get("id"): r for r in recipes}
+    updated = 0
+    for entry in patch:
+        recipe = by_id.get(entry.get("recipeId"))
+        index = entry.get("ingredient")
+        if recipe is None or index is None:
+            continue
+        ingredients = recipe.get("ingredients", [])
+        if not 0 <= index < len(ingredients) or not isinstance(ingredients[index], dict):
+            continue
+        ing = ingredients[index]
+        if str(ing.get("note")) != entry.get("note"):
+            continue
+        changed = False
+        for field in ("productId", "qty", "unitId"):
+            value = entry.get(field)
+            if value is not None and ing.get(field) != value:
+                ing[field] = value
+                changed = True
+        if not entry.get("missing") and ing.pop("unresolved", None) is not None:
+            changed = True
+        updated += changed
+    return updated
@@ -1,13 +1,28 @@
+import bisect
+import heapq
 import os
 import json
+import threading
 from collections import defaultdict
-from typing import Any, Dict, List
+from itertools import count, islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 from . import load_json, save_json
+from .dataset_cache import freeze
+from .storage import get_backend
 
 # Path to the product schema relative to this module
 _SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "schemas", "product.schema.json")
 
+# Callbacks run as ``listener(path, products)`` after every successful save
+_SAVE_LISTENERS: List[Callable[[str, List[Dict[str, Any]]], None]] = []
+
+
+def on_products_saved(listener: Callable[[str, List[Dict[str, Any]]], None]):
+    """Register ``listener`` to receive the flat product list after each save."""
+    _SAVE_LISTENERS.append(listener)
+    return listener
+
 
 def load_products_nested(path: str) -> List[Dict[str, Any]]:
     """Load products from ``path`` in nested form and flatten them.
@@ -62,3 +77,337 @@ def save_products_nested(path: str, products: List[Dict[str, Any]]) -> None:
         for storage, categories in nested.items()
     }
     save_json(path, data, _SCHEMA_PATH)
+    # what load_products_nested will return, in the same order
+    saved = [
+        dict(item, storage=storage, category=category)
+        for storage, categories in data.items()
+        for category, items in categories.items()
+        for item in items
+    ]
+    for listener in _SAVE_LISTENERS:
+        listener(path, saved)
+
+
+# --- repository -----------------------------------------------------------------
+
+
+def product_key(product: Dict[str, Any]) -> Any:
+    """Return the key identifying ``product`` (its ``id`` or else ``name``)."""
+    return product.get("id") or product.get("name")
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_low_stock(product: Dict[str, Any]) -> bool:
+    """Return whether ``product`` is below its restock threshold."""
+    return _number(product.get("quantity")) < _number(product.get("threshold"))
+
+
+def deficit(product: Dict[str, Any]) -> float:
+    """Return how far ``product`` is below its threshold (``threshold - quantity``)."""
+    return _number(product.get("threshold")) - _number(product.get("quantity"))
+
+
+def _fingerprint(product: Dict[str, Any]) -> str:
+    return json.dumps(product, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _add(index: Dict[Any, Set[int]], key: Any, entry: int) -> None:
+    index.setdefault(key, set()).add(entry)
+
+
+def _discard(index: Dict[Any, Set[int]], key: Any, entry: int) -> None:
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.discard(entry)
+        if not bucket:
+            del index[key]
+
+
+class ProductSnapshot:
+    """Immutable view of the products of one file with secondary indexes.
+
+    Every product is stored once as a frozen dict under an entry number;
+    ``order`` lists the entries in file order. The indexes map a product
+    key (``id`` or ``name``), name, storage, category or tag to sets of
+    entries, and ``low`` holds the low-stock entries. ``deficits`` keeps the
+    low-stock entries ranked by deficit (largest first), overall (key
+    ``None``) and per ``("storage", value)`` and ``("category", value)``.
+    Snapshots are never modified; :meth:`updated` derives the next one,
+    re-indexing only the products that changed.
+    """
+
+    _entry_ids = count(1)
+
+    def __init__(self, version: int) -> None:
+        self.version = version
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self.fingerprints: Dict[int, str] = {}
+        self.order: Tuple[int, ...] = ()
+        # product key -> entries in file order
+        self.by_key: Dict[Any, Tuple[int, ...]] = {}
+        self.by_name: Dict[str, Set[int]] = {}
+        self.by_storage: Dict[str, Set[int]] = {}
+        self.by_category: Dict[str, Set[int]] = {}
+        self.by_tag: Dict[str, Set[int]] = {}
+        self.low: Set[int] = set()
+        # sorted (-deficit, folded name, entry) tuples
+        self.deficits: Dict[Any, List[Tuple[float, str, int]]] = {}
+        # derived data (positions, sort orders) cached by readers
+        self.derived: Dict[Any, Any] = {}
+
+    @classmethod
+    def of(cls, products: Iterable[Dict[str, Any]]) -> "ProductSnapshot":
+        """Return a snapshot holding ``products``."""
+        return cls(0).updated(products)
+
+    # -- reading ---------------------------------------------------------------
+
+    def products(self) -> List[Dict[str, Any]]:
+        """Return all products (frozen) in file order."""
+        return [self.entries[e] for e in self.order]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the first product with ``key`` as its id or name."""
+        entries = self.by_key.get(key)
+        return self.entries[entries[0]] if entries else default
+
+    def with_name(self, name: str) -> List[Dict[str, Any]]:
+        """Return the products named ``name`` in file order."""
+        return [self.entries[e] for e in self.sorted_entries(self.by_name.get(name, ()))]
+
+    def positions(self) -> Dict[int, int]:
+        """Return ``{entry: position in file order}``."""
+        pos = self.derived.get("positions")
+        if pos is None:
+            pos = self.derived["positions"] = {e: i for i, e in enumerate(self.order)}
+        return pos
+
+    def sorted_entries(self, entries: Iterable[int]) -> List[int]:
+        """Return ``entries`` in file order."""
+        return sorted(entries, key=self.positions().__getitem__)
+
+    def categories(self) -> List[str]:
+        return sorted(c for c in self.by_category if c)
+
+    def low_stock(
+        self,
+        storages: Optional[Iterable[str]] = None,
+        categories: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Return ``(products, total)`` of low-stock products by deficit.
+
+        Products with the largest ``threshold - quantity`` come first (ties
+        by name). Filters read the per-storage or per-category rankings, so
+        a page costs about ``limit`` steps whatever the number of products;
+        only combined storage and category filters check each candidate.
+        """
+        storages = None if storages is None else set(storages)
+        categories = None if categories is None else set(categories)
+        lists = [self.deficits.get(None, [])]
+        check: Optional[Tuple[str, Set[str]]] = None
+        if storages is not None or categories is not None:
+            by_storage = [self.deficits.get(("storage", s), []) for s in storages or ()]
+            by_category = [self.deficits.get(("category", c), []) for c in categories or ()]
+            if categories is None or (
+                storages is not None
+                and sum(map(len, by_storage)) <= sum(map(len, by_category))
+            ):
+                lists = by_storage
+                check = ("category", categories) if categories is not None else None
+            else:
+                lists = by_category
+                check = ("storage", storages) if storages is not None else None
+        ranked: Iterable[Tuple[float, str, int]] = (
+            lists[0] if len(lists) == 1 else heapq.merge(*lists)
+        )
+        if check is None:
+            total = sum(map(len, lists))
+        else:
+            field, allowed = check
+            ranked = [r for r in ranked if self.entries[r[2]].get(field) in allowed]
+            total = len(ranked)
+        picked = islice(ranked, limit) if limit is not None else ranked
+        return [self.entries[r[2]] for r in picked], total
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    # -- writing ---------------------------------------------------------------
+
+    def updated(self, products: Iterable[Dict[str, Any]]) -> "ProductSnapshot":
+        """Return the snapshot for ``products`` (the complete new list).
+
+        Products whose key group is unchanged keep their entries; the
+        others are removed from and re-added to the indexes. Returns
+        ``self`` when nothing changed.
+        """
+        products = list(products)
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for prod in products:
+            groups.setdefault(product_key(prod), []).append(prod)
+        changed = [
+            key
+            for key, group in groups.items()
+            if [self.fingerprints[e] for e in self.by_key.get(key, ())]
+            != [_fingerprint(p) for p in group]
+        ]
+        removed = [key for key in self.by_key if key not in groups]
+        old_order = [product_key(self.entries[e]) for e in self.order]
+        if not changed and not removed and old_order == [product_key(p) for p in products]:
+            return self
+
+        snap = ProductSnapshot(self.version + 1)
+        snap.entries = dict(self.entries)
+        snap.fingerprints = dict(self.fingerprints)
+        snap.by_key = dict(self.by_key)
+        # copy-on-write: the buckets touched below are copied first
+        for name in ("by_name", "by_storage", "by_category", "by_tag"):
+            setattr(snap, name, dict(getattr(self, name)))
+        snap.low = set(self.low)
+        snap.deficits = dict(self.deficits)
+        touched: Set[Tuple[str, Any]] = set()
+        for key in changed + removed:
+            for entry in self.by_key.get(key, ()):
+                snap._unindex(entry, touched)
+            snap.by_key.pop(key, None)
+        for key in changed:
+            snap.by_key[key] = tuple(snap._index(prod, touched) for prod in groups[key])
+
+        # entries in the order of ``products``
+        seen: Dict[Any, int] = {}
+        order = []
+        for prod in products:
+            key = product_key(prod)
+            idx = seen.get(key, 0)
+            seen[key] = idx + 1
+            order.append(snap.by_key[key][idx])
+        snap.order = tuple(order)
+        return snap
+
+    def _bucket(self, name: str, key: Any, touched: Set[Tuple[str, Any]]) -> Dict[Any, Set[int]]:
+        index = getattr(self, name)
+        if (name, key) not in touched:
+            touched.add((name, key))
+            if key in index:
+                index[key] = set(index[key])
+        return index
+
+    def _index(self, prod: Dict[str, Any], touched: Set[Tuple[str, Any]]) -> int:
+        entry = next(self._entry_ids)
+        self.entries[entry] = freeze(dict(prod))
+        self.fingerprints[entry] = _fingerprint(prod)
+        for name, value in self._keys(prod):
+            _add(self._bucket(name, value, touched), value, entry)
+        if is_low_stock(prod):
+            self.low.add(entry)
+            rank = (-deficit(prod), str(prod.get("name") or "").casefold(), entry)
+            for key in self._ranking_keys(prod):
+                bisect.insort(self._ranking(key, touched), rank)
+        return entry
+
+    def _unindex(self, entry: int, touched: Set[Tuple[str, Any]]) -> None:
+        prod = self.entries.pop(entry)
+        self.fingerprints.pop(entry)
+        for name, value in self._keys(prod):
+            _discard(self._bucket(name, value, touched), value, entry)
+        if entry in self.low:
+            self.low.discard(entry)
+            rank = (-deficit(prod), str(prod.get("name") or "").casefold(), entry)
+            for key in self._ranking_keys(prod):
+                ranking = self._ranking(key, touched)
+                del ranking[bisect.bisect_left(ranking, rank)]
+                if not ranking:
+                    del self.deficits[key]
+
+    def _ranking(self, key: Any, touched: Set[Tuple[str, Any]]) -> List[Tuple[float, str, int]]:
+        if ("deficits", key) not in touched:
+            touched.add(("deficits", key))
+            self.deficits[key] = list(self.deficits.get(key, ()))
+        return self.deficits.setdefault(key, [])
+
+    @staticmethod
+    def _ranking_keys(prod: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (None, ("storage", prod.get("storage")), ("category", prod.get("category")))
+
+    @staticmethod
+    def _keys(prod: Dict[str, Any]) -> Iterable[Tuple[str, Any]]:
+        yield "by_name", prod.get("name")
+        yield "by_storage", prod.get("storage")
+        yield "by_category", prod.get("category")
+        for tag in set(prod.get("tags") or ()):
+            yield "by_tag", tag
+
+
+class ProductRepository:
+    """Shared, indexed products of one file.
+
+    Saves through :func:`save_products_nested` update the indexes in place
+    of a reload; other changes (an edited file, an import into SQLite) are
+    noticed through the storage signature and applied the same way.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._snapshot = ProductSnapshot(0)
+        self._signature: Any = None
+        self._loaded = False
+
+    def snapshot(self) -> ProductSnapshot:
+        """Return the current snapshot, catching up with the file if needed."""
+        sig = get_backend().signature(self.path)
+        if not self._loaded or sig != self._signature:
+            products = load_products_nested(self.path)
+            with self._lock:
+                self._snapshot = self._snapshot.updated(products)
+                # an empty list may be a failed read; try again next time
+                self._loaded = bool(products)
+                self._signature = sig
+        return self._snapshot
+
+    def products_saved(self, path: str, products: List[Dict[str, Any]]) -> None:
+        """Listener for :func:`save_products_nested`."""
+        if os.path.abspath(path) != self.path or not self._loaded:
+            return
+        with self._lock:
+            self._snapshot = self._snapshot.updated(products)
+            self._signature = get_backend().signature(self.path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = ProductSnapshot(0)
+            self._loaded = False
+
+
+_REPOSITORIES: Dict[str, ProductRepository] = {}
+_REPOSITORIES_LOCK = threading.Lock()
+
+
+def product_repository(path: str) -> ProductRepository:
+    """Return the shared repository for the products file at ``path``."""
+    key = os.path.abspath(path)
+    repo = _REPOSITORIES.get(key)
+    if repo is None:
+        with _REPOSITORIES_LOCK:
+            repo = _REPOSITORIES.setdefault(key, ProductRepository(key))
+    return repo
+
+
+def clear_repositories() -> None:
+    """Forget every repository's data (they reload on next use)."""
+    for repo in list(_REPOSITORIES.values()):
+        repo.clear()
+
+
+@on_products_saved
+def _update_repositories(path: str, products: List[Dict[str, Any]]) -> None:
+    repo = _REPOSITORIES.get(os.path.abspath(path))
+    if repo is not None:
+        repo.products_saved(path, products)
@@ -0,0 +1,214 @@
+"""Filtered, sorted and paged reads of the flat product list.
+
+``/api/products`` answers ``storage``/``category``/``low_stock``/``q``
+filters from the secondary indexes of a :class:`ProductSnapshot` and walks a
+precomputed permutation for the requested sort key, so a page costs roughly
+the page size plus the rows the filters skip. Permutations are built on
+first use and cached on the snapshot.
+"""
+
+import base64
+import bisect
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ..errors import DomainError
+from .product_io import ProductSnapshot, is_low_stock, product_key
+
+SORT_KEYS = ("name", "quantity", "threshold", "storage", "category", "status")
+FIELDS = (
+    "id",
+    "name",
+    "quantity",
+    "unit",
+    "threshold",
+    "main",
+    "level",
+    "is_spice",
+    "tags",
+    "storage",
+    "category",
+)
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _status(product: Dict[str, Any]) -> int:
+    # out of stock, low, ok
+    if _number(product.get("quantity")) <= 0:
+        return 0
+    return 1 if is_low_stock(product) else 2
+
+
+_SORT: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "name": lambda p: str(p.get("name") or "").casefold(),
+    "quantity": lambda p: _number(p.get("quantity")),
+    "threshold": lambda p: _number(p.get("threshold")),
+    "storage": lambda p: str(p.get("storage") or ""),
+    "category": lambda p: str(p.get("category") or ""),
+    "status": _status,
+}
+
+
+def sort_order(
+    snap: ProductSnapshot, sort_by: Optional[str]
+) -> Tuple[List[int], Dict[Any, List[int]]]:
+    """Return the ascending entry permutation for ``sort_by`` and its ranks.
+
+    Ties are ordered by name, then by file order; ``None`` keeps file order.
+    Ranks map a product key to its positions in the permutation, ascending;
+    products without an ``id`` may share a name, so a key can have several.
+    """
+    cached = snap.derived.get(("order", sort_by))
+    if cached is None:
+        if sort_by is None:
+            perm = list(snap.order)
+        else:
+            key, name = _SORT[sort_by], _SORT["name"]
+            keys = {e: (key(snap.entries[e]), name(snap.entries[e])) for e in snap.order}
+            perm = sorted(snap.order, key=keys.__getitem__)
+        rank: Dict[Any, List[int]] = {}
+        for idx, entry in enumerate(perm):
+            rank.setdefault(product_key(snap.entries[entry]), []).append(idx)
+        cached = snap.derived[("order", sort_by)] = (perm, rank)
+    return cached
+
+
+def matching(
+    snap: ProductSnapshot,
+    storages: Optional[Iterable[str]] = None,
+    categories: Optional[Iterable[str]] = None,
+    low_stock: Optional[bool] = None,
+    q: Optional[str] = None,
+) -> Optional[Set[int]]:
+    """Return entries passing every filter (``None``: no filter given)."""
+    sets: List[Set[int]] = []
+    if storages is not None:
+        sets.append(_union(snap.by_storage, storages))
+    if categories is not None:
+        sets.append(_union(snap.by_category, categories))
+    if low_stock is not None:
+        sets.append(snap.low if low_stock else set(snap.order) - snap.low)
+    if q:
+        needle = q.casefold()
+        names = [n for n in snap.by_name if needle in str(n or "").casefold()]
+        sets.append(_union(snap.by_name, names))
+    if not sets:
+        return None
+    sets.sort(key=len)
+    found = set(sets[0])
+    for other in sets[1:]:
+        found &= other
+    return found
+
+
+def _union(index: Dict[Any, Set[int]], keys: Iterable[Any]) -> Set[int]:
+    found: Set[int] = set()
+    for key in keys:
+        found |= index.get(key, set())
+    return found
+
+
+def encode_cursor(
+    sort_by: Optional[str], order: str, position: int, key: Any, occurrence: int, served: int
+) -> str:
+    raw = json.dumps(
+        {"s": sort_by, "o": order, "p": position, "k": key, "d": occurrence, "c": served}
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], str, int, Any, int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded).decode("utf-8"))
+        position, occurrence, served = state["p"], state["d"], state["c"]
+        if (
+            (state["s"] is not None and state["s"] not in SORT_KEYS)
+            or state["o"] not in ("asc", "desc")
+            or not all(isinstance(v, int) and v >= 0 for v in (position, occurrence, served))
+        ):
+            raise ValueError
+        return state["s"], state["o"], position, state["k"], occurrence, served
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise DomainError("invalid cursor") from None
+
+
+def query(
+    snap: ProductSnapshot,
+    *,
+    storages: Optional[Iterable[str]] = None,
+    categories: Optional[Iterable[str]] = None,
+    low_stock: Optional[bool] = None,
+    q: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    order: str = "asc",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    """Return ``(page, total, next cursor)`` for the given filters.
+
+    ``sort_by=None`` keeps file order. A cursor carries its own sort key and
+    order and resumes after the last product returned; filters must be
+    repeated with it.
+    """
+    if sort_by is not None and sort_by not in SORT_KEYS:
+        raise DomainError(f"sort_by must be one of: {', '.join(SORT_KEYS)}")
+    if order not in ("asc", "desc"):
+        raise DomainError("order must be asc or desc")
+    if fields is not None:
+        unknown = [f for f in fields if f not in FIELDS]
+        if unknown:
+            raise DomainError(f"unknown fields: {', '.join(unknown)}")
+
+    start = served = 0
+    if cursor:
+        sort_by, order, position, key, occurrence, served = decode_cursor(cursor)
+    perm, rank = sort_order(snap, sort_by)
+    n = len(perm)
+    if cursor:
+        # resume after the last product served (the ``occurrence``-th one
+        # with its key in walking order), or at its old position if that
+        # product is gone
+        ranks = rank.get(key, [])
+        if occurrence < len(ranks):
+            if order == "asc":
+                start = ranks[occurrence] + 1
+            else:
+                start = n - ranks[len(ranks) - 1 - occurrence]
+        else:
+            start = position
+
+    found = matching(snap, storages, categories, low_stock, q)
+    total = n if found is None else len(found)
+    size = n if limit is None else limit
+    picked: List[int] = []
+    pos = start
+    while pos < n and len(picked) < size:
+        entry = perm[pos] if order == "asc" else perm[n - 1 - pos]
+        if found is None or entry in found:
+            picked.append(entry)
+        pos += 1
+
+    next_cursor = None
+    served += len(picked)
+    if picked and pos < n and served < total:
+        key = product_key(snap.entries[picked[-1]])
+        ranks = rank[key]
+        # the last product served sits at ``pos - 1`` in walking order
+        occurrence = bisect.bisect_left(ranks, pos - 1 if order == "asc" else n - pos)
+        if order == "desc":
+            occurrence = len(ranks) - 1 - occurrence
+        next_cursor = encode_cursor(sort_by, order, pos, key, occurrence, served)
+
+    items = [snap.entries[entry] for entry in picked]
+    if fields is not None:
+        items = [{f: p[f] for f in fields if f in p} for p in items]
+    return items, total, next_cursor
+
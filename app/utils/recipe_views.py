@@ -0,0 +1,271 @@
+"""Per-locale enriched recipe lists cached across requests.
+
+Building the ``/api/recipes`` payload needs products, units and recipes:
+every ingredient gets localized ``productName`` and ``unitName``. The
+loaded sources (with the product and unit lookup maps) are shared by all
+locales and each locale's enriched list is built once. Everything is keyed
+on the storage signatures of the three source files and rebuilt as soon as
+any of them changes.
+
+Views are frozen (see :mod:`app.utils.dataset_cache`); callers copy before
+mutating. Each view keeps one ascending permutation per sort key, computed
+on first use, so a page costs O(page size); descending order walks the
+ascending permutation backwards.
+"""
+
+import base64
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..errors import DomainError
+from . import load_json, normalize_recipe
+from .dataset_cache import freeze
+from .product_io import product_repository
+from .storage import get_backend
+
+# (products path, units path, recipes path, recipes schema)
+Sources = Tuple[str, str, str, Optional[str]]
+
+LOCALES = ("pl", "en")
+
+
+def normalize_locale(locale: Any) -> str:
+    """Return ``locale`` if it is supported, otherwise ``"en"``.
+
+    Names missing in a locale fall back to English, so any other locale
+    renders exactly like ``"en"`` and shares its view.
+    """
+    return locale if locale in LOCALES else "en"
+
+
+def _localized(entry: Optional[Dict[str, Any]], locale: str) -> Optional[str]:
+    if not entry:
+        return None
+    names = entry.get("names", {})
+    return names.get(locale) or names.get("en") or entry.get("id")
+
+
+class RecipeSources:
+    """Loaded source data shared by the views of every locale."""
+
+    def __init__(self, paths: Sources, on_errors: Optional[Callable[[List[str]], None]]) -> None:
+        products_path, units_path, recipes_path, schema = paths
+        try:
+            # looked up by product id (or name) through the repository index
+            self.products = product_repository(products_path).snapshot()
+        except Exception as exc:  # pragma: no cover - defensive
+            raise ValueError(str(exc))
+        self.units: Dict[Any, Dict[str, Any]] = {
+            u.get("id"): u for u in load_json(units_path, [])
+        }
+        try:
+            recipes, errors = load_json(
+                recipes_path, [], schema, normalize_recipe, return_errors=True
+            )
+        except Exception as exc:  # pragma: no cover - defensive
+            raise ValueError(str(exc))
+        if errors and on_errors:
+            on_errors(errors)
+        self.recipes = recipes
+
+
+class _Order:
+    """Ascending permutation of a view for one sort key."""
+
+    __slots__ = ("perm", "rank")
+
+    def __init__(self, perm: Sequence[int], ids: Sequence[Any]) -> None:
+        self.perm = perm
+        # recipe id -> position in ``perm`` (first occurrence wins)
+        self.rank: Dict[Any, int] = {}
+        for pos, idx in enumerate(perm):
+            self.rank.setdefault(ids[idx], pos)
+
+
+class RecipeView:
+    """Enriched recipes for one locale, ordered by Polish name."""
+
+    def __init__(self, sources: RecipeSources, locale: str) -> None:
+        self.locale = locale
+        self.sources = sources
+        items = [self._enrich(rec) for rec in sources.recipes]
+        items.sort(key=lambda r: r.get("names", {}).get("pl", "").lower())
+        self.items: Tuple[Dict[str, Any], ...] = freeze(tuple(items))
+        self._orders: Dict[Optional[str], _Order] = {}
+
+    def _sort_key(self, sort_by: str) -> Callable[[Dict[str, Any]], Any]:
+        if sort_by == "name":
+            locale = self.locale
+
+            def key(r: Dict[str, Any]) -> Any:
+                names = r.get("names", {})
+                return (names.get(locale) or names.get("en") or r.get("id")).lower()
+
+            return key
+
+        def key(r: Dict[str, Any]) -> Any:
+            val = r.get(sort_by)
+            return val.lower() if isinstance(val, str) else val
+
+        return key
+
+    def order(self, sort_by: Optional[str]) -> _Order:
+        """Return the ascending permutation for ``sort_by``.
+
+        Sorting is stable over the view's Polish-name order; an empty
+        ``sort_by`` keeps that order.
+        """
+        cached = self._orders.get(sort_by)
+        if cached is None:
+            items = self.items
+            if sort_by:
+                keys = [self._sort_key(sort_by)(r) for r in items]
+                perm: Sequence[int] = sorted(range(len(items)), key=keys.__getitem__)
+            else:
+                perm = range(len(items))
+            cached = _Order(perm, [r.get("id") for r in items])
+            self._orders[sort_by] = cached
+        return cached
+
+    def page(
+        self, sort_by: Optional[str], descending: bool, start: int, size: int
+    ) -> List[Dict[str, Any]]:
+        """Return ``size`` items from position ``start`` of the sorted view."""
+        perm = self.order(sort_by).perm
+        n = len(perm)
+        if descending:
+            lo, hi = max(0, n - start - size), max(0, n - start)
+            picked = reversed(perm[lo:hi])
+        else:
+            picked = perm[start : start + size]
+        return [self.items[idx] for idx in picked]
+
+    def position_after(self, sort_by: Optional[str], descending: bool, recipe_id: Any) -> Optional[int]:
+        """Return the position following ``recipe_id`` in the sorted view."""
+        order = self.order(sort_by)
+        pos = order.rank.get(recipe_id)
+        if pos is None:
+            return None
+        if descending:
+            pos = len(order.perm) - 1 - pos
+        return pos + 1
+
+    def _enrich(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        products, units = self.sources.products, self.sources.units
+        ing_list = []
+        for ing in rec.get("ingredients", []):
+            pid = ing.get("productId")
+            uid = ing.get("unitId")
+            ing_list.append(
+                {
+                    "productId": pid,
+                    "productName": _localized(products.get(pid), self.locale),
+                    "qty": ing.get("qty"),
+                    "unitId": uid,
+                    "unitName": _localized(units.get(uid), self.locale),
+                    "optional": ing.get("optional", False),
+                    "note": ing.get("note"),
+                }
+            )
+        return {
+            "id": rec.get("id"),
+            "names": rec.get("names", {}),
+            "time": rec.get("time"),
+            "servings": rec.get("portions"),
+            "steps": rec.get("steps", []),
+            "ingredients": ing_list,
+            "amount": 0,
+            "threshold": 0,
+            "storage": "pantry",
+            "flags": False,
+        }
+
+
+class RecipeViewCache:
+    """Cache of :class:`RecipeView` objects keyed on source signatures."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key: Any = None
+        self._sources: Optional[RecipeSources] = None
+        self._views: Dict[str, RecipeView] = {}
+        self.hits = 0
+        self.builds = 0
+
+    def _signature(self, paths: Sources) -> Any:
+        backend = get_backend()
+        return (backend.name, paths, tuple(backend.signature(p) for p in paths[:3]))
+
+    def view(
+        self,
+        locale: str,
+        paths: Sources,
+        on_errors: Optional[Callable[[List[str]], None]] = None,
+    ) -> RecipeView:
+        """Return the view for ``locale``, rebuilding after source changes.
+
+        ``on_errors`` receives recipe validation errors whenever the sources
+        are (re)loaded.
+        """
+        key = self._signature(paths)
+        locale = normalize_locale(locale)
+        with self._lock:
+            if key != self._key:
+                self._sources = RecipeSources(paths, on_errors)
+                self._views = {}
+                self._key = key
+            view = self._views.get(locale)
+            if view is None:
+                view = self._views[locale] = RecipeView(self._sources, locale)
+                self.builds += 1
+            else:
+                self.hits += 1
+            return view
+
+    def clear(self) -> None:
+        with self._lock:
+            self._key = None
+            self._sources = None
+            self._views = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "locales": sorted(self._views),
+                "hits": self.hits,
+                "builds": self.builds,
+            }
+
+
+RECIPE_VIEWS = RecipeViewCache()
+
+
+def encode_page_cursor(sort_by: Optional[str], order: str, last_id: Any, offset: int) -> str:
+    """Return an opaque cursor continuing after ``last_id`` at ``offset``."""
+    raw = json.dumps({"s": sort_by, "o": order, "id": last_id, "at": offset})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(
+    cursor: str, sort_by: Optional[str] = None, order: Optional[str] = None
+) -> Tuple[Optional[str], str, Any, int]:
+    """Return ``(sort_by, order, last_id, offset)`` from :func:`encode_page_cursor`.
+
+    ``sort_by`` and ``order``, when given, must match the cursor's.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded).decode("utf-8"))
+        offset = state["at"]
+        if not isinstance(offset, int) or offset < 0 or state["o"] not in ("asc", "desc"):
+            raise ValueError
+        cursor_sort, cursor_order = state["s"], state["o"]
+        last_id = state["id"]
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise DomainError("invalid cursor") from None
+    if (sort_by is not None and sort_by != cursor_sort) or (
+        order is not None and order != cursor_order
+    ):
+        raise DomainError("cursor does not match sort_by/order")
+    return cursor_sort, cursor_order, last_id, offset
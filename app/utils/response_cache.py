@@ -0,0 +1,143 @@
+"""LRU cache of serialized JSON response bodies.
+
+Heavy GET endpoints serialize the same large structures on every request.
+Here the serialized bytes are kept together with gzip and deflate variants
+(compressed once, with stdlib :mod:`zlib`) under a key naming the endpoint
+and the data version, e.g. ``("products", etag)``. The cache is bounded by
+the total size of all variants and evicts least recently used entries.
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# bodies shorter than this are only served uncompressed
+COMPRESS_MIN_BYTES = 512
+ENCODINGS = ("gzip", "deflate")
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    # gzip wraps the deflate stream in a gzip header (wbits 16+); HTTP
+    # "deflate" is the zlib format
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    comp = zlib.compressobj(6, zlib.DEFLATED, wbits)
+    return comp.compress(body) + comp.flush()
+
+
+class CachedResponse:
+    """One serialized body, its compressed variants and response headers."""
+
+    __slots__ = ("body", "variants", "headers", "size")
+
+    def __init__(self, body: bytes, headers: List[Tuple[str, str]]) -> None:
+        self.body = body
+        self.headers = headers
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            for encoding in ENCODINGS:
+                packed = _compress(body, encoding)
+                if len(packed) < len(body):
+                    self.variants[encoding] = packed
+        self.size = len(body) + sum(len(v) for v in self.variants.values())
+
+    def negotiate(self, quality: Callable[[str], float]) -> Tuple[str, bytes]:
+        """Return ``(encoding, body)`` for the client's ``Accept-Encoding``.
+
+        ``quality`` maps an encoding to its q-value (``0`` if not accepted);
+        the best accepted variant wins, gzip on ties, identity otherwise.
+        """
+        best, best_q = "identity", 0.0
+        for encoding in ENCODINGS:
+            if encoding in self.variants:
+                q = quality(encoding)
+                if q > best_q:
+                    best, best_q = encoding, q
+        if best == "identity":
+            return best, self.body
+        return best, self.variants[best]
+
+
+class ResponseCache:
+    """Byte-bounded LRU of :class:`CachedResponse` objects.
+
+    Keys are tuples whose first item names the endpoint; hit ratios are
+    reported overall and per endpoint.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Any, ...], CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        # endpoint -> [hits, misses]
+        self._counts: Dict[Any, List[int]] = {}
+        self.served: Dict[str, int] = {"identity": 0, "gzip": 0, "deflate": 0}
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            counts = self._counts.setdefault(key[0], [0, 0])
+            if entry is None:
+                counts[1] += 1
+                return None
+            self._entries.move_to_end(key)
+            counts[0] += 1
+            return entry
+
+    def put(
+        self, key: Tuple[Any, ...], body: bytes, headers: List[Tuple[str, str]]
+    ) -> CachedResponse:
+        """Store ``body`` (compressing it) and return the new entry."""
+        entry = CachedResponse(body, headers)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return entry
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+        return entry
+
+    def record(self, encoding: str) -> None:
+        """Count a response served with ``encoding``."""
+        with self._lock:
+            self.served[encoding] = self.served.get(encoding, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(c[0] for c in self._counts.values())
+            misses = sum(c[1] for c in self._counts.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hitRatio": _ratio(hits, misses),
+                "evictions": self.evictions,
+                "endpoints": {
+                    str(name): {"hits": h, "misses": m, "hitRatio": _ratio(h, m)}
+                    for name, (h, m) in sorted(self._counts.items(), key=lambda i: str(i[0]))
+                },
+                "served": dict(self.served),
+            }
+
+
+def _ratio(hits: int, misses: int) -> float:
+    total = hits + misses
+    return round(hits / total, 4) if total else 0.0
+
+
+RESPONSES = ResponseCache()
@@ -0,0 +1,206 @@
+"""Compile simple JSON Schemas into specialized Python validation functions.
+
+The generated code mirrors ``jsonschema.Draft7Validator`` for the keyword
+subset used by ``app/schemas`` (``type``, ``enum``, ``required``,
+``properties``, ``patternProperties``, boolean ``additionalProperties`` and
+single-schema ``items``). Errors are produced in the same order and with the
+same messages as ``Draft7Validator.iter_errors`` so callers can swap engines
+without changing their output. Schemas using anything else raise
+:class:`UnsupportedSchema` and callers fall back to ``jsonschema``.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+ErrorList = List[Tuple[Tuple[Any, ...], str]]
+
+# Keywords ignored by Draft7Validator for validation purposes
+_ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "null": "{v} is None",
+    "boolean": "isinstance({v}, bool)",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": (
+        "((isinstance({v}, int) and not isinstance({v}, bool))"
+        " or (isinstance({v}, float) and {v}.is_integer()))"
+    ),
+}
+
+
+class UnsupportedSchema(Exception):
+    """Raised when a schema uses keywords the generator does not handle."""
+
+
+class _Generator:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.consts: Dict[str, Any] = {}
+        self._counter = 0
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def const(self, value: Any) -> str:
+        name = self._name("_C")
+        self.consts[name] = value
+        return name
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    @staticmethod
+    def path(parts: List[str]) -> str:
+        return "(" + "".join(p + ", " for p in parts) + ")"
+
+    def error(self, indent: int, parts: List[str], message: str) -> None:
+        self.emit(indent, f"errs.append(({self.path(parts)}, {message}))")
+
+    def node(self, schema: Any, var: str, parts: List[str], indent: int) -> None:
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(f"non-object schema: {schema!r}")
+        for keyword, value in schema.items():
+            if keyword in _ANNOTATIONS:
+                continue
+            handler = getattr(self, "kw_" + keyword, None)
+            if handler is None:
+                raise UnsupportedSchema(f"keyword {keyword!r}")
+            handler(value, schema, var, parts, indent)
+
+    # -- keywords ------------------------------------------------------------
+
+    def kw_type(self, types, schema, var, parts, indent) -> None:
+        types = [types] if isinstance(types, str) else list(types)
+        checks = []
+        for type_name in types:
+            if type_name not in _TYPE_CHECKS:
+                raise UnsupportedSchema(f"type {type_name!r}")
+            checks.append(_TYPE_CHECKS[type_name].format(v=var))
+        suffix = self.const(" is not of type " + ", ".join(repr(t) for t in types))
+        self.emit(indent, f"if not ({' or '.join(checks)}):")
+        self.error(indent + 1, parts, f"repr({var}) + {suffix}")
+
+    def kw_enum(self, enums, schema, var, parts, indent) -> None:
+        strings = set()
+        checks = []
+        for each in enums:
+            if isinstance(each, str):
+                strings.add(each)
+            elif each is None or isinstance(each, bool):
+                checks.append(f"{var} is {each!r}")
+            else:
+                raise UnsupportedSchema(f"enum value {each!r}")
+        if strings:
+            checks.append(f"(isinstance({var}, str) and {var} in {self.const(frozenset(strings))})")
+        suffix = self.const(f" is not one of {enums!r}")
+        self.emit(indent, f"if not ({' or '.join(checks) or 'False'}):")
+        self.error(indent + 1, parts, f"repr({var}) + {suffix}")
+
+    def kw_required(self, required, schema, var, parts, indent) -> None:
+        if not required:
+            return
+        self.emit(indent, f"if isinstance({var}, dict):")
+        for prop in required:
+            self.emit(indent + 1, f"if {prop!r} not in {var}:")
+            self.error(indent + 2, parts, repr(f"{prop!r} is a required property"))
+
+    def kw_properties(self, properties, schema, var, parts, indent) -> None:
+        if not properties:
+            return
+        self.emit(indent, f"if isinstance({var}, dict):")
+        for prop, subschema in properties.items():
+            child = self._name("v")
+            self.emit(indent + 1, f"{child} = {var}.get({prop!r}, _MISSING)")
+            self.emit(indent + 1, f"if {child} is not _MISSING:")
+            before = len(self.lines)
+            self.node(subschema, child, parts + [repr(prop)], indent + 2)
+            if len(self.lines) == before:
+                self.emit(indent + 2, "pass")
+
+    def kw_patternProperties(self, patterns, schema, var, parts, indent) -> None:
+        for pattern, subschema in patterns.items():
+            regex = self.const(re.compile(pattern))
+            key, child = self._name("k"), self._name("v")
+            self.emit(indent, f"if isinstance({var}, dict):")
+            self.emit(indent + 1, f"for {key}, {child} in {var}.items():")
+            self.emit(indent + 2, f"if {regex}.search({key}):")
+            before = len(self.lines)
+            self.node(subschema, child, parts + [key], indent + 3)
+            if len(self.lines) == before:
+                self.emit(indent + 3, "pass")
+
+    def kw_additionalProperties(self, allowed, schema, var, parts, indent) -> None:
+        if not isinstance(allowed, bool):
+            # schema-valued additionalProperties iterate a set; order would differ
+            raise UnsupportedSchema("schema-valued additionalProperties")
+        if allowed:
+            return
+        known = self.const(frozenset(schema.get("properties", {})))
+        patterns = schema.get("patternProperties", {})
+        extras = self._name("extras")
+        key = self._name("k")
+        if patterns:
+            joined = self.const(re.compile("|".join(patterns)))
+            cond = f"{key} not in {known} and not {joined}.search({key})"
+        else:
+            cond = f"{key} not in {known}"
+        self.emit(indent, f"if isinstance({var}, dict):")
+        self.emit(indent + 1, f"{extras} = [{key} for {key} in {var} if {cond}]")
+        self.emit(indent + 1, f"if {extras}:")
+        if patterns:
+            regexes = self.const(
+                " not match any of the regexes: "
+                + ", ".join(repr(p) for p in sorted(patterns))
+            )
+            message = (
+                f"', '.join(repr(e) for e in sorted({extras}))"
+                f" + (' does' if len({extras}) == 1 else ' do') + {regexes}"
+            )
+        else:
+            message = (
+                "'Additional properties are not allowed (%s %s unexpected)' % ("
+                f"', '.join(repr(e) for e in sorted({extras}, key=str)),"
+                f" 'was' if len({extras}) == 1 else 'were')"
+            )
+        self.error(indent + 2, parts, message)
+
+    def kw_items(self, items, schema, var, parts, indent) -> None:
+        if not isinstance(items, dict):
+            raise UnsupportedSchema("tuple or boolean items")
+        idx, child = self._name("i"), self._name("v")
+        self.emit(indent, f"if isinstance({var}, list):")
+        self.emit(indent + 1, f"for {idx}, {child} in enumerate({var}):")
+        before = len(self.lines)
+        self.node(items, child, parts + [idx], indent + 2)
+        if len(self.lines) == before:
+            self.lines.pop()
+            self.lines.pop()
+
+
+def generate_source(schema: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Return Python source for a validator of ``schema`` and its constants."""
+    gen = _Generator()
+    gen.emit(0, "def validate(v0):")
+    gen.emit(1, "errs = []")
+    gen.node(schema, "v0", [], 1)
+    gen.emit(1, "return errs")
+    return "\n".join(gen.lines) + "\n", gen.consts
+
+
+def compile_validator(schema: Dict[str, Any]) -> Callable[[Any], ErrorList]:
+    """Compile ``schema`` into ``validate(instance) -> [(path, message), ...]``.
+
+    Errors come back in ``Draft7Validator.iter_errors`` order; paths are
+    tuples comparable like ``ValidationError.path``.
+
+    Raises:
+        UnsupportedSchema: If the schema uses keywords the generator lacks.
+    """
+    source, consts = generate_source(schema)
+    namespace: Dict[str, Any] = {"_MISSING": object(), **consts}
+    exec(compile(source, "<schema-validator>", "exec"), namespace)
+    return namespace["validate"]
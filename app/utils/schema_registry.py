@@ -0,0 +1,157 @@
+"""Registry of compiled JSON Schema validators.
+
+Each schema file is parsed and compiled into ``jsonschema`` validators once;
+the compiled entry is reused until the schema file signature changes. Where
+:mod:`app.utils.schema_compiler` supports the schema, a generated Python
+validator is used instead of the ``jsonschema`` engine. Set
+``APP_FAST_VALIDATORS=0`` to always use ``jsonschema``.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import jsonschema
+
+from .dataset_cache import FileSignature, file_signature
+from .schema_compiler import UnsupportedSchema, compile_validator
+
+SCHEMA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "schemas"))
+
+logger = logging.getLogger(__name__)
+
+SchemaError = Tuple[Tuple[Any, ...], str]
+
+
+def _engine(validator: jsonschema.Draft7Validator) -> Callable[[Any], List[SchemaError]]:
+    def iter_errors(instance: Any) -> List[SchemaError]:
+        return [(tuple(e.path), e.message) for e in validator.iter_errors(instance)]
+
+    return iter_errors
+
+
+def _fast(
+    schema: Any, unsupported: List[str]
+) -> Optional[Callable[[Any], List[SchemaError]]]:
+    try:
+        return compile_validator(schema)
+    except UnsupportedSchema as exc:
+        unsupported.append(str(exc))
+        return None
+
+
+class CompiledSchema:
+    """Parsed schema together with its compiled validators."""
+
+    __slots__ = (
+        "path",
+        "signature",
+        "schema",
+        "validator",
+        "items_validator",
+        "_check",
+        "_check_items",
+        "generated",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        signature: FileSignature,
+        schema: Dict[str, Any],
+        *,
+        fast: bool = True,
+    ):
+        self.path = path
+        self.signature = signature
+        self.schema = schema
+        self.validator = jsonschema.Draft7Validator(schema)
+        items = schema.get("items") if isinstance(schema, dict) else None
+        if isinstance(items, dict):
+            self.items_validator = jsonschema.Draft7Validator(items)
+        else:
+            items = schema
+            self.items_validator = self.validator
+        unsupported: List[str] = []
+        check = _fast(schema, unsupported) if fast else None
+        check_items = _fast(items, unsupported) if fast else None
+        if unsupported:
+            # the items schema usually fails for the same reason; log once
+            logger.info(
+                "%s: using jsonschema engine (%s)", os.path.basename(path), unsupported[0]
+            )
+        self.generated = check is not None and check_items is not None
+        self._check = check or _engine(self.validator)
+        self._check_items = check_items or _engine(self.items_validator)
+
+    def errors(self, instance: Any) -> List[SchemaError]:
+        """Return ``(path, message)`` errors for ``instance`` sorted by path."""
+        return sorted(self._check(instance), key=lambda e: e[0])
+
+    def item_errors(self, instance: Any) -> List[SchemaError]:
+        """Like :meth:`errors` but against the ``items`` sub-schema if present."""
+        return sorted(self._check_items(instance), key=lambda e: e[0])
+
+
+class SchemaRegistry:
+    """Thread-safe cache of :class:`CompiledSchema` keyed by schema path."""
+
+    def __init__(self, *, fast: Optional[bool] = None) -> None:
+        if fast is None:
+            fast = os.environ.get("APP_FAST_VALIDATORS", "1") != "0"
+        self.fast = fast
+        self._entries: Dict[str, CompiledSchema] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, schema_path: str) -> Optional[CompiledSchema]:
+        """Return compiled validators for ``schema_path`` or ``None`` if missing."""
+        abs_path = os.path.abspath(schema_path)
+        sig = file_signature(abs_path)
+        with self._lock:
+            entry = self._entries.get(abs_path)
+            if sig is None:
+                self._entries.pop(abs_path, None)
+                self.misses += 1
+                return None
+            if entry is not None and entry.signature == sig:
+                self.hits += 1
+                return entry
+        try:
+            with open(abs_path, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+        except FileNotFoundError:
+            return None
+        compiled = CompiledSchema(abs_path, sig, schema, fast=self.fast)
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self.reloads += 1
+            self._entries[abs_path] = compiled
+        return compiled
+
+    def preload(self, schema_dir: str = SCHEMA_DIR) -> int:
+        """Compile every ``*.json`` schema in ``schema_dir``; return the count."""
+        count = 0
+        for name in sorted(os.listdir(schema_dir)):
+            if name.endswith(".json") and self.get(os.path.join(schema_dir, name)):
+                count += 1
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "generated": sum(1 for e in self._entries.values() if e.generated),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+            }
+
+
+# Shared registry used by the validation helpers in ``app.utils``
+SCHEMAS = SchemaRegistry()
@@ -0,0 +1,319 @@
+"""Shopping-list aggregation over a precompiled recipe matrix.
+
+Recipes are compiled once per recipes version into a sparse (CSR) matrix
+with one row per recipe and one column per ``(productId, base unit)``.
+Each entry keeps the ingredient quantity in its own unit and the factor
+converting it to the base unit, so a selection is a weighted sum of rows
+minus a stock vector computed once per product snapshot.
+
+The sum runs in NumPy for large selections when it is installed and in
+plain Python otherwise. Both paths add the same products in the same order
+as walking the recipes ingredient by ingredient, so the results are
+identical to the float.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import _safe_float
+from .product_io import ProductSnapshot
+
+try:  # optional, only speeds up large selections
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# (qty, unit id) -> (qty in base unit, base unit id)
+ToBase = Callable[[float, str], Tuple[float, str]]
+# product -> (stock in base unit, base unit id)
+ProductBase = Callable[[Dict[str, Any]], Tuple[float, str]]
+Column = Tuple[str, str]
+
+# selections with fewer entries are summed in Python even with NumPy
+NUMPY_MIN_SELECTION = 32
+
+
+def stock_map(snap: ProductSnapshot, product_base: ProductBase) -> Dict[Column, float]:
+    """Return ``{(product name, base unit): stock}`` of ``snap``.
+
+    Computed once per snapshot and kept in ``snap.derived``.
+    """
+    stock = snap.derived.get("shopping_stock")
+    if stock is None:
+        stock = {}
+        for prod in snap.products():
+            qty, unit = product_base(prod)
+            key = (prod.get("name"), unit)
+            stock[key] = stock.get(key, 0) + qty
+        snap.derived["shopping_stock"] = stock
+    return stock
+
+
+class ShoppingMatrix:
+    """Recipes as a sparse recipe x (productId, base unit) matrix."""
+
+    def __init__(self, recipes: Iterable[Dict[str, Any]], to_base: ToBase) -> None:
+        self.columns: List[Column] = []
+        self.column_of: Dict[Column, int] = {}
+        # recipe id -> row (the last recipe wins on duplicate ids)
+        self.rows: Dict[Any, int] = {}
+        self.portions: List[float] = []
+        # CSR: entries of row r are indptr[r]:indptr[r + 1]
+        self.indptr: List[int] = [0]
+        self.indices: List[int] = []
+        self.qty: List[float] = []
+        # factor to the base unit, None when the unit is already the base
+        self.factor: List[Optional[float]] = []
+        self.optional: List[bool] = []
+        factors: Dict[str, Tuple[Optional[float], str]] = {}
+        for recipe in recipes:
+            for ing in recipe.get("ingredients", []):
+                pid, unit, qty = ing.get("productId"), ing.get("unitId"), ing.get("qty")
+                if not pid or not unit or qty is None:
+                    continue
+                if unit not in factors:
+                    factor, base = to_base(1.0, unit)
+                    factors[unit] = (None if base == unit else factor, base)
+                factor, base = factors[unit]
+                col = self.column_of.get((pid, base))
+                if col is None:
+                    col = self.column_of[(pid, base)] = len(self.columns)
+                    self.columns.append((pid, base))
+                self.indices.append(col)
+                self.qty.append(qty)
+                self.factor.append(factor)
+                self.optional.append(bool(ing.get("optional")))
+            self.rows[recipe.get("id")] = len(self.portions)
+            self.portions.append(recipe.get("portions") or 1)
+            self.indptr.append(len(self.indices))
+        self._arrays: Any = None
+        self._stock: Tuple[Any, Any] = (None, None)
+        self._lock = threading.Lock()
+
+    def scale(self, row: int, servings: Any) -> float:
+        """Return the factor applied to ``row`` for ``servings`` portions."""
+        return max(0.0, _safe_float(servings)) / self.portions[row]
+
+    def amount(self, entry: int, scale: float) -> float:
+        """Return the base-unit quantity of ``entry`` at ``scale``."""
+        qty = self.qty[entry] * scale
+        if self.factor[entry] is not None:
+            qty = qty * self.factor[entry]
+        return qty
+
+    def _weights(self, selection: Iterable[Dict[str, Any]]) -> List[Tuple[int, float]]:
+        weights = []
+        for sel in selection:
+            row = self.rows.get(sel.get("id"))
+            if row is None:
+                continue
+            weights.append((row, self.scale(row, sel.get("servings", 0))))
+        return weights
+
+    def shopping_list(
+        self,
+        selection: Iterable[Dict[str, Any]],
+        snap: ProductSnapshot,
+        product_base: ProductBase,
+        use_numpy: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the items to buy for ``selection`` given the stock in ``snap``.
+
+        ``use_numpy`` forces a path; by default NumPy is used when available
+        and the selection has at least :data:`NUMPY_MIN_SELECTION` entries.
+        """
+        weights = self._weights(selection)
+        if use_numpy is None:
+            use_numpy = np is not None and len(weights) >= NUMPY_MIN_SELECTION
+        if use_numpy:
+            needed = self._sum_numpy(weights, snap, product_base)
+        else:
+            needed = self._sum_python(weights, stock_map(snap, product_base))
+        items: List[Dict[str, Any]] = []
+        for col, remaining, optional in needed:
+            if remaining <= 0:
+                continue
+            pid, unit = self.columns[col]
+            items.append(
+                {
+                    "productId": pid,
+                    "unitId": unit,
+                    "quantity_to_buy": remaining,
+                    "optional": optional,
+                    "in_cart": False,
+                }
+            )
+        return items
+
+    def _sum_python(
+        self, weights: List[Tuple[int, float]], stock: Dict[Column, float]
+    ) -> List[Tuple[int, float, bool]]:
+        totals: Dict[int, float] = {}
+        optional: Dict[int, bool] = {}
+        for row, scale in weights:
+            for k in range(self.indptr[row], self.indptr[row + 1]):
+                col = self.indices[k]
+                totals[col] = totals.get(col, 0) + self.amount(k, scale)
+                if self.optional[k]:
+                    optional[col] = True
+                else:
+                    optional.setdefault(col, False)
+        return [
+            (col, max(total - stock.get(self.columns[col], 0), 0), optional[col])
+            for col, total in totals.items()
+        ]
+
+    def _numpy_arrays(self) -> Any:
+        if self._arrays is None:
+            self._arrays = (
+                np.asarray(self.indptr, dtype=np.int64),
+                np.asarray(self.indices, dtype=np.int64),
+                np.asarray(self.qty, dtype=np.float64),
+                np.asarray([1.0 if f is None else f for f in self.factor], dtype=np.float64),
+                np.asarray([f is not None for f in self.factor], dtype=bool),
+                np.asarray(self.optional, dtype=np.float64),
+            )
+        return self._arrays
+
+    def _stock_vector(self, snap: ProductSnapshot, product_base: ProductBase) -> Any:
+        with self._lock:
+            cached_snap, vector = self._stock
+            if cached_snap is not snap:
+                stock = stock_map(snap, product_base)
+                vector = np.asarray(
+                    [stock.get(col, 0) for col in self.columns], dtype=np.float64
+                )
+                self._stock = (snap, vector)
+            return vector
+
+    def _sum_numpy(
+        self,
+        weights: List[Tuple[int, float]],
+        snap: ProductSnapshot,
+        product_base: ProductBase,
+    ) -> List[Tuple[int, float, bool]]:
+        indptr, indices, qty, factor, converted, optional = self._numpy_arrays()
+        if not weights:
+            return []
+        rows = np.asarray([row for row, _ in weights], dtype=np.int64)
+        scales = np.asarray([scale for _, scale in weights], dtype=np.float64)
+        starts, lengths = indptr[rows], indptr[rows + 1] - indptr[rows]
+        # entry positions of every selected row, in selection order
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(
+            lengths.sum()
+        )
+        cols = indices[entries]
+        if not len(cols):
+            return []
+        amounts = qty[entries] * np.repeat(scales, lengths)
+        # multiply only converted entries, like the Python path
+        amounts = np.where(converted[entries], amounts * factor[entries], amounts)
+        # bincount accumulates in entry order, so sums match the Python path
+        totals = np.bincount(cols, weights=amounts, minlength=len(self.columns))
+        flagged = np.bincount(cols, weights=optional[entries], minlength=len(self.columns))
+        remaining = np.maximum(totals - self._stock_vector(snap, product_base), 0)
+        # columns in order of first appearance
+        seen, first = np.unique(cols, return_index=True)
+        order = seen[np.argsort(first)]
+        return [
+            (int(col), float(remaining[col]), bool(flagged[col] > 0)) for col in order
+        ]
+
+
+class SelectionTotals:
+    """Per-column contributions of a selection, changed one recipe at a time.
+
+    Every selected recipe occupies a slot, numbered in selection order; a
+    column keeps the base-unit amounts each slot contributes. Adding or
+    removing a recipe touches only the columns of its row, and a column's
+    total is re-summed from its slots in the order a full regeneration adds
+    them, so totals are identical to :meth:`ShoppingMatrix.shopping_list`.
+    """
+
+    def __init__(self, matrix: ShoppingMatrix, selection: Iterable[Dict[str, Any]] = ()) -> None:
+        self.matrix = matrix
+        # column -> slot -> [(amount, optional)] in entry order
+        self.parts: Dict[int, Dict[int, List[Tuple[float, bool]]]] = {}
+        # recipe id -> its slots
+        self.slots: Dict[Any, List[int]] = {}
+        self._next_slot = 0
+        for sel in selection:
+            self.add(sel.get("id"), sel.get("servings", 0))
+
+    def add(self, recipe_id: Any, servings: Any, slot: Optional[int] = None) -> List[int]:
+        """Add a recipe (after every other, or at ``slot``); return the touched columns."""
+        if slot is None:
+            slot = self._next_slot
+        self._next_slot = max(self._next_slot, slot + 1)
+        self.slots.setdefault(recipe_id, []).append(slot)
+        matrix = self.matrix
+        row = matrix.rows.get(recipe_id)
+        if row is None:
+            return []
+        scale = matrix.scale(row, servings)
+        touched = []
+        for k in range(matrix.indptr[row], matrix.indptr[row + 1]):
+            col = matrix.indices[k]
+            part = self.parts.setdefault(col, {}).setdefault(slot, [])
+            part.append((matrix.amount(k, scale), matrix.optional[k]))
+            touched.append(col)
+        return touched
+
+    def remove(self, recipe_id: Any) -> Tuple[List[int], Optional[int]]:
+        """Remove every slot of a recipe; return the touched columns and its first slot."""
+        slots = self.slots.pop(recipe_id, [])
+        row = self.matrix.rows.get(recipe_id)
+        touched = []
+        if row is not None:
+            matrix = self.matrix
+            for k in range(matrix.indptr[row], matrix.indptr[row + 1]):
+                col = matrix.indices[k]
+                parts = self.parts.get(col)
+                if parts is None:
+                    continue
+                for slot in slots:
+                    parts.pop(slot, None)
+                if not parts:
+                    del self.parts[col]
+                touched.append(col)
+        return touched, min(slots) if slots else None
+
+    def needed(self, col: int, stock: Dict[Column, float]) -> Tuple[float, bool]:
+        """Return ``(quantity to buy, optional)`` for ``col``."""
+        parts = self.parts.get(col)
+        if not parts:
+            return 0.0, False
+        total: float = 0
+        optional = False
+        for slot in sorted(parts):
+            for amount, flag in parts[slot]:
+                total = total + amount
+                optional = optional or flag
+        return max(total - stock.get(self.matrix.columns[col], 0), 0), optional
+
+
+class ShoppingMatrixCache:
+    """One :class:`ShoppingMatrix` per loaded recipe list."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._source: Any = None
+        self._matrix: Optional[ShoppingMatrix] = None
+        self.builds = 0
+
+    def matrix_for(self, recipes: List[Dict[str, Any]], to_base: ToBase) -> ShoppingMatrix:
+        """Return the matrix of ``recipes``, rebuilt when a new list is passed."""
+        with self._lock:
+            if self._matrix is None or self._source is not recipes:
+                self._matrix = ShoppingMatrix(recipes, to_base)
+                self._source = recipes
+                self.builds += 1
+            return self._matrix
+
+    def clear(self) -> None:
+        with self._lock:
+            self._source = None
+            self._matrix = None
+
+
+SHOPPING_MATRICES = ShoppingMatrixCache()
@@ -0,0 +1,257 @@
+"""Shopping list kept in step with a recipe selection.
+
+The selected recipes are stored next to the shopping list (``{id,
+servings}`` entries). Adding, removing or rescaling one recipe changes the
+per-column contributions in :class:`~app.utils.shopping_matrix.SelectionTotals`
+for that recipe's ingredients only. Then only the list rows of those
+products are updated; every other row, and its ``in_cart`` mark, is left
+alone. A touched row is re-summed from the selected recipes in selection
+order, so its quantity is exactly what a full regeneration computes.
+
+The plan remembers the stock map the list was computed against. When the
+stock has changed since (a purchase confirmed, a product edited), the rows
+of the selection's columns whose stock changed are recomputed too. When
+that stock is unknown (after a restart or an outside change to the
+selection) every row is reconciled once.
+
+A changed row is rewritten in place, a new row is appended and a row no
+longer needed is removed; the other rows keep their order. The rows stay in
+memory until the list is written by someone else. With SQLite only the
+changed rows are written (``SqliteBackend.update_rows``); the JSON backend
+still rewrites the whole file on every change.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..errors import DomainError
+from . import file_lock, load_json, save_json, thaw
+from .dataset_cache import DATASETS
+from .product_io import ProductSnapshot
+from .shopping_matrix import Column, ProductBase, SelectionTotals, ShoppingMatrix, stock_map
+from .storage import SqliteBackend, get_backend
+
+
+class ShoppingPlan:
+    """Selection, running totals and shopping list stored under two paths."""
+
+    def __init__(self, list_path: str, selection_path: str) -> None:
+        self.list_path = list_path
+        self.selection_path = selection_path
+        self._lock = threading.Lock()
+        # (matrix, selection signature) the totals were built for
+        self._key: Any = None
+        self._totals: Optional[SelectionTotals] = None
+        # stock map the stored list reflects (None: unknown)
+        self._stock: Optional[Dict[Column, float]] = None
+        # the stored list and its storage signature
+        self._items: Optional[List[Dict[str, Any]]] = None
+        self._items_sig: Any = None
+
+    def selection(self) -> List[Dict[str, Any]]:
+        return thaw(load_json(self.selection_path, []))
+
+    def _totals_for(
+        self, matrix: ShoppingMatrix, selection: List[Dict[str, Any]]
+    ) -> SelectionTotals:
+        key = (matrix, get_backend().signature(self.selection_path))
+        if self._totals is None or key != self._key:
+            self._totals = SelectionTotals(matrix, selection)
+            self._key = key
+            self._stock = None
+        return self._totals
+
+    def _save_selection(self, matrix: ShoppingMatrix, selection: List[Dict[str, Any]]) -> None:
+        save_json(self.selection_path, selection)
+        self._key = (matrix, get_backend().signature(self.selection_path))
+
+    def reset(
+        self,
+        matrix: ShoppingMatrix,
+        selection: List[Dict[str, Any]],
+        stock: Optional[Dict[Column, float]] = None,
+    ) -> None:
+        """Record ``selection`` (and ``stock``) as what the stored list was generated from."""
+        with file_lock(self.list_path), self._lock:
+            selection = [
+                {"id": sel.get("id"), "servings": sel.get("servings", 0)} for sel in selection
+            ]
+            self._totals = SelectionTotals(matrix, selection)
+            self._save_selection(matrix, selection)
+            self._stock = stock
+
+    def refresh(
+        self, matrix: ShoppingMatrix, snap: ProductSnapshot, product_base: ProductBase
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Update the rows whose stock changed in ``snap``.
+
+        Returns the updated list, or ``None`` when no selection is stored.
+        """
+        with file_lock(self.list_path), self._lock:
+            if get_backend().signature(self.selection_path) is None:
+                return None
+            totals = self._totals_for(matrix, self.selection())
+            return self._apply_stock(totals, set(), stock_map(snap, product_base))
+
+    def change(
+        self,
+        matrix: ShoppingMatrix,
+        snap: ProductSnapshot,
+        product_base: ProductBase,
+        recipe_id: str,
+        servings: Optional[float],
+        *,
+        add: bool = False,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Add, rescale or remove (``servings=None``) one recipe.
+
+        Returns the updated list, or ``None`` when a recipe to change is
+        not selected. Raises ``DomainError`` for an unknown recipe or one
+        added twice.
+        """
+        with file_lock(self.list_path), self._lock:
+            selection = self.selection()
+            totals = self._totals_for(matrix, selection)
+            current = [s for s in selection if s.get("id") == recipe_id]
+            if add:
+                if recipe_id not in matrix.rows:
+                    raise DomainError(f"unknown recipe: {recipe_id}")
+                if current:
+                    raise DomainError(f"recipe already selected: {recipe_id}")
+            elif not current:
+                return None
+
+            removed, slot = totals.remove(recipe_id)
+            touched = set(removed)
+            rest = [s for s in selection if s.get("id") != recipe_id]
+            if servings is not None:
+                # a rescaled recipe keeps its slot, a new one goes last
+                touched.update(totals.add(recipe_id, servings, slot))
+                entry = {"id": recipe_id, "servings": servings}
+                if current:
+                    # keep the recipe's place in the selection
+                    pos = selection.index(current[0])
+                    rest.insert(pos, entry)
+                else:
+                    rest.append(entry)
+
+            items = self._apply_stock(totals, touched, stock_map(snap, product_base))
+            self._save_selection(matrix, rest)
+            return items
+
+    def _apply_stock(
+        self, totals: SelectionTotals, touched: Set[int], stock: Dict[Column, float]
+    ) -> List[Dict[str, Any]]:
+        """Update rows of ``touched`` and of selected columns whose stock changed."""
+        previous = self._stock
+        if previous is None:
+            items = self._update_rows(totals, None, stock)
+        else:
+            if previous is not stock:
+                columns = totals.matrix.columns
+                for col in totals.parts:
+                    key = columns[col]
+                    if previous.get(key, 0) != stock.get(key, 0):
+                        touched.add(col)
+            items = self._update_rows(totals, touched, stock)
+        self._stock = stock
+        return items
+
+    def _rows(self) -> List[Dict[str, Any]]:
+        sig = get_backend().signature(self.list_path)
+        if self._items is None or sig != self._items_sig:
+            self._items = thaw(load_json(self.list_path, []))
+            self._items_sig = sig
+        return self._items
+
+    def _save_rows(
+        self,
+        items: List[Dict[str, Any]],
+        upserts: List[Dict[str, Any]],
+        removed: List[Tuple[Any, Any]],
+    ) -> None:
+        backend = get_backend()
+        if isinstance(backend, SqliteBackend) and (
+            backend.update_rows(self.list_path, upserts, removed) is not None
+        ):
+            DATASETS.invalidate(self.list_path)
+        else:
+            save_json(self.list_path, items)
+        self._items = items
+        self._items_sig = backend.signature(self.list_path)
+
+    def _update_rows(
+        self,
+        totals: SelectionTotals,
+        touched: Optional[Set[int]],
+        stock: Dict[Column, float],
+    ) -> List[Dict[str, Any]]:
+        items = self._rows()
+        matrix = totals.matrix
+        rows: Dict[Tuple[Any, Any], int] = {
+            (it.get("productId"), it.get("unitId")): pos for pos, it in enumerate(items)
+        }
+        dropped: Set[int] = set()
+        if touched is None:
+            # the list may be stale anywhere: reconsider every column and row
+            touched = set(totals.parts)
+            for key, pos in rows.items():
+                if key in matrix.column_of:
+                    touched.add(matrix.column_of[key])
+                else:
+                    dropped.add(pos)
+        upserts: List[Dict[str, Any]] = []
+        for col in sorted(touched):
+            pid, unit = matrix.columns[col]
+            remaining, optional = totals.needed(col, stock)
+            pos = rows.get((pid, unit))
+            if remaining > 0:
+                if pos is None:
+                    rows[(pid, unit)] = len(items)
+                    items.append(
+                        {
+                            "productId": pid,
+                            "unitId": unit,
+                            "quantity_to_buy": remaining,
+                            "optional": optional,
+                            "in_cart": False,
+                        }
+                    )
+                    upserts.append(items[-1])
+                elif (
+                    items[pos].get("quantity_to_buy") != remaining
+                    or items[pos].get("optional") != optional
+                ):
+                    items[pos]["quantity_to_buy"] = remaining
+                    items[pos]["optional"] = optional
+                    upserts.append(items[pos])
+            elif pos is not None:
+                dropped.add(pos)
+        if upserts or dropped:
+            removed = [(items[pos].get("productId"), items[pos].get("unitId")) for pos in dropped]
+            items = [it for pos, it in enumerate(items) if pos not in dropped]
+            self._save_rows(items, upserts, removed)
+        return items
+
+
+class ShoppingPlans:
+    """One :class:`ShoppingPlan` per shopping list path."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._plans: Dict[Tuple[str, str], ShoppingPlan] = {}
+
+    def plan(self, list_path: str, selection_path: str) -> ShoppingPlan:
+        key = (list_path, selection_path)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                plan = self._plans[key] = ShoppingPlan(list_path, selection_path)
+            return plan
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans = {}
+
+
+SHOPPING_PLANS = ShoppingPlans()
@@ -0,0 +1,549 @@
+"""Storage backends behind the ``load_*``/``save_*`` dataset helpers.
+
+Datasets are addressed by their JSON file path everywhere in the app. The
+active backend decides where the data actually lives:
+
+``json`` (default)
+    Whole-file JSON documents at the given path.
+``sqlite``
+    Rows in ``food.sqlite3`` next to the JSON file (WAL mode). Products,
+    recipes, history and the shopping list get indexed tables; any other
+    dataset is kept as a single document row. Writes only touch rows whose
+    content changed.
+
+Select the backend with ``APP_STORAGE_BACKEND=json|sqlite``. Use
+:func:`import_json` / :func:`export_json` (or ``scripts/sqlite_storage.py``)
+to move data between the two.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from .dataset_cache import file_signature
+
+DB_NAME = "food.sqlite3"
+# spacing of ``seq`` values, leaving room to insert rows between them
+_SEQ_GAP = 1024
+
+
+class JsonBackend:
+    """Whole-file JSON documents (the original storage format)."""
+
+    name = "json"
+
+    def signature(self, path: str) -> Optional[Tuple[Any, ...]]:
+        return file_signature(path)
+
+    def read(self, path: str) -> Any:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def write(self, path: str, data: Any, *, atomic: bool = False) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        target = f"{path}.tmp" if atomic else path
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        if atomic:
+            os.replace(target, path)
+
+    def etag(self, path: str) -> str:
+        with open(path, "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest()
+
+    def last_modified(self, path: str) -> float:
+        return os.path.getmtime(path)
+
+
+# --- SQLite -------------------------------------------------------------------
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS datasets (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY,
+    storage TEXT NOT NULL,
+    category TEXT NOT NULL,
+    product_id TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_by_id ON products (product_id);
+CREATE INDEX IF NOT EXISTS products_by_storage ON products (storage, category);
+CREATE INDEX IF NOT EXISTS products_by_category ON products (category);
+CREATE TABLE IF NOT EXISTS recipes (
+    seq INTEGER PRIMARY KEY,
+    recipe_id TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recipes_by_id ON recipes (recipe_id);
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY,
+    date TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_date ON history (date);
+CREATE TABLE IF NOT EXISTS shopping (
+    seq INTEGER PRIMARY KEY,
+    product_id TEXT,
+    unit_id TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shopping_by_product ON shopping (product_id);
+"""
+
+
+def _dump(doc: Any) -> str:
+    return json.dumps(doc, ensure_ascii=False)
+
+
+def _product_rows(data: Any) -> Optional[List[Tuple[Any, ...]]]:
+    if not isinstance(data, dict):
+        return None
+    rows = []
+    for storage, categories in data.items():
+        if not isinstance(categories, dict):
+            return None
+        for category, items in categories.items():
+            if not isinstance(items, list):
+                return None
+            for item in items:
+                if not isinstance(item, dict):
+                    return None
+                rows.append(
+                    (storage, category, item.get("id") or item.get("name"), _dump(item))
+                )
+    return rows
+
+
+def _list_rows(*fields: str):
+    def rows(data: Any) -> Optional[List[Tuple[Any, ...]]]:
+        if not isinstance(data, list):
+            return None
+        out = []
+        for item in data:
+            keys = tuple(item.get(f) if isinstance(item, dict) else None for f in fields)
+            out.append(keys + (_dump(item),))
+        return out
+
+    return rows
+
+
+def _products_from_rows(rows: Sequence[Tuple[Any, ...]]) -> Dict[str, Any]:
+    nested: Dict[str, Dict[str, List[Any]]] = {}
+    for storage, category, _pid, doc in rows:
+        nested.setdefault(storage, {}).setdefault(category, []).append(json.loads(doc))
+    return nested
+
+
+def _list_from_rows(rows: Sequence[Tuple[Any, ...]]) -> List[Any]:
+    return [json.loads(row[-1]) for row in rows]
+
+
+# dataset name -> (table, key columns, rows-from-data, data-from-rows)
+_TABLES = {
+    "products": (
+        "products",
+        ("storage", "category", "product_id"),
+        _product_rows,
+        _products_from_rows,
+    ),
+    "recipes": ("recipes", ("recipe_id",), _list_rows("id"), _list_from_rows),
+    "history": ("history", ("date",), _list_rows("date"), _list_from_rows),
+    "shopping_list": (
+        "shopping",
+        ("product_id", "unit_id"),
+        _list_rows("productId", "unitId"),
+        _list_from_rows,
+    ),
+}
+
+
+def _increasing_run(seqs: Sequence[Optional[int]]) -> Set[int]:
+    """Return the indexes of a longest increasing run of ``seqs``, skipping ``None``."""
+    # tails[k]: index ending the best run of length k + 1 found so far
+    tails: List[int] = []
+    tail_seqs: List[int] = []
+    prev: Dict[int, Optional[int]] = {}
+    for i, seq in enumerate(seqs):
+        if seq is None:
+            continue
+        k = bisect.bisect_left(tail_seqs, seq)
+        prev[i] = tails[k - 1] if k else None
+        if k == len(tails):
+            tails.append(i)
+            tail_seqs.append(seq)
+        else:
+            tails[k], tail_seqs[k] = i, seq
+    run: Set[int] = set()
+    at = tails[-1] if tails else None
+    while at is not None:
+        run.add(at)
+        at = prev[at]
+    return run
+
+
+def _fill_gaps(seqs: Sequence[Optional[int]]) -> Optional[List[int]]:
+    """Fill each ``None`` with a ``seq`` between its neighbours (``None`` if none fits)."""
+    out: List[Any] = list(seqs)
+    i = 0
+    while i < len(out):
+        if out[i] is not None:
+            i += 1
+            continue
+        j = i
+        while j < len(out) and out[j] is None:
+            j += 1
+        count = j - i
+        lo = out[i - 1] if i else None
+        hi = out[j] if j < len(out) else None
+        step = _SEQ_GAP
+        if lo is None:
+            lo = -_SEQ_GAP if hi is None else hi - (count + 1) * _SEQ_GAP
+        elif hi is not None:
+            if hi - lo <= count:
+                return None
+            step = (hi - lo) // (count + 1)
+        for k in range(count):
+            out[i + k] = lo + (k + 1) * step
+        i = j
+    return out
+
+
+def dataset_name(path: str) -> str:
+    """Return the dataset name for a JSON path (file name without ``.json``)."""
+    base = os.path.basename(path)
+    return base[:-5] if base.endswith(".json") else base
+
+
+class SqliteBackend:
+    """Datasets stored as rows in a WAL-mode SQLite database."""
+
+    name = "sqlite"
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized: set = set()
+
+    @staticmethod
+    def db_path(path: str) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(path)), DB_NAME)
+
+    def connect(self, path: str) -> sqlite3.Connection:
+        """Return this thread's connection to the database serving ``path``."""
+        db = self.db_path(path)
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(db)
+        if conn is None:
+            os.makedirs(os.path.dirname(db), exist_ok=True)
+            conn = sqlite3.connect(db, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if db not in self._initialized:
+                    conn.executescript(_DDL)
+                    self._initialized.add(db)
+            conns[db] = conn
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connections."""
+        for conn in getattr(self._local, "conns", {}).values():
+            conn.close()
+        self._local.conns = {}
+
+    def _meta(self, conn: sqlite3.Connection, name: str) -> Optional[Tuple[str, int, float]]:
+        return conn.execute(
+            "SELECT kind, version, updated FROM datasets WHERE name = ?", (name,)
+        ).fetchone()
+
+    def signature(self, path: str) -> Optional[Tuple[Any, ...]]:
+        meta = self._meta(self.connect(path), dataset_name(path))
+        if meta is None:
+            return None
+        return ("sqlite", self.db_path(path), meta[1])
+
+    def read(self, path: str) -> Any:
+        name = dataset_name(path)
+        conn = self.connect(path)
+        meta = self._meta(conn, name)
+        if meta is None:
+            raise FileNotFoundError(path)
+        if meta[0] == "document":
+            row = conn.execute("SELECT doc FROM documents WHERE name = ?", (name,)).fetchone()
+            return json.loads(row[0]) if row else None
+        table, cols, _to_rows, from_rows = _TABLES[name]
+        rows = conn.execute(f"SELECT {', '.join(cols)}, doc FROM {table} ORDER BY seq").fetchall()
+        return from_rows(rows)
+
+    def write(self, path: str, data: Any, *, atomic: bool = False) -> int:
+        """Persist ``data`` returning the number of rows touched."""
+        name = dataset_name(path)
+        conn = self.connect(path)
+        spec = _TABLES.get(name)
+        rows = spec[2](data) if spec else None
+        kind = "rows" if rows is not None else "document"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            meta = self._meta(conn, name)
+            changed = 0
+            if kind == "document":
+                if spec:
+                    changed += conn.execute(f"DELETE FROM {spec[0]}").rowcount
+                doc = _dump(data)
+                prev = conn.execute(
+                    "SELECT doc FROM documents WHERE name = ?", (name,)
+                ).fetchone()
+                if prev is None or prev[0] != doc:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents (name, doc) VALUES (?, ?)",
+                        (name, doc),
+                    )
+                    changed += 1
+            else:
+                changed += conn.execute(
+                    "DELETE FROM documents WHERE name = ?", (name,)
+                ).rowcount
+                changed += self._sync_rows(conn, spec[0], spec[1], rows)
+            if meta is None or changed or meta[0] != kind:
+                version = (meta[1] if meta else 0) + 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO datasets (name, kind, version, updated)"
+                    " VALUES (?, ?, ?, ?)",
+                    (name, kind, version, time.time()),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def append(self, path: str, item: Any) -> int:
+        """Append ``item`` to a row-backed list dataset; return its ``seq``."""
+        name = dataset_name(path)
+        table, cols, to_rows, _from_rows = _TABLES[name]
+        row = to_rows([item])[0]
+        conn = self.connect(path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # read under the write lock, so concurrent appends each bump the version
+            meta = self._meta(conn, name)
+            if meta is not None and meta[0] == "document":
+                doc = conn.execute(
+                    "SELECT doc FROM documents WHERE name = ?", (name,)
+                ).fetchone()
+                data = json.loads(doc[0]) if doc else None
+                conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+                rows = to_rows(data if isinstance(data, list) else [])
+                self._sync_rows(conn, table, cols, rows)
+            seq = conn.execute(
+                f"SELECT COALESCE(MAX(seq) + ?, 0) FROM {table}", (_SEQ_GAP,)
+            ).fetchone()[0]
+            conn.execute(
+                f"INSERT INTO {table} (seq, {', '.join(cols)}, doc)"
+                f" VALUES ({', '.join('?' for _ in range(len(cols) + 2))})",
+                (seq,) + row,
+            )
+            version = (meta[1] if meta else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets (name, kind, version, updated)"
+                " VALUES (?, 'rows', ?, ?)",
+                (name, version, time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return seq
+
+    def update_rows(
+        self, path: str, items: Sequence[Any], removed: Sequence[Tuple[Any, ...]]
+    ) -> Optional[int]:
+        """Upsert ``items`` and delete the rows keyed ``removed`` without a full diff.
+
+        For row-backed list datasets whose key columns identify one row:
+        items are matched on their key and new ones are appended. Returns
+        the number of rows touched, or ``None`` when the dataset is not
+        stored as rows yet (write it whole instead).
+        """
+        name = dataset_name(path)
+        spec = _TABLES.get(name)
+        if spec is None:
+            return None
+        table, cols, to_rows, _from_rows = spec
+        where = " AND ".join(f"{c} IS ?" for c in cols)
+        placeholders = ", ".join("?" for _ in range(len(cols) + 2))
+        conn = self.connect(path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            meta = self._meta(conn, name)
+            if meta is None or meta[0] != "rows":
+                conn.execute("ROLLBACK")
+                return None
+            changed = 0
+            for key in removed:
+                changed += conn.execute(f"DELETE FROM {table} WHERE {where}", key).rowcount
+            for row in to_rows(list(items)) or []:
+                cur = conn.execute(
+                    f"UPDATE {table} SET doc = ? WHERE {where}", (row[-1],) + row[:-1]
+                )
+                if not cur.rowcount:
+                    seq = conn.execute(
+                        f"SELECT COALESCE(MAX(seq) + ?, 0) FROM {table}", (_SEQ_GAP,)
+                    ).fetchone()[0]
+                    conn.execute(
+                        f"INSERT INTO {table} (seq, {', '.join(cols)}, doc)"
+                        f" VALUES ({placeholders})",
+                        (seq,) + row,
+                    )
+                changed += 1
+            if changed:
+                conn.execute(
+                    "UPDATE datasets SET version = ?, updated = ? WHERE name = ?",
+                    (meta[1] + 1, time.time(), name),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    @staticmethod
+    def _sync_rows(
+        conn: sqlite3.Connection,
+        table: str,
+        cols: Sequence[str],
+        rows: List[Tuple[Any, ...]],
+    ) -> int:
+        """Diff ``rows`` against ``table`` by key; only changed rows are written.
+
+        Rows are matched on their key columns (the n-th row with a key to
+        the n-th stored one). ``seq`` only orders the rows: matched rows
+        that are still in order keep theirs, the others get one in the gap
+        between their neighbours, so inserting or deleting a row leaves the
+        rows after it alone. Only when a gap is too small is the whole
+        table renumbered.
+        """
+        width = len(cols)
+        existing = conn.execute(
+            f"SELECT seq, {', '.join(cols)}, doc FROM {table} ORDER BY seq"
+        ).fetchall()
+        stored: Dict[Tuple[Any, ...], List[Tuple[int, str]]] = {}
+        for seq, *values in existing:
+            stored.setdefault(tuple(values[:width]), []).append((seq, values[width]))
+        # (seq, doc) of the stored row each new row replaces, or None
+        matched: List[Optional[Tuple[int, str]]] = []
+        taken: Dict[Tuple[Any, ...], int] = {}
+        for row in rows:
+            key = row[:width]
+            nth = taken[key] = taken.get(key, -1) + 1
+            candidates = stored.get(key, [])
+            matched.append(candidates[nth] if nth < len(candidates) else None)
+
+        kept = _increasing_run([m[0] if m else None for m in matched])
+        seqs = _fill_gaps([matched[i][0] if i in kept else None for i in range(len(rows))])
+        if seqs is None:
+            conn.execute(f"DELETE FROM {table}")
+            kept, seqs = set(), [i * _SEQ_GAP for i in range(len(rows))]
+            changed = max(len(existing), len(rows))
+        else:
+            keep = {matched[i][0] for i in kept}
+            # moved rows are deleted here and inserted again below
+            changed = conn.executemany(
+                f"DELETE FROM {table} WHERE seq = ?",
+                [(row[0],) for row in existing if row[0] not in keep],
+            ).rowcount
+            changed += sum(1 for m in matched if m is None)
+        placeholders = ", ".join("?" for _ in range(width + 2))
+        for i, row in enumerate(rows):
+            if i not in kept:
+                conn.execute(
+                    f"INSERT INTO {table} (seq, {', '.join(cols)}, doc)"
+                    f" VALUES ({placeholders})",
+                    (seqs[i],) + row,
+                )
+            elif matched[i][1] != row[-1]:
+                conn.execute(f"UPDATE {table} SET doc = ? WHERE seq = ?", (row[-1], seqs[i]))
+                changed += 1
+        return changed
+
+    def etag(self, path: str) -> str:
+        sig = self.signature(path)
+        if sig is None:
+            raise FileNotFoundError(path)
+        return hashlib.sha256(repr(sig).encode("utf-8")).hexdigest()
+
+    def last_modified(self, path: str) -> float:
+        meta = self._meta(self.connect(path), dataset_name(path))
+        if meta is None:
+            raise FileNotFoundError(path)
+        return meta[2]
+
+    def datasets(self, path: str) -> List[str]:
+        """Return dataset names stored in the database serving ``path``."""
+        rows = self.connect(path).execute("SELECT name FROM datasets ORDER BY name")
+        return [r[0] for r in rows]
+
+
+_BACKENDS = {"json": JsonBackend(), "sqlite": SqliteBackend()}
+
+
+def get_backend():
+    """Return the backend selected by ``APP_STORAGE_BACKEND`` (default ``json``)."""
+    name = os.environ.get("APP_STORAGE_BACKEND", "json").strip().lower() or "json"
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown storage backend {name!r}") from None
+
+
+def signature(path: str) -> Optional[Tuple[Any, ...]]:
+    """Return the active backend's version signature for ``path``."""
+    return get_backend().signature(path)
+
+
+def import_json(data_dir: str) -> Dict[str, int]:
+    """Copy every ``*.json`` dataset in ``data_dir`` into SQLite.
+
+    Returns a mapping of dataset name to the number of rows written.
+    Files that cannot be parsed are skipped.
+    """
+    source, target = _BACKENDS["json"], _BACKENDS["sqlite"]
+    written: Dict[str, int] = {}
+    for fn in sorted(os.listdir(data_dir)):
+        if not fn.endswith(".json"):
+            continue
+        path = os.path.join(data_dir, fn)
+        try:
+            data = source.read(path)
+        except (OSError, json.JSONDecodeError):
+            continue
+        written[dataset_name(path)] = target.write(path, data)
+    return written
+
+
+def export_json(data_dir: str) -> List[str]:
+    """Write every dataset stored in SQLite back to ``data_dir`` as JSON."""
+    source, target = _BACKENDS["sqlite"], _BACKENDS["json"]
+    probe = os.path.join(data_dir, DB_NAME)
+    paths = []
+    for name in source.datasets(probe):
+        path = os.path.join(data_dir, f"{name}.json")
+        target.write(path, source.read(path), atomic=True)
+        paths.append(path)
+    return paths
@@ -0,0 +1,43 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Iterable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from app.utils.history_log import history_store, migrate_json_array  # noqa: E402
+
+HISTORY_PATH = ROOT / "app" / "data" / "history.json"
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the history log")
+    parser.add_argument("command", choices=["migrate", "compact"])
+    parser.add_argument(
+        "--history",
+        default=str(HISTORY_PATH),
+        help="legacy history.json path; the log lives next to it",
+    )
+    args = parser.parse_args(argv)
+    json_path = Path(args.history)
+
+    if args.command == "migrate":
+        log_path = json_path.with_suffix(".jsonl")
+        if log_path.exists():
+            print(f"{log_path} already exists; nothing to migrate")
+            return 1
+        count = migrate_json_array(str(json_path), str(log_path))
+        print(f"Migrated {count} entries to {log_path}")
+        return 0
+
+    stats = history_store(str(json_path)).compact()
+    print(
+        f"Compacted {stats['entries']} entries"
+        f" ({stats['dropped']} unreadable lines dropped)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
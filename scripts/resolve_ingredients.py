@@ -0,0 +1,89 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from app.utils import load_json, save_json, thaw  # noqa: E402
+from app.utils.ingredient_resolver import (  # noqa: E402
+    apply_patch,
+    build_tables,
+    resolve_unresolved,
+)
+from app.utils.product_io import load_products_nested  # noqa: E402
+
+DATA_DIR = ROOT / "app" / "data"
+
+
+def _resolve(args: argparse.Namespace) -> int:
+    data_dir = Path(args.data_dir)
+    entries = load_json(str(data_dir / "recipes_unresolved.json"), [])
+    if not entries:
+        print(f"no notes found in {data_dir / 'recipes_unresolved.json'}")
+        return 1
+    recipes = load_json(str(data_dir / "recipes.json"), [])
+    tables = build_tables(
+        load_products_nested(str(data_dir / "products.json")),
+        load_json(str(data_dir / "units.json"), []),
+        recipes,
+    )
+    patch, stats = resolve_unresolved(entries, tables, recipes, workers=args.workers)
+    output = Path(args.output)
+    output.write_text(json.dumps(patch, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    print(
+        f"Resolved {stats['resolved']}/{stats['notes']} notes "
+        f"({stats['resolutionRate']:.1%}); patch written to {output}"
+    )
+    return 0
+
+
+def _apply(args: argparse.Namespace) -> int:
+    data_dir = Path(args.data_dir)
+    patch = json.loads(Path(args.patch).read_text(encoding="utf-8"))
+    recipes_path = str(data_dir / "recipes.json")
+    recipes = thaw(load_json(recipes_path, []))
+    updated = apply_patch(recipes, patch)
+    if updated:
+        save_json(recipes_path, recipes)
+    print(f"Updated {updated} ingredients in {recipes_path}")
+    return 0
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Resolve recipes_unresolved.json notes into a reviewable patch"
+    )
+    parser.add_argument("command", choices=["resolve", "apply"])
+    parser.add_argument(
+        "--data-dir",
+        default=str(DATA_DIR),
+        help="directory holding recipes, units, products and unresolved notes",
+    )
+    parser.add_argument(
+        "--output",
+        default="resolution_patch.json",
+        help="where `resolve` writes the patch",
+    )
+    parser.add_argument(
+        "--patch",
+        default="resolution_patch.json",
+        help="reviewed patch read by `apply`",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes for large inputs (0 disables the pool)",
+    )
+    args = parser.parse_args(argv)
+    if args.command == "resolve":
+        return _resolve(args)
+    return _apply(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
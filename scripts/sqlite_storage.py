@@ -0,0 +1,44 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Iterable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from app.utils.storage import DB_NAME, export_json, import_json  # noqa: E402
+
+DATA_DIR = ROOT / "app" / "data"
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Copy datasets between JSON files and the SQLite backend"
+    )
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument(
+        "--data-dir",
+        default=str(DATA_DIR),
+        help="directory holding the JSON files and the SQLite database",
+    )
+    args = parser.parse_args(argv)
+    data_dir = Path(args.data_dir)
+
+    if args.command == "import":
+        written = import_json(str(data_dir))
+        for name, rows in written.items():
+            print(f"{name}: {rows} rows written")
+        print(f"Imported {len(written)} datasets into {data_dir / DB_NAME}")
+        return 0
+
+    if not (data_dir / DB_NAME).exists():
+        print(f"{DB_NAME} not found in {data_dir}")
+        return 1
+    paths = export_json(str(data_dir))
+    for path in paths:
+        print(f"wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils import alias_scanner
+from app.utils.alias_scanner import AliasScanner, build_patterns, scanner_for
+from app.utils.product_io import save_products_nested
+
+
+def _product(name):
+    return {
+        "name": name,
+        "quantity": 1,
+        "unit": "szt",
+        "storage": "storage.pantry",
+        "category": "category.misc",
+        "threshold": 1,
+        "main": True,
+        "is_spice": False,
+        "tags": [],
+    }
+
+
+def _naive(text, patterns):
+    """All boundary-respecting hits found by brute force, leftmost-longest."""
+    norm, origin = alias_scanner._normalize_with_offsets(text)
+    found = []
+    for pattern, pid in patterns.items():
+        start = norm.find(pattern)
+        while start != -1:
+            end = start + len(pattern)
+            if alias_scanner._is_boundary(norm, start - 1) and alias_scanner._is_boundary(norm, end):
+                found.append((start, end, pid))
+            start = norm.find(pattern, start + 1)
+    hits, covered = [], 0
+    for start, end, pid in sorted(found, key=lambda h: (h[0], -h[1])):
+        if start >= covered:
+            covered = end
+            hits.append((pid, origin[start], origin[end - 1] + 1))
+    return hits
+
+
+def test_offsets_point_into_original_text():
+    scanner = AliasScanner(build_patterns([
+        {"name": "żurek"},
+        {"name": "maslo", "aliases": ["Masło extra"]},
+        {"name": "ser"},
+    ]))
+    text = "PARAGON\nŻUREK 4,99\nMASŁO EXTRA 82% 7,49\nseler 2,10"
+    hits = scanner.scan(text)
+    assert [(h["productId"], h["text"]) for h in hits] == [
+        ("żurek", "ŻUREK"),
+        ("maslo", "MASŁO EXTRA"),
+    ]
+    for hit in hits:
+        assert text[hit["start"] : hit["end"]] == hit["text"]
+
+
+def test_matches_brute_force_scan():
+    patterns = build_patterns(
+        [{"name": n} for n in ["ab", "abc", "bc", "c", "abcd", "d a", "cab"]]
+    )
+    scanner = AliasScanner(patterns)
+    for text in ["abcd a", "c ab abc", "cab-c,d a", "xabc abcd", "bc c c"]:
+        hits = [(h["productId"], h["start"], h["end"]) for h in scanner.scan(text)]
+        assert hits == _naive(text, patterns)
+
+
+def test_rebuilds_only_when_patterns_change(tmp_path):
+    path = str(tmp_path / "products.json")
+    products = [_product("mleko")]
+    save_products_nested(path, products)
+    first = scanner_for(path)
+
+    products[0]["quantity"] = 3
+    save_products_nested(path, products)
+    assert scanner_for(path) is first
+
+    save_products_nested(path, products + [_product("ryz")])
+    second = scanner_for(path)
+    assert second is not first
+    assert [h["productId"] for h in second.scan("ryz, mleko")] == ["ryz", "mleko"]
+
+
+def test_scan_endpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / "products.json")
+    save_products_nested(path, [_product("mleko")])
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", path)
+    client = create_app().test_client()
+
+    resp = client.post("/api/ocr-scan", json={"text": "2x Mleko 3,49"})
+    assert resp.get_json() == [{"productId": "mleko", "start": 3, "end": 8, "text": "Mleko"}]
+    assert client.post("/api/ocr-scan", json={"text": 5}).status_code == 400
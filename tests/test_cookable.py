@@ -0,0 +1,214 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils.cookable import COOKABLE, CookableIndex
+from app.utils.product_io import ProductSnapshot, save_products_nested
+from tests.utils import convert_flat_to_nested
+
+PIDS = [f"prod.p{i}" for i in range(8)]
+UNITS = [("unit.g", "g"), ("unit.kg", "g"), ("unit.ml", "ml"), ("unit.szt", "szt")]
+
+
+def _product(name, quantity, unit):
+    return {
+        "name": name,
+        "quantity": quantity,
+        "unit": unit,
+        "category": "category.grains",
+        "storage": "storage.pantry",
+        "threshold": 1,
+        "main": True,
+        "is_spice": False,
+        "tags": [],
+    }
+
+
+def _random_data(rng, recipes=30, products=12):
+    recs = []
+    for r in range(recipes):
+        ings = []
+        for _ in range(rng.randint(0, 5)):
+            unit_id, _ = rng.choice(UNITS)
+            ings.append(
+                {
+                    "productId": rng.choice(PIDS),
+                    "qty": rng.choice([0.5, 1, 2, 100, 250]),
+                    "unitId": unit_id,
+                    "optional": rng.random() < 0.2,
+                }
+            )
+        recs.append(
+            {
+                "id": f"recipe.r{r:02d}",
+                "names": {"pl": f"R{r}", "en": f"R{r}"},
+                "portions": rng.randint(1, 4),
+                "time": "",
+                "ingredients": ings,
+                "steps": [],
+                "tags": [],
+            }
+        )
+    prods = [
+        _product(
+            rng.choice(PIDS),
+            rng.choice([0, 1, 3, 200, 900]),
+            rng.choice(["g", "kg", "ml", "szt"]),
+        )
+        for _ in range(products)
+    ]
+    return recs, prods
+
+
+def _reference(recipes, products, servings=None, max_missing=None):
+    stock = {}
+    for p in products:
+        qty, unit = routes._product_base(p)
+        stock[(p["name"], unit)] = stock.get((p["name"], unit), 0) + qty
+    rows = []
+    for rec in recipes:
+        scale = servings if servings is not None else rec["portions"]
+        needs = {}
+        for ing in rec["ingredients"]:
+            if ing["optional"]:
+                continue
+            qty, unit = routes._to_base(ing["qty"], ing["unitId"])
+            key = (ing["productId"], unit)
+            needs[key] = needs.get(key, 0) + qty / rec["portions"]
+        have = sum(1 for k, q in needs.items() if stock.get(k, 0) + 1e-9 >= q * scale)
+        missing = len(needs) - have
+        if max_missing is not None and missing > max_missing:
+            continue
+        coverage = have / len(needs) if needs else 1.0
+        rows.append((-coverage, missing, rec["id"]))
+    return [rid for _, _, rid in sorted(rows)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ranking_matches_brute_force(seed):
+    rng = random.Random(seed)
+    recipes, products = _random_data(rng)
+    index = CookableIndex(recipes, routes._to_base, routes._product_base)
+    index.update_stock(ProductSnapshot.of(products))
+    for servings in (None, 1, 6):
+        for max_missing in (None, 0, 2):
+            got = [r["id"] for r in index.rank(servings, max_missing)]
+            assert got == _reference(recipes, products, servings, max_missing)
+
+
+def test_stock_changes_recount_only_affected_recipes():
+    rng = random.Random(42)
+    recipes, products = _random_data(rng)
+    index = CookableIndex(recipes, routes._to_base, routes._product_base)
+    snap = ProductSnapshot.of(products)
+    index.update_stock(snap)
+    index.rank(2)
+    for _ in range(20):
+        changed = list(products)
+        idx = rng.randrange(len(changed))
+        changed[idx] = dict(changed[idx], quantity=rng.choice([0, 5, 1000]))
+        snap = snap.updated(changed)
+        affected = index.update_stock(snap)
+        users = {
+            i
+            for i, r in enumerate(recipes)
+            for ing in r["ingredients"]
+            if ing["productId"] == changed[idx]["name"] and not ing["optional"]
+        }
+        assert affected <= users
+        products = changed
+        for servings in (None, 2):
+            got = [r["id"] for r in index.rank(servings)]
+            assert got == _reference(recipes, products, servings)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    recipes = [
+        {
+            "id": "recipe.omelette",
+            "names": {"pl": "Omlet", "en": "Omelette"},
+            "portions": 1,
+            "time": "",
+            "ingredients": [
+                {"productId": "prod.egg", "qty": 2, "unitId": "unit.szt", "optional": False},
+                {"productId": "prod.milk", "qty": 0.1, "unitId": "unit.l", "optional": False},
+                {"productId": "prod.chives", "qty": 5, "unitId": "unit.g", "optional": True},
+            ],
+            "steps": [],
+            "tags": [],
+        },
+        {
+            "id": "recipe.rice",
+            "names": {"pl": "Ryż", "en": "Rice"},
+            "portions": 2,
+            "time": "",
+            "ingredients": [
+                {"productId": "prod.rice", "qty": 0.2, "unitId": "unit.kg", "optional": False},
+                {"productId": "prod.salt", "qty": 5, "unitId": "unit.g", "optional": False},
+            ],
+            "steps": [],
+            "tags": [],
+        },
+    ]
+    products = [
+        _product("prod.egg", 4, "szt"),
+        _product("prod.milk", 500, "ml"),
+        _product("prod.rice", 250, "g"),
+    ]
+    prod_path = tmp_path / "products.json"
+    rec_path = tmp_path / "recipes.json"
+    prod_path.write_text(json.dumps(convert_flat_to_nested(products)))
+    rec_path.write_text(json.dumps(recipes))
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", str(prod_path))
+    monkeypatch.setattr(routes, "RECIPES_PATH", str(rec_path))
+    COOKABLE.clear()
+    return create_app().test_client()
+
+
+def test_cookable_endpoint(client):
+    data = client.get("/api/recipes/cookable").get_json()
+    assert [r["id"] for r in data] == ["recipe.omelette", "recipe.rice"]
+    assert data[0]["coverage"] == 1.0 and data[0]["missing"] == []
+    rice = data[1]
+    assert rice["coverage"] == 0.5 and rice["required"] == 2
+    assert rice["missing"] == [
+        {"productId": "prod.salt", "unitId": "unit.g", "needed": 5.0, "available": 0.0}
+    ]
+
+    # three omelettes need 6 eggs
+    data = client.get("/api/recipes/cookable?servings=3").get_json()
+    omelette = next(r for r in data if r["id"] == "recipe.omelette")
+    assert omelette["servings"] == 3.0
+    assert omelette["missing"][0]["productId"] == "prod.egg"
+
+    data = client.get("/api/recipes/cookable?max_missing=0").get_json()
+    assert [r["id"] for r in data] == ["recipe.omelette"]
+    assert len(client.get("/api/recipes/cookable?limit=1").get_json()) == 1
+
+
+def test_cookable_follows_stock_changes(client):
+    client.get("/api/recipes/cookable")
+    save_products_nested(
+        routes.PRODUCTS_PATH,
+        [
+            _product("prod.egg", 4, "szt"),
+            _product("prod.milk", 500, "ml"),
+            _product("prod.rice", 1, "kg"),
+            _product("prod.salt", 10, "g"),
+        ],
+    )
+    data = client.get("/api/recipes/cookable?max_missing=0").get_json()
+    assert {r["id"] for r in data} == {"recipe.omelette", "recipe.rice"}
+
+
+@pytest.mark.parametrize("query", ["servings=0", "servings=abc", "max_missing=-1", "limit=0"])
+def test_cookable_rejects_bad_params(client, query):
+    assert client.get(f"/api/recipes/cookable?{query}").status_code == 400
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.utils import DATASETS, load_json, save_json, safe_write
+from app.utils.product_io import load_products_nested, save_products_nested
+from tests.utils import convert_flat_to_nested
+
+
+def test_load_json_returns_cached_read_only_view(tmp_path):
+    path = tmp_path / "units.json"
+    path.write_text(json.dumps([{"id": "unit.g"}]))
+
+    first = load_json(str(path), [])
+    second = load_json(str(path), [])
+    assert first is second
+    assert first == [{"id": "unit.g"}]
+    with pytest.raises(TypeError):
+        first.append({"id": "unit.kg"})
+    with pytest.raises(TypeError):
+        first[0]["id"] = "unit.kg"
+    # serializes like plain JSON containers
+    assert json.loads(json.dumps(first)) == [{"id": "unit.g"}]
+
+
+def test_external_change_reloads(tmp_path):
+    path = tmp_path / "units.json"
+    path.write_text(json.dumps([{"id": "unit.g"}]))
+    assert load_json(str(path), []) == [{"id": "unit.g"}]
+
+    path.write_text(json.dumps([{"id": "unit.g"}, {"id": "unit.kg"}]))
+    assert len(load_json(str(path), [])) == 2
+
+
+def test_writers_invalidate(tmp_path):
+    path = str(tmp_path / "favorites.json")
+    save_json(path, ["a"])
+    assert load_json(path, []) == ["a"]
+    before = DATASETS.stats()["invalidations"]
+
+    safe_write(path, ["a", "b"])
+    assert DATASETS.stats()["invalidations"] == before + 1
+    assert load_json(path, []) == ["a", "b"]
+
+    save_json(path, ["c"])
+    assert load_json(path, []) == ["c"]
+
+
+def test_products_nested_copies_are_mutable(tmp_path):
+    path = tmp_path / "products.json"
+    products = [
+        {
+            "name": "rice",
+            "quantity": 1,
+            "unit": "kg",
+            "threshold": 1,
+            "main": True,
+            "is_spice": False,
+            "tags": [],
+        }
+    ]
+    path.write_text(json.dumps(convert_flat_to_nested(products)))
+
+    flat = load_products_nested(str(path))
+    flat[0]["quantity"] = 3
+    save_products_nested(str(path), flat)
+    assert load_products_nested(str(path))[0]["quantity"] == 3
+
+
+def test_missing_file_is_not_cached(tmp_path):
+    path = str(tmp_path / "missing.json")
+    default = []
+    assert load_json(path, default) is default
+    save_json(path, ["x"])
+    assert load_json(path, []) == ["x"]
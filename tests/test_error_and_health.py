@@ -6,6 +6,9 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 import app.routes as routes
 from app import create_app
+from app.utils import DATASETS
+from app.utils.product_io import clear_repositories
+from app.utils.response_cache import RESPONSES
 
 def test_products_error_returns_traceid(monkeypatch):
     app = create_app()
@@ -14,6 +17,10 @@ def test_products_error_returns_traceid(monkeypatch):
     def boom(*args, **kwargs):
         raise OSError("boom")
 
+    # cached datasets would otherwise be served without touching the file
+    DATASETS.clear()
+    RESPONSES.clear()
+    clear_repositories()
     monkeypatch.setattr(__import__("builtins"), "open", boom)
     resp = client.get("/api/products")
     assert resp.status_code == 500
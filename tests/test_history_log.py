@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils.history_log import HistoryLog, migrate_json_array
+from app.utils.storage import get_backend
+from scripts import history_log as history_cli
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "HISTORY_PATH", str(tmp_path / "history.json"))
+    return create_app().test_client()
+
+
+def test_post_returns_only_new_entry(client, tmp_path):
+    first = client.post("/api/history", json={"recipe": "a", "date": "2024-01-02"})
+    assert first.get_json() == {"recipe": "a", "date": "2024-01-02"}
+    second = client.post("/api/history", json={"recipe": "b"})
+    assert second.get_json()["recipe"] == "b"
+    assert "date" in second.get_json()
+
+    lines = (tmp_path / "history.jsonl").read_text().splitlines()
+    assert len(lines) == 2
+    assert len((tmp_path / "history.jsonl.idx").read_text().splitlines()) == 2
+
+
+def test_get_filters_and_pages(client):
+    for day in ("2024-01-03", "2024-01-01", "2024-01-02", "2024-01-02"):
+        client.post("/api/history", json={"date": day})
+
+    resp = client.get("/api/history")
+    assert [e["date"] for e in resp.get_json()] == [
+        "2024-01-01",
+        "2024-01-02",
+        "2024-01-02",
+        "2024-01-03",
+    ]
+
+    resp = client.get("/api/history?from=2024-01-02&to=2024-01-02")
+    assert len(resp.get_json()) == 2
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/history?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url)
+        seen.extend(e["date"] for e in resp.get_json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-03"]
+
+
+def test_invalid_paging_params(client):
+    assert client.get("/api/history?limit=0").status_code == 400
+    assert client.get("/api/history?cursor=%%%").status_code == 400
+
+
+def test_migration_from_json_array(client, tmp_path):
+    legacy = [{"date": "2023-12-31", "recipe": "x"}, {"date": "2023-12-30"}]
+    (tmp_path / "history.json").write_text(json.dumps(legacy))
+    resp = client.get("/api/history")
+    assert [e["date"] for e in resp.get_json()] == ["2023-12-30", "2023-12-31"]
+    assert migrate_json_array(str(tmp_path / "history.json"), str(tmp_path / "history.jsonl")) == 0
+
+
+def test_recovers_index_and_compacts(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    log = HistoryLog(path)
+    log.append({"date": "2024-02-02"})
+    log.append({"date": "2024-02-01"})
+
+    # simulate a crash after the log write but before the index write
+    with open(path, "ab") as fh:
+        fh.write(b'{"date": "2024-01-31"}\n')
+        fh.write(b"not json\n")
+    fresh = HistoryLog(path)
+    assert fresh.count() == 3
+    assert fresh.errors
+
+    stats = fresh.compact()
+    assert stats == {"entries": 3, "dropped": 1, "bytes": os.path.getsize(path)}
+    dates = [json.loads(line)["date"] for line in open(path, encoding="utf-8")]
+    assert dates == ["2024-01-31", "2024-02-01", "2024-02-02"]
+    assert HistoryLog(path).query(limit=1)[0] == [{"date": "2024-01-31"}]
+
+
+def test_compact_cli(tmp_path, capsys):
+    (tmp_path / "history.json").write_text(json.dumps([{"date": "2024-01-01"}]))
+    assert history_cli.main(["migrate", "--history", str(tmp_path / "history.json")]) == 0
+    assert history_cli.main(["compact", "--history", str(tmp_path / "history.json")]) == 0
+    assert "Compacted 1 entries" in capsys.readouterr().out
+
+
+def test_sqlite_history_uses_table(client, monkeypatch):
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "sqlite")
+    try:
+        client.post("/api/history", json={"date": "2024-03-02"})
+        client.post("/api/history", json={"date": "2024-03-01"})
+        resp = client.get("/api/history?limit=1")
+        assert resp.get_json() == [{"date": "2024-03-01"}]
+        cursor = resp.headers["X-Next-Cursor"]
+        resp = client.get(f"/api/history?limit=1&cursor={cursor}")
+        assert resp.get_json() == [{"date": "2024-03-02"}]
+        assert "X-Next-Cursor" not in resp.headers
+    finally:
+        get_backend().close()
+
+
+@pytest.mark.parametrize(
+    "bad",
+    ["2024-01-02\t7", "2024-01-02\n", "yesterday", 20240102, "20240102", "2024-W01", "2024-13-01"],
+)
+def test_post_rejects_malformed_dates(client, bad):
+    client.post("/api/history", json={"date": "2024-01-01"})
+    assert client.post("/api/history", json={"date": bad}).status_code == 400
+    assert [e["date"] for e in client.get("/api/history").get_json()] == ["2024-01-01"]
+
+
+def test_control_characters_in_dates_do_not_corrupt_the_index(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    log = HistoryLog(path)
+    log.append({"date": "2024-01-02\t1\n2"})
+    log.append({"date": "2024-01-01"})
+    # a fresh reader rebuilds its keys from the sidecar
+    assert HistoryLog(path).count() == 2
+    assert HistoryLog(path).query(date_from="2024-01-01")[0] == [{"date": "2024-01-01"}]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_to_includes_timestamped_entries_of_that_day(client, monkeypatch, backend):
+    monkeypatch.setenv("APP_STORAGE_BACKEND", backend)
+    try:
+        for day in ("2024-01-02T10:00:00", "2024-01-02", "2024-01-03T00:00", "2024-01-01T23:59"):
+            assert client.post("/api/history", json={"date": day}).status_code == 200
+        resp = client.get("/api/history?from=2024-01-02&to=2024-01-02")
+        assert [e["date"] for e in resp.get_json()] == ["2024-01-02", "2024-01-02T10:00:00"]
+        resp = client.get("/api/history?to=2024-01-02T10:00")
+        assert [e["date"] for e in resp.get_json()] == [
+            "2024-01-01T23:59",
+            "2024-01-02",
+            "2024-01-02T10:00:00",
+        ]
+    finally:
+        if backend == "sqlite":
+            get_backend().close()
@@ -4,9 +4,12 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import app.routes as routes
 from app import create_app
 from app.routes import PRODUCTS_PATH, RECIPES_PATH
+from app.utils import conditional
 from app.utils.product_io import load_products_nested, save_products_nested
+from app.utils.storage import JsonBackend
 
 def _modify_file(path, mutate):
     with open(path, "r", encoding="utf-8") as fh:
@@ -88,3 +91,40 @@ def test_recipes_etag_and_conditional_headers():
     finally:
         with open(RECIPES_PATH, "w", encoding="utf-8") as fh:
             fh.write(original)
+
+
+def test_conditional_get_skips_data_work(monkeypatch):
+    client = create_app().test_client()
+    products_etag = client.get("/api/products").headers["ETag"]
+    recipes_etag = client.get("/api/recipes?locale=en").headers["ETag"]
+
+    def boom(*args, **kwargs):
+        raise AssertionError("data loaded for a conditional hit")
+
+    hashed = []
+    real_etag = JsonBackend.etag
+    monkeypatch.setattr(JsonBackend, "etag", lambda self, p: hashed.append(p) or real_etag(self, p))
+    monkeypatch.setattr(routes, "product_repository", boom)
+    monkeypatch.setattr(routes, "_recipe_view", boom)
+
+    resp = client.get("/api/products", headers={"If-None-Match": f'W/"{products_etag}"'})
+    assert resp.status_code == 304
+    resp = client.get("/api/recipes?locale=en", headers={"If-None-Match": f'"x", "{recipes_etag}"'})
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == recipes_etag
+    assert hashed == []
+
+
+def test_recipe_etag_depends_on_params():
+    conditional.clear()
+    client = create_app().test_client()
+    urls = [
+        "/api/recipes?locale=en",
+        "/api/recipes?locale=pl",
+        "/api/recipes?locale=en&page=2&page_size=1",
+        "/api/recipes?locale=en&sort_by=time&order=desc",
+    ]
+    etags = [client.get(url).headers["ETag"] for url in urls]
+    assert len(set(etags)) == len(urls)
+    resp = client.get(urls[1], headers={"If-None-Match": etags[0]})
+    assert resp.status_code == 200
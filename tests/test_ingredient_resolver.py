@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.utils import ingredient_resolver
+from app.utils.ingredient_resolver import (
+    apply_patch,
+    build_tables,
+    parse_note,
+    resolve_notes,
+    resolve_unresolved,
+)
+from scripts import resolve_ingredients
+
+UNITS = [
+    {"id": "unit.g", "names": {"pl": "g", "en": "g"}},
+    {"id": "unit.szt", "names": {"pl": "szt", "en": "pcs"}},
+    {"id": "unit.lyzka", "names": {"pl": "łyżka", "en": "tbsp"}},
+]
+
+
+def _recipes():
+    return [
+        {
+            "id": "recipe.soup",
+            "names": {"pl": "Zupa", "en": "Soup"},
+            "ingredients": [
+                {"productId": "prod.tofu", "qty": 1, "unitId": "unit.szt", "optional": False},
+                {"productId": None, "qty": 2, "unitId": None, "optional": False,
+                 "note": "product.sour_cream_18 2,5 łyżka", "unresolved": True},
+                {"productId": None, "qty": 0, "unitId": None, "optional": False,
+                 "note": "product.salt 1.0 do_smaczenia", "unresolved": True},
+            ],
+        }
+    ]
+
+
+def _tables():
+    products = [{"name": "product.sour_cream_18", "aliases": ["kwasna smietana"]}]
+    return build_tables(products, UNITS, _recipes())
+
+
+@pytest.mark.parametrize(
+    "note, expected",
+    [
+        ("product.tofu 180.0 g", ("product.tofu", 180.0, "g")),
+        ("product.thyme 1/2 lyzeczka", ("product.thyme", 0.5, "lyzeczka")),
+        ("2 szt jajka", ("jajka", 2.0, "szt")),
+        ("sól do smaku", ("sól do smaku", None, "")),
+        ("maka ½ szklanka", ("maka", 0.5, "szklanka")),
+        ("inf eggs", ("inf eggs", None, "")),
+        ("product.egg nan 2 szt", ("product.egg nan", 2.0, "szt")),
+        ("Infinity 3 g", ("Infinity", 3.0, "g")),
+    ],
+)
+def test_parse_note(note, expected):
+    assert parse_note(note) == expected
+
+
+def test_resolves_products_and_units():
+    tables = _tables()
+    resolved = resolve_notes(
+        ["product.sour_cream_18 2,5 łyżka", "product.tofu 3 pcs", "product.salt 1.0 do_smaczenia"],
+        tables,
+    )
+    cream = resolved["product.sour_cream_18 2,5 łyżka"]
+    assert (cream["productId"], cream["qty"], cream["unitId"]) == (
+        "product.sour_cream_18",
+        2.5,
+        "unit.lyzka",
+    )
+    tofu = resolved["product.tofu 3 pcs"]
+    assert (tofu["productId"], tofu["unitId"], tofu["missing"]) == ("prod.tofu", "unit.szt", [])
+    assert resolved["product.salt 1.0 do_smaczenia"]["missing"] == ["productId", "unitId"]
+
+
+def test_patch_stats_and_apply():
+    entries = [
+        {"note": "product.sour_cream_18 2,5 łyżka", "recipeId": "recipe.soup"},
+        {"note": "product.salt 1.0 do_smaczenia", "recipeId": "recipe.soup"},
+    ]
+    recipes = _recipes()
+    patch, stats = resolve_unresolved(entries, _tables(), recipes)
+    assert [p["ingredient"] for p in patch] == [1, 2]
+    assert stats["notes"] == 2
+    assert stats["resolved"] == 1
+    assert stats["resolutionRate"] == 0.5
+    assert stats["unknownUnits"] == {"do_smaczenia": 1}
+
+    assert apply_patch(recipes, patch) == 2
+    cream, salt = recipes[0]["ingredients"][1:]
+    assert cream["qty"] == 2.5 and cream["unitId"] == "unit.lyzka"
+    assert "unresolved" not in cream
+    assert salt["qty"] == 1.0 and salt["unresolved"] is True
+    assert apply_patch(recipes, patch) == 0
+
+
+def test_process_pool_matches_serial(monkeypatch):
+    monkeypatch.setattr(ingredient_resolver, "PARALLEL_MIN", 10)
+    notes = [f"product.tofu {i} g" for i in range(40)] + ["product.sour_cream_18 1 tbsp"]
+    tables = _tables()
+    parallel = resolve_notes(notes, tables, workers=2)
+    assert parallel == resolve_notes(notes, tables, workers=0)
+
+
+def test_cli_resolve_and_apply(tmp_path, capsys):
+    other = {
+        "id": "recipe.other",
+        "ingredients": [{"productId": "prod.sour-cream-18", "qty": 1, "unitId": "unit.g"}],
+    }
+    (tmp_path / "recipes.json").write_text(json.dumps(_recipes() + [other]))
+    (tmp_path / "units.json").write_text(json.dumps(UNITS))
+    (tmp_path / "recipes_unresolved.json").write_text(
+        json.dumps([{"note": "product.sour_cream_18 2,5 łyżka", "recipeId": "recipe.soup"}])
+    )
+    patch_path = tmp_path / "patch.json"
+    args = ["--data-dir", str(tmp_path)]
+    assert resolve_ingredients.main(["resolve", *args, "--output", str(patch_path)]) == 0
+    assert "Resolved 1/1 notes" in capsys.readouterr().out
+    assert json.loads(patch_path.read_text())[0]["productId"] == "prod.sour-cream-18"
+
+    assert resolve_ingredients.main(["apply", *args, "--patch", str(patch_path)]) == 0
+    recipes = json.loads((tmp_path / "recipes.json").read_text())
+    assert recipes[0]["ingredients"][1]["productId"] == "prod.sour-cream-18"
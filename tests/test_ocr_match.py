@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app import search as search_mod
+from app import utils as utils_mod
+from app.search import SearchCache
+from app.utils.product_io import save_products_nested
+
+
+def _product(name, storage="storage.fridge", category="category.dairy"):
+    return {
+        "name": name,
+        "quantity": 1,
+        "unit": "szt",
+        "storage": storage,
+        "category": category,
+        "threshold": 1,
+        "main": True,
+        "is_spice": False,
+        "tags": [],
+    }
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / "products.json")
+    products = [
+        _product("mleko"),
+        _product("maslo"),
+        _product("ryz", "storage.pantry", "category.grains"),
+        _product("żurek", "storage.pantry", "category.soups"),
+    ]
+    save_products_nested(path, products)
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", path)
+    monkeypatch.setattr(search_mod, "_INDEX", search_mod.SearchIndex(path))
+    monkeypatch.setattr(search_mod, "SEARCH_CACHE", SearchCache())
+    monkeypatch.setattr(utils_mod, "_DOMAIN_LOADED", True)
+    monkeypatch.setattr(utils_mod, "_DOMAIN_PRODUCTS", {"ryz": {}})
+    monkeypatch.setattr(utils_mod, "_ALIAS_TO_ID", {"rice": "ryz"})
+    return create_app().test_client()
+
+
+def test_lines_match_by_index_alias_and_words(client):
+    resp = client.post(
+        "/api/ocr-match",
+        json={"items": ["MLEKO UHT 3,2% 1L", "Rice", "zurek", "qqq 12,99"]},
+    )
+    body = resp.get_json()
+    assert [r["original"] for r in body] == ["MLEKO UHT 3,2% 1L", "Rice", "zurek", "qqq 12,99"]
+
+    milk = body[0]["matches"][0]
+    assert milk == {
+        "productId": "mleko",
+        "score": 3,
+        "name": "mleko",
+        "category": "category.dairy",
+        "storage": "storage.fridge",
+    }
+    assert body[1]["matches"][0]["productId"] == "ryz"
+    assert body[1]["matches"][0]["score"] == 4
+    assert body[2]["matches"][0]["name"] == "żurek"
+    assert body[3]["matches"] == []
+
+
+def test_limit_per_line(client):
+    resp = client.post("/api/ocr-match", json={"items": ["m"], "limit": 1})
+    assert len(resp.get_json()[0]["matches"]) == 1
+    resp = client.post("/api/ocr-match", json={"items": ["m"]})
+    assert {m["productId"] for m in resp.get_json()[0]["matches"]} == {"mleko", "maslo"}
+    assert client.post("/api/ocr-match", json={"items": ["m"], "limit": 0}).status_code == 400
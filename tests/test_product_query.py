@@ -0,0 +1,202 @@
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils.product_io import ProductSnapshot
+from app.utils.product_query import query
+from tests.utils import convert_flat_to_nested
+
+STORAGES = ("storage.fridge", "storage.pantry", "storage.freezer")
+CATEGORIES = ("category.dairy-eggs", "category.grains", "category.spices")
+
+
+def _products(count=40):
+    return [
+        {
+            "name": f"Item {(i * 7) % count:02d}",
+            "quantity": float(i % 5),
+            "unit": "szt",
+            "threshold": float(i % 4),
+            "main": True,
+            "level": None,
+            "is_spice": False,
+            "tags": [],
+            "storage": STORAGES[i % 3],
+            "category": CATEGORIES[(i // 3) % 3],
+        }
+        for i in range(count)
+    ]
+
+
+def _reference(products, storages=None, categories=None, low_stock=None, q=None):
+    out = []
+    for p in products:
+        if storages is not None and p["storage"] not in storages:
+            continue
+        if categories is not None and p["category"] not in categories:
+            continue
+        if low_stock is not None and (p["quantity"] < p["threshold"]) != low_stock:
+            continue
+        if q and q.casefold() not in p["name"].casefold():
+            continue
+        out.append(p)
+    return out
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(convert_flat_to_nested(_products())))
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", str(path))
+    return create_app().test_client()
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"storages": ["storage.fridge"]},
+        {"storages": ["storage.fridge", "storage.freezer"], "low_stock": True},
+        {"categories": ["category.spices"], "low_stock": False},
+        {"q": "item 1"},
+        {"storages": ["storage.unknown"]},
+    ],
+)
+def test_query_matches_linear_filter(filters):
+    products = _products()
+    snap = ProductSnapshot.of(products)
+    expected = _reference(products, **filters)
+    for sort_by in ("name", "quantity", "status"):
+        for order in ("asc", "desc"):
+            key = {
+                "name": lambda p: p["name"].casefold(),
+                "quantity": lambda p: (p["quantity"], p["name"].casefold()),
+                "status": lambda p: (
+                    0 if p["quantity"] <= 0 else 1 if p["quantity"] < p["threshold"] else 2,
+                    p["name"].casefold(),
+                ),
+            }[sort_by]
+            ordered = sorted(expected, key=key, reverse=order == "desc")
+            seen, cursor = [], None
+            while True:
+                page, total, cursor = query(
+                    snap, sort_by=sort_by, order=order, limit=7, cursor=cursor, **filters
+                )
+                assert total == len(expected)
+                seen.extend(page)
+                if not cursor:
+                    break
+            assert [p["name"] for p in seen] == [p["name"] for p in ordered]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_cursor_paging_with_duplicate_names(limit):
+    # products without an id share their name across storages
+    products = _products(12)
+    for i, p in enumerate(products):
+        p["name"] = f"p{i % 4}"
+    snap = ProductSnapshot.of(products)
+    for sort_by in (None, "name", "quantity", "storage"):
+        for order in ("asc", "desc"):
+            everything, _, _ = query(snap, sort_by=sort_by, order=order)
+            seen, cursor = [], None
+            while True:
+                page, _, cursor = query(
+                    snap, sort_by=sort_by, order=order, limit=limit, cursor=cursor
+                )
+                seen.extend(page)
+                if not cursor:
+                    break
+            assert seen == everything
+            assert len(seen) == len(products)
+
+
+def test_endpoint_filters_sort_page_and_project(client):
+    resp = client.get(
+        "/api/products?storage=fridge&low_stock=true&sort_by=quantity&order=desc"
+        "&limit=2&fields=name,quantity"
+    )
+    assert resp.status_code == 200
+    expected = sorted(
+        _reference(_products(), storages=["storage.fridge"], low_stock=True),
+        key=lambda p: (p["quantity"], p["name"].casefold()),
+        reverse=True,
+    )
+    body = resp.get_json()
+    assert body["products"] == [
+        {"name": p["name"], "quantity": p["quantity"]} for p in expected[:2]
+    ]
+    assert resp.headers["X-Total-Count"] == str(len(expected))
+    assert set(body["categories"]) == set(CATEGORIES)
+
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get(
+        f"/api/products?storage=fridge&low_stock=true&limit=2&fields=name&cursor={cursor}"
+    )
+    assert [p["name"] for p in resp.get_json()["products"]] == [
+        p["name"] for p in expected[2:4]
+    ]
+
+
+def test_endpoint_without_params_returns_everything(client):
+    resp = client.get("/api/products")
+    assert len(resp.get_json()["products"]) == 40
+    assert "X-Next-Cursor" not in resp.headers
+
+
+@pytest.mark.parametrize(
+    "query_string",
+    [
+        "sort_by=colour",
+        "order=up",
+        "low_stock=maybe",
+        "limit=0",
+        "fields=name,price",
+        "cursor=%%%",
+        "cursor=" + base64.urlsafe_b64encode(b'{"s": "name"}').decode(),
+    ],
+)
+def test_endpoint_rejects_bad_params(client, query_string):
+    assert client.get(f"/api/products?{query_string}").status_code == 400
+
+
+def _by_deficit(products):
+    low = [p for p in products if p["quantity"] < p["threshold"]]
+    return sorted(low, key=lambda p: (p["quantity"] - p["threshold"], p["name"].casefold()))
+
+
+@pytest.mark.parametrize(
+    "storages,categories",
+    [
+        (None, None),
+        (["storage.fridge"], None),
+        (None, ["category.grains", "category.spices"]),
+        (["storage.pantry", "storage.freezer"], ["category.grains"]),
+    ],
+)
+def test_low_stock_ranking_matches_reference(storages, categories):
+    products = _products(200)
+    expected = _by_deficit(_reference(products, storages, categories))
+    items, total = ProductSnapshot.of(products).low_stock(storages, categories, 15)
+    assert total == len(expected)
+    assert [p["name"] for p in items] == [p["name"] for p in expected[:15]]
+
+
+def test_low_stock_endpoint_follows_writes(client):
+    resp = client.get("/api/products/low-stock?storage=fridge&limit=3")
+    expected = _by_deficit(_reference(_products(), storages=["storage.fridge"]))
+    body = resp.get_json()
+    assert [p["name"] for p in body] == [p["name"] for p in expected[:3]]
+    assert body[0]["deficit"] == expected[0]["threshold"] - expected[0]["quantity"]
+    assert resp.headers["X-Total-Count"] == str(len(expected))
+
+    routes.remove_used_products([expected[0]["name"]])
+    body = client.get("/api/products/low-stock?storage=fridge").get_json()
+    assert [p["name"] for p in body] == [p["name"] for p in expected[1:]]
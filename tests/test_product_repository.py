@@ -0,0 +1,114 @@
+import json
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.utils import product_io
+from app.utils.product_io import (
+    ProductSnapshot,
+    product_repository,
+    save_products_nested,
+)
+from tests.utils import convert_flat_to_nested
+
+
+def _product(name, quantity=2, threshold=1, storage="storage.pantry", tags=()):
+    return {
+        "name": name,
+        "quantity": quantity,
+        "unit": "szt",
+        "threshold": threshold,
+        "main": True,
+        "level": None,
+        "is_spice": False,
+        "tags": list(tags),
+        "storage": storage,
+        "category": "category.grains",
+    }
+
+
+def _indexes(snap):
+    """Indexes with entries replaced by product names, for comparison."""
+
+    def names(entries):
+        return sorted(snap.entries[e]["name"] for e in entries)
+
+    return {
+        "products": [p["name"] for p in snap.products()],
+        "by_storage": {k: names(v) for k, v in snap.by_storage.items()},
+        "by_category": {k: names(v) for k, v in snap.by_category.items()},
+        "by_tag": {k: names(v) for k, v in snap.by_tag.items()},
+        "by_name": {k: names(v) for k, v in snap.by_name.items()},
+        "low": names(snap.low),
+        "deficits": {
+            k: [snap.entries[r[2]]["name"] for r in v] for k, v in snap.deficits.items() if v
+        },
+    }
+
+
+def test_saves_update_indexes_incrementally(tmp_path, monkeypatch):
+    path = tmp_path / "products.json"
+    products = [
+        _product("rice", tags=["grain"]),
+        _product("milk", quantity=0, storage="storage.fridge"),
+        _product("salt"),
+    ]
+    path.write_text(json.dumps(convert_flat_to_nested(products)))
+    repo = product_repository(str(path))
+    first = repo.snapshot()
+    assert first.get("milk")["storage"] == "storage.fridge"
+    assert [first.entries[e]["name"] for e in first.low] == ["milk"]
+    entries = {name: first.by_key[name] for name in ("rice", "milk", "salt")}
+
+    def no_reload(_path):
+        raise AssertionError("repository reloaded the file")
+
+    monkeypatch.setattr(product_io, "load_products_nested", no_reload)
+    products[1]["quantity"] = 5
+    products[0]["tags"] = ["grain", "staple"]
+    save_products_nested(str(path), products)
+
+    second = repo.snapshot()
+    assert second.version == first.version + 1
+    assert second.by_key["salt"] == entries["salt"]
+    assert second.by_key["milk"] != entries["milk"]
+    assert second.low == set()
+    assert second.with_name("rice")[0]["tags"] == ["grain", "staple"]
+    # saved in file order: grouped by storage
+    file_order = [products[0], products[2], products[1]]
+    assert _indexes(second) == _indexes(ProductSnapshot.of(file_order))
+    # the previous snapshot is untouched
+    assert first.get("milk")["quantity"] == 0 and first.by_tag == {"grain": set(entries["rice"])}
+
+
+def test_external_edits_are_picked_up(tmp_path):
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(convert_flat_to_nested([_product("rice")])))
+    repo = product_repository(str(path))
+    assert len(repo.snapshot()) == 1
+    path.write_text(json.dumps(convert_flat_to_nested([_product("rice"), _product("oats")])))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert repo.snapshot().get("oats")["name"] == "oats"
+
+
+def test_random_updates_match_fresh_build():
+    rng = random.Random(7)
+    names = [f"p{i}" for i in range(30)]
+    products = []
+    snap = ProductSnapshot(0)
+    for _ in range(60):
+        products = [
+            _product(
+                name,
+                quantity=rng.randint(0, 3),
+                threshold=rng.randint(0, 3),
+                storage=rng.choice(["storage.pantry", "storage.fridge"]),
+                tags=rng.sample(["a", "b", "c"], rng.randint(0, 2)),
+            )
+            for name in rng.sample(names, rng.randint(0, len(names)))
+        ] + [p for p in products if rng.random() < 0.5]
+        snap = snap.updated(products)
+        assert _indexes(snap) == _indexes(ProductSnapshot.of(products))
@@ -0,0 +1,148 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.recipe_search import RECIPE_SEARCH, RecipeSearchIndex
+from app.utils.recipe_views import RecipeViewCache
+from app.utils.response_cache import RESPONSES
+from tests.utils import convert_flat_to_nested
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+    # make sure the file signature changes even on coarse mtime clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def _recipe(rid, pl, en, pids=(), steps=(), tags=()):
+    return {
+        "id": rid,
+        "names": {"pl": pl, "en": en},
+        "portions": 2,
+        "time": "10",
+        "ingredients": [
+            {"productId": pid, "qty": 1, "unitId": "unit.szt", "optional": False}
+            for pid in pids
+        ],
+        "steps": list(steps),
+        "tags": list(tags),
+    }
+
+
+RECIPES = [
+    _recipe(
+        "recipe.soup",
+        "Zupa grzybowa",
+        "Mushroom soup",
+        ["prod.champignons"],
+        ["Pokrój pieczarki."],
+        ["zupa"],
+    ),
+    _recipe("recipe.omelette", "Omlet", "Omelette", ["prod.egg"], ["Ubij jajka, dodaj grzyby."]),
+    _recipe("recipe.rice", "Ryż z jabłkami", "Rice with apples", ["prod.rice"], ["Ugotuj ryż."]),
+]
+
+
+def _lookup(pid):
+    return None
+
+
+def test_diacritics_and_field_weights():
+    index = RecipeSearchIndex()
+    index.sync(object(), RECIPES, _lookup)
+    # "grzybowa" is in a name, "grzyby" only in a step
+    assert [rid for rid, _ in index.search("GRZYBOWA")] == ["recipe.soup"]
+    assert [rid for rid, _ in index.search("ryz jablkami")] == ["recipe.rice"]
+    # ingredient product names are searchable
+    assert [rid for rid, _ in index.search("champignons")] == ["recipe.soup"]
+    ranked = index.search("zupa grzyby")
+    assert [rid for rid, _ in ranked] == ["recipe.soup", "recipe.omelette"]
+    assert ranked[0][1] > ranked[1][1] > 0
+    assert index.search("") == [] and index.search("xyz") == []
+
+
+def test_incremental_sync_matches_fresh_index():
+    rng = random.Random(3)
+    words = ["zupa", "ryż", "grzyby", "jajka", "makaron", "ser", "pomidor", "kasza"]
+    recipes = [
+        _recipe(f"recipe.r{i}", " ".join(rng.sample(words, 2)), "x", steps=[rng.choice(words)])
+        for i in range(20)
+    ]
+    index = RecipeSearchIndex()
+    index.sync(object(), recipes, _lookup)
+    for step in range(15):
+        recipes = list(recipes)
+        idx = rng.randrange(len(recipes))
+        if rng.random() < 0.3:
+            recipes.pop(idx)
+        else:
+            recipes[idx] = dict(recipes[idx], steps=[rng.choice(words)])
+        recipes.append(_recipe(f"recipe.n{step}", rng.choice(words), "y"))
+        assert index.sync(object(), recipes, _lookup) <= 3
+        fresh = RecipeSearchIndex()
+        fresh.sync(object(), recipes, _lookup)
+        for word in words:
+            assert index.search(word) == fresh.search(word)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    products = [
+        {
+            "name": "prod.rice",
+            "quantity": 1,
+            "unit": "g",
+            "threshold": 1,
+            "main": True,
+            "is_spice": False,
+            "category": "category.grains",
+            "storage": "storage.pantry",
+        }
+    ]
+    _write(tmp_path / "products.json", convert_flat_to_nested(products))
+    _write(tmp_path / "units.json", [])
+    _write(tmp_path / "recipes.json", RECIPES)
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", str(tmp_path / "products.json"))
+    monkeypatch.setattr(routes, "UNITS_PATH", str(tmp_path / "units.json"))
+    monkeypatch.setattr(routes, "RECIPES_PATH", str(tmp_path / "recipes.json"))
+    monkeypatch.setattr(routes, "RECIPE_VIEWS", RecipeViewCache())
+    RECIPE_SEARCH.clear()
+    RESPONSES.clear()
+    return create_app().test_client()
+
+
+def test_search_endpoint(client):
+    resp = client.get("/api/recipes/search?q=zupa+grzyby&limit=1")
+    data = resp.get_json()
+    assert resp.headers["X-Total-Count"] == "2"
+    assert [r["id"] for r in data] == ["recipe.soup"]
+    assert data[0]["score"] > 0 and data[0]["ingredients"]
+    resp = client.get("/api/recipes/search?q=zupa+grzyby&offset=1")
+    assert [r["id"] for r in resp.get_json()] == ["recipe.omelette"]
+    assert client.get("/api/recipes/search?q=").get_json() == []
+    assert client.get("/api/recipes/search?limit=0&q=a").status_code == 400
+
+
+def test_recipes_q_filters_and_follows_file_changes(client, tmp_path):
+    data = client.get("/api/recipes?q=zupa").get_json()
+    assert [r["id"] for r in data["items"]] == ["recipe.soup"]
+    assert data["total"] == 1
+    etag = client.get("/api/recipes").headers["ETag"]
+    assert client.get("/api/recipes?q=zupa").headers["ETag"] != etag
+
+    changed = RECIPES + [_recipe("recipe.new", "Zupa pomidorowa", "Tomato soup")]
+    _write(tmp_path / "recipes.json", changed)
+    data = client.get("/api/recipes?q=zupa&page_size=1").get_json()
+    assert data["total"] == 2
+    resp = client.get("/api/recipes?q=zupa&page_size=1")
+    nxt = client.get(f"/api/recipes?q=zupa&page_size=1&cursor={resp.headers['X-Next-Cursor']}")
+    ids = [resp.get_json()["items"][0]["id"], nxt.get_json()["items"][0]["id"]]
+    assert sorted(ids) == ["recipe.new", "recipe.soup"]
@@ -0,0 +1,172 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils.recipe_views import RecipeViewCache
+from tests.utils import convert_flat_to_nested
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+    # make sure the file signature changes even on coarse mtime clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def sources(tmp_path):
+    products = [
+        {
+            "name": "prod.rice",
+            "quantity": 1,
+            "unit": "g",
+            "threshold": 1,
+            "main": True,
+            "is_spice": False,
+            "category": "category.grains",
+            "storage": "storage.pantry",
+        }
+    ]
+    units = [{"id": "unit.g", "names": {"pl": "gram", "en": "gram"}}]
+    recipes = [
+        {
+            "id": f"recipe.{name}",
+            "names": {"pl": name.title(), "en": name},
+            "portions": 2,
+            "time": "10",
+            "ingredients": [
+                {"productId": "prod.rice", "qty": 100, "unitId": "unit.g", "optional": False}
+            ],
+            "steps": [],
+            "tags": [],
+        }
+        for name in ("zupa", "kasza", "ryz")
+    ]
+    _write(tmp_path / "products.json", convert_flat_to_nested(products))
+    _write(tmp_path / "units.json", units)
+    _write(tmp_path / "recipes.json", recipes)
+    paths = tuple(str(tmp_path / n) for n in ("products.json", "units.json", "recipes.json"))
+    return paths + (routes.RECIPES_SCHEMA,)
+
+
+def test_views_are_cached_per_locale_and_share_sources(sources):
+    cache = RecipeViewCache()
+    pl = cache.view("pl", sources)
+    en = cache.view("en", sources)
+    assert cache.view("pl", sources) is pl
+    assert pl.sources is en.sources
+    assert cache.stats() == {"locales": ["en", "pl"], "hits": 1, "builds": 2}
+    assert [r["id"] for r in pl.items] == ["recipe.kasza", "recipe.ryz", "recipe.zupa"]
+    assert pl.items[0]["ingredients"][0]["unitName"] == "gram"
+    with pytest.raises(TypeError):
+        pl.items[0]["names"]["pl"] = "x"
+
+
+def test_views_rebuilt_when_any_source_changes(sources):
+    cache = RecipeViewCache()
+    first = cache.view("en", sources)
+    _write(Path(sources[1]), [{"id": "unit.g", "names": {"pl": "g", "en": "g"}}])
+    second = cache.view("en", sources)
+    assert second is not first
+    assert second.items[0]["ingredients"][0]["unitName"] == "g"
+
+
+def test_endpoint_uses_cached_view(sources, monkeypatch):
+    for attr, path in zip(("PRODUCTS_PATH", "UNITS_PATH", "RECIPES_PATH"), sources):
+        monkeypatch.setattr(routes, attr, path)
+    cache = RecipeViewCache()
+    monkeypatch.setattr(routes, "RECIPE_VIEWS", cache)
+    client = create_app().test_client()
+    first = client.get("/api/recipes?locale=en&sort_by=name").get_json()
+    second = client.get("/api/recipes?locale=en&sort_by=name&order=desc").get_json()
+    assert [r["id"] for r in first["items"]] == ["recipe.kasza", "recipe.ryz", "recipe.zupa"]
+    assert [r["id"] for r in second["items"]] == ["recipe.zupa", "recipe.ryz", "recipe.kasza"]
+    assert cache.builds == 1 and cache.hits >= 1
+
+
+def _reference(items, locale, sort_by, order):
+    """The sort ``/api/recipes`` used to run on every request."""
+    items = list(items)
+    if sort_by:
+        def key(r):
+            if sort_by == "name":
+                return (r["names"].get(locale) or r["names"].get("en") or r["id"]).lower()
+            val = r.get(sort_by)
+            return val.lower() if isinstance(val, str) else val
+
+        items.sort(key=key)
+        if order == "desc":
+            items.reverse()
+    return items
+
+
+def test_pages_match_full_sort(tmp_path, sources):
+    recipes = [
+        {
+            "id": f"recipe.r{i:02d}",
+            "names": {"pl": f"Danie {i % 7}", "en": f"dish {(i * 5) % 11}"},
+            "portions": i % 4 + 1,
+            "time": str(i % 3),
+            "ingredients": [],
+            "steps": [],
+            "tags": [],
+        }
+        for i in range(23)
+    ]
+    _write(Path(sources[2]), recipes)
+    cache = RecipeViewCache()
+    for locale in ("pl", "en"):
+        view = cache.view(locale, sources)
+        for sort_by in ("name", "time", "servings", ""):
+            for order in ("asc", "desc"):
+                expected = _reference(view.items, locale, sort_by, order)
+                descending = bool(sort_by) and order == "desc"
+                for size in (1, 4, 50):
+                    for start in range(0, 26, size):
+                        got = view.page(sort_by, descending, start, size)
+                        assert got == expected[start : start + size]
+                for pos, item in enumerate(expected):
+                    assert view.position_after(sort_by, descending, item["id"]) == pos + 1
+
+
+def test_endpoint_cursor_walk(sources, monkeypatch):
+    for attr, path in zip(("PRODUCTS_PATH", "UNITS_PATH", "RECIPES_PATH"), sources):
+        monkeypatch.setattr(routes, attr, path)
+    monkeypatch.setattr(routes, "RECIPE_VIEWS", RecipeViewCache())
+    client = create_app().test_client()
+
+    resp = client.get("/api/recipes?locale=en&order=desc&page_size=2")
+    seen = [r["id"] for r in resp.get_json()["items"]]
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get(f"/api/recipes?locale=en&page_size=2&cursor={cursor}")
+    body = resp.get_json()
+    assert body["page"] == 2
+    assert "X-Next-Cursor" not in resp.headers
+    seen += [r["id"] for r in body["items"]]
+    assert seen == ["recipe.zupa", "recipe.ryz", "recipe.kasza"]
+
+    assert client.get("/api/recipes?cursor=%%%").status_code == 400
+    mismatched = f"/api/recipes?locale=en&page_size=2&sort_by=time&cursor={cursor}"
+    assert client.get(mismatched).status_code == 400
+    assert client.get(f"/api/recipes?order=asc&cursor={cursor}").status_code == 400
+    assert client.get(f"/api/recipes?locale=en&order=DESC&cursor={cursor}").status_code == 200
+
+
+def test_unknown_locales_share_the_english_view(sources, monkeypatch):
+    for attr, path in zip(("PRODUCTS_PATH", "UNITS_PATH", "RECIPES_PATH"), sources):
+        monkeypatch.setattr(routes, attr, path)
+    cache = RecipeViewCache()
+    monkeypatch.setattr(routes, "RECIPE_VIEWS", cache)
+    client = create_app().test_client()
+
+    english = client.get("/api/recipes?locale=en").get_json()
+    for locale in ("xx", "de", "EN", "x" * 50):
+        assert client.get(f"/api/recipes?locale={locale}").get_json() == english
+    assert cache.stats()["locales"] == ["en"]
@@ -0,0 +1,66 @@
+import gzip
+import os
+import sys
+import zlib
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils.response_cache import ResponseCache
+
+
+def test_encodings_are_negotiated_from_one_cached_body(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(routes, "RESPONSES", cache)
+    client = create_app().test_client()
+
+    plain = client.get("/api/products")
+    assert plain.headers["Vary"] == "Accept-Encoding"
+    assert "Content-Encoding" not in plain.headers
+
+    gz = client.get("/api/products", headers={"Accept-Encoding": "gzip, deflate"})
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz.data) == plain.data
+    assert gz.headers["ETag"] == plain.headers["ETag"]
+
+    df = client.get("/api/products", headers={"Accept-Encoding": "gzip;q=0.5, deflate"})
+    assert df.headers["Content-Encoding"] == "deflate"
+    assert zlib.decompress(df.data) == plain.data
+
+    none = client.get("/api/products", headers={"Accept-Encoding": "br"})
+    assert none.data == plain.data
+
+    stats = cache.stats()
+    assert stats["endpoints"]["products"] == {"hits": 3, "misses": 1, "hitRatio": 0.75}
+    assert stats["served"] == {"identity": 2, "gzip": 1, "deflate": 1}
+
+
+def test_every_heavy_endpoint_is_cached(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(routes, "RESPONSES", cache)
+    client = create_app().test_client()
+    for url in ("/api/domain", "/api/recipes?locale=en&page_size=2", "/api/ui/pl"):
+        first = client.get(url)
+        second = client.get(url)
+        assert first.status_code == second.status_code == 200
+        assert first.data == second.data
+        assert first.headers.get("X-Next-Cursor") == second.headers.get("X-Next-Cursor")
+    assert cache.stats()["hits"] == 3
+    assert client.get("/api/ui/xx").status_code == 404
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=3000)
+    body = os.urandom(1000)  # incompressible: stored without variants
+    for n in range(4):
+        cache.put(("x", n), body, [])
+    assert cache.get(("x", 0)) is None
+    assert cache.get(("x", 3)).body == body
+    stats = cache.stats()
+    assert stats["bytes"] == 3000 and stats["evictions"] == 1
+
+    small = cache.put(("x", "small"), b"{}", [])
+    assert small.variants == {}
+    assert cache.put(("x", "big"), body * 4, []).size > cache.max_bytes
+    assert cache.get(("x", "big")) is None
@@ -0,0 +1,165 @@
+import copy
+import json
+import logging
+import os
+import random
+import sys
+
+import jsonschema
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.routes import PRODUCTS_SCHEMA, RECIPES_PATH, RECIPES_SCHEMA
+from app.utils import normalize_recipe
+from app.utils.schema_compiler import UnsupportedSchema, compile_validator
+from app.utils.schema_registry import SchemaRegistry
+
+_ODD_VALUES = [
+    None,
+    True,
+    False,
+    0,
+    1,
+    2.5,
+    "",
+    "x",
+    "high",
+    "storage.x",
+    [],
+    ["a", 1],
+    {},
+    {"k": None},
+]
+
+
+def _load_schema(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _engine_errors(schema, instance):
+    validator = jsonschema.Draft7Validator(schema)
+    return [(tuple(e.path), e.message) for e in validator.iter_errors(instance)]
+
+
+def _containers(value, out):
+    if isinstance(value, (dict, list)):
+        out.append(value)
+        children = value.values() if isinstance(value, dict) else value
+        for child in children:
+            _containers(child, out)
+    return out
+
+
+def _odd(rng):
+    return copy.deepcopy(rng.choice(_ODD_VALUES))
+
+
+def _mutate(rng, data):
+    targets = _containers(data, [])
+    target = rng.choice(targets)
+    if isinstance(target, dict):
+        op = rng.randrange(4)
+        if op == 0 and target:
+            target[rng.choice(list(target))] = _odd(rng)
+        elif op == 1 and target:
+            del target[rng.choice(list(target))]
+        elif op == 2:
+            key = rng.choice(["extra", "zz", "storage.new", "category.new"])
+            target[key] = _odd(rng)
+        else:
+            key = rng.choice(["level", "tags", "note", "unresolved", "time"])
+            target[key] = _odd(rng)
+    elif target:
+        idx = rng.randrange(len(target))
+        target[idx] = _odd(rng)
+    else:
+        target.append(_odd(rng))
+
+
+def _products_sample():
+    item = {
+        "name": "milk",
+        "quantity": 1,
+        "unit": "l",
+        "threshold": 1,
+        "main": True,
+        "level": None,
+        "is_spice": False,
+        "tags": ["dairy"],
+    }
+    return {
+        "storage.fridge": {"category.dairy": [item, dict(item, name="kefir")]},
+        "storage.pantry": {"category.spices": [dict(item, name="pepper", level="low")]},
+    }
+
+
+def _recipes_sample():
+    with open(RECIPES_PATH, "r", encoding="utf-8") as fh:
+        return [normalize_recipe(r) for r in json.load(fh)][:5]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_products_schema_matches_jsonschema(seed):
+    schema = _load_schema(PRODUCTS_SCHEMA)
+    fast = compile_validator(schema)
+    rng = random.Random(seed)
+    for _ in range(25):
+        data = _products_sample()
+        for _ in range(rng.randint(1, 4)):
+            _mutate(rng, data)
+        assert fast(data) == _engine_errors(schema, data)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_recipe_schema_matches_jsonschema(seed):
+    schema = _load_schema(RECIPES_SCHEMA)
+    fast = compile_validator(schema)
+    rng = random.Random(seed)
+    samples = _recipes_sample()
+    for _ in range(25):
+        recipe = copy.deepcopy(rng.choice(samples))
+        for _ in range(rng.randint(1, 4)):
+            _mutate(rng, recipe)
+        assert fast(recipe) == _engine_errors(schema, recipe)
+
+
+def test_valid_data_has_no_errors():
+    assert compile_validator(_load_schema(PRODUCTS_SCHEMA))(_products_sample()) == []
+    fast = compile_validator(_load_schema(RECIPES_SCHEMA))
+    assert all(fast(r) == [] for r in _recipes_sample())
+
+
+def test_registry_paths_agree(tmp_path):
+    rng = random.Random(7)
+    samples = _recipes_sample()
+    data = []
+    for _ in range(60):
+        recipe = copy.deepcopy(rng.choice(samples))
+        if rng.random() < 0.5:
+            _mutate(rng, recipe)
+        data.append(recipe)
+
+    fast = SchemaRegistry(fast=True).get(RECIPES_SCHEMA)
+    slow = SchemaRegistry(fast=False).get(RECIPES_SCHEMA)
+    assert fast.generated and not slow.generated
+    for item in data:
+        assert fast.errors(item) == slow.errors(item)
+        assert fast.item_errors(item) == slow.item_errors(item)
+
+
+def test_unsupported_schema_falls_back(tmp_path, caplog):
+    schema = {"type": "object", "properties": {"n": {"type": "number", "minimum": 1}}}
+    with pytest.raises(UnsupportedSchema):
+        compile_validator(schema)
+
+    path = tmp_path / "min.schema.json"
+    path.write_text(json.dumps(schema))
+    with caplog.at_level(logging.INFO, logger="app.utils.schema_registry"):
+        compiled = SchemaRegistry().get(str(path))
+    assert [r.getMessage() for r in caplog.records] == [
+        "min.schema.json: using jsonschema engine (keyword 'minimum')"
+    ]
+    assert not compiled.generated
+    assert compiled.errors({"n": 0}) == [(("n",), "0 is less than the minimum of 1")]
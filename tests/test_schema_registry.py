@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import create_app
+from app.errors import DomainError
+from app.utils import _validate, validate_payload
+from app.utils.schema_registry import SCHEMAS, SchemaRegistry
+
+
+def _write_schema(path, required):
+    path.write_text(
+        json.dumps(
+            {
+                "type": "object",
+                "required": required,
+                "properties": {"a": {"type": "string"}},
+            }
+        )
+    )
+
+
+def test_compiled_once_and_reloaded_on_change(tmp_path):
+    registry = SchemaRegistry()
+    path = tmp_path / "thing.schema.json"
+    _write_schema(path, [])
+
+    first = registry.get(str(path))
+    assert registry.get(str(path)) is first
+    assert registry.stats()["hits"] == 1
+
+    _write_schema(path, ["a"])
+    os.utime(path, ns=(0, 0))
+    second = registry.get(str(path))
+    assert second is not first
+    assert second.schema["required"] == ["a"]
+    assert registry.stats()["reloads"] == 1
+
+
+def test_missing_schema_returns_none(tmp_path):
+    registry = SchemaRegistry()
+    assert registry.get(str(tmp_path / "nope.json")) is None
+
+
+def test_validate_uses_registry(tmp_path):
+    path = tmp_path / "thing.schema.json"
+    _write_schema(path, ["a"])
+    data, errors = _validate([{"a": "x"}, {"b": 1}], str(path))
+    assert data == [{"a": "x"}]
+    assert errors == ["item 1: 'a' is a required property"]
+
+
+def test_validate_payload_counts_hits():
+    validate_payload({"inCart": True}, "shopping-mark.schema.json")
+    hits = SCHEMAS.stats()["hits"]
+    with pytest.raises(DomainError):
+        validate_payload({"inCart": "yes"}, "shopping-mark.schema.json")
+    assert SCHEMAS.stats()["hits"] == hits + 1
+
+
+def test_health_reports_cache_stats():
+    client = create_app().test_client()
+    data = client.get("/api/_health").get_json()
+    assert data["caches"]["schemas"]["entries"] >= 4
+    assert "hits" in data["caches"]["datasets"]
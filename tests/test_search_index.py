@@ -0,0 +1,332 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import create_app
+from app import search as search_mod
+from app.search import SearchCache, SearchIndex, search_products, search_products_page
+from app.utils import product_io
+from app.utils.product_io import save_products_nested
+
+_WORDS = ["ryz", "ryzu", "mleko", "mak", "maka", "kasza", "ser", "seler", "sok", "cashew", "nuts", "a"]
+
+
+def _reference_search(query, items):
+    """Linear scan over every item, as search_products worked before indexing."""
+    norm_query = search_mod._normalize(query)
+    if not norm_query:
+        return []
+    results = []
+    for item in items:
+        best = 0
+        matched_name = False
+        for idx, s in enumerate(item["strings"]):
+            score = 0
+            if s.startswith(norm_query):
+                score = 3
+            elif norm_query in s:
+                score = 2
+            elif search_mod._distance_leq_one(norm_query, s):
+                score = 1
+            if score > best or (score == best and idx == 0 and not matched_name):
+                best = score
+                matched_name = idx == 0
+        if best:
+            results.append(
+                {
+                    "productId": item["id"],
+                    "score": best,
+                    "is_name": matched_name,
+                    "owned": item.get("owned", 0),
+                    "level": item.get("level"),
+                    "name": item.get("name", ""),
+                }
+            )
+    results.sort(
+        key=lambda r: (
+            -r["score"],
+            -int(r["is_name"]),
+            -float(r.get("owned", 0)),
+            -search_mod._LEVEL_ORDER.get(r.get("level"), 0),
+            r.get("name", ""),
+            r["productId"],
+        )
+    )
+    return [{"productId": r["productId"], "score": r["score"]} for r in results]
+
+
+def _random_string(rng):
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3)))
+
+
+def _random_items(rng, count):
+    items = []
+    for i in range(count):
+        strings = [_random_string(rng) for _ in range(rng.randint(1, 4))]
+        items.append(
+            {
+                "id": f"prod.{i}",
+                "tokens": set(" ".join(strings).split()),
+                "strings": strings,
+                "name": strings[0],
+                "owned": rng.choice([0, 0, 1, 2.5]),
+                "level": rng.choice([None, "low", "medium", "high"]),
+            }
+        )
+    return items
+
+
+def _random_query(rng, items):
+    source = rng.choice(rng.choice(items)["strings"])
+    op = rng.randrange(5)
+    if op == 0:
+        start = rng.randrange(len(source))
+        return source[start : start + rng.randint(1, 6)]
+    if op == 1 and len(source) > 1:
+        pos = rng.randrange(len(source))
+        return source[:pos] + source[pos + 1 :]
+    if op == 2:
+        pos = rng.randrange(len(source) + 1)
+        return source[:pos] + rng.choice("aekrz") + source[pos:]
+    if op == 3:
+        pos = rng.randrange(len(source))
+        return source[:pos] + rng.choice("aekrz") + source[pos + 1 :]
+    return rng.choice(_WORDS).upper()
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_indexed_search_matches_linear_scan(monkeypatch, seed):
+    rng = random.Random(seed)
+    items = _random_items(rng, 60)
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    for _ in range(40):
+        query = _random_query(rng, items)
+        assert search_products(query, "pl") == _reference_search(query, items)
+
+
+def test_index_rebuilt_when_items_replaced(monkeypatch):
+    first = [{"id": "a", "strings": ["mleko"], "name": "mleko"}]
+    second = [{"id": "b", "strings": ["seler"], "name": "seler"}]
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": first, "en": []})
+    assert search_products("mle", "pl") == [{"productId": "a", "score": 3}]
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": second, "en": []})
+    assert search_products("mle", "pl") == []
+    assert search_products("ele", "pl") == [{"productId": "b", "score": 2}]
+
+
+def test_fuzzy_candidates_come_from_deletions(monkeypatch):
+    items = [
+        {"id": "a", "strings": ["kasza"], "name": "kasza"},
+        {"id": "b", "strings": ["maka", "mleko"], "name": "maka"},
+    ]
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    index = search_mod._locale_index("pl")
+    assert index.fuzzy_candidates("kazsa") == {(0, 0)}
+    assert index.fuzzy_candidates("mlekos") == {(1, 1)}
+    assert search_products("kasze", "pl") == [{"productId": "a", "score": 1}]
+
+    stats = search_mod.index_stats()["pl"]
+    assert stats["items"] == 2
+    assert stats["deletes"] == len(index.deletes)
+    assert stats["bytes"] > 0
+
+
+def _product(name, **extra):
+    prod = {
+        "name": name,
+        "quantity": 1,
+        "unit": "szt",
+        "category": "category.misc",
+        "storage": "storage.pantry",
+        "threshold": 1,
+        "main": True,
+        "is_spice": False,
+        "tags": [],
+    }
+    prod.update(extra)
+    return prod
+
+
+@pytest.fixture
+def live_index(tmp_path, monkeypatch):
+    index = SearchIndex(str(tmp_path / "products.json"))
+    monkeypatch.setattr(product_io, "_SAVE_LISTENERS", [index.products_saved])
+    monkeypatch.setattr(search_mod, "_INDEX", index)
+    return index
+
+
+def test_saves_update_index_incrementally(live_index):
+    products = [_product("mleko"), _product("ryz")]
+    save_products_nested(live_index.path, products)
+    assert [r["productId"] for r in search_products("mle", "pl")] == ["mleko"]
+    version = live_index.version
+    before = live_index.snapshot()
+
+    products.append(_product("maka"))
+    save_products_nested(live_index.path, products)
+    assert live_index.version == version + 1
+    assert search_products("mak", "en") == [{"productId": "maka", "score": 3}]
+    # the earlier snapshot is left untouched for readers still holding it
+    assert [i["id"] for i in before.locales["pl"].live_items()] == ["mleko", "ryz"]
+
+    save_products_nested(live_index.path, products)
+    assert live_index.version == version + 1
+
+    products = [p for p in products if p["name"] != "mleko"]
+    products[0]["quantity"] = 5
+    save_products_nested(live_index.path, products)
+    assert live_index.version == version + 2
+    assert search_products("mle", "pl") == []
+    assert sorted(i["id"] for i in live_index["pl"]) == ["maka", "ryz"]
+    assert [i["owned"] for i in live_index["pl"] if i["id"] == "ryz"] == [5]
+
+
+def test_index_follows_external_file_changes(live_index, tmp_path):
+    save_products_nested(live_index.path, [_product("mleko")])
+    live_index.snapshot()
+    product_io._SAVE_LISTENERS.clear()
+    save_products_nested(live_index.path, [_product("seler")])
+    assert search_products("sel", "pl") == [{"productId": "seler", "score": 3}]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_updates_match_rebuild(live_index, seed):
+    rng = random.Random(seed)
+    products = []
+    for step in range(30):
+        op = rng.randrange(3)
+        if op == 0 or not products:
+            products.append(_product(f"{_random_string(rng)} {step}"))
+        elif op == 1:
+            products.pop(rng.randrange(len(products)))
+        else:
+            target = rng.choice(products)
+            target["quantity"] = rng.randint(0, 3)
+            target["level"] = rng.choice([None, "low", "high"])
+        save_products_nested(live_index.path, products)
+
+        fresh = SearchIndex(live_index.path)
+        fresh.rebuild(products)
+        for _ in range(5):
+            query = rng.choice(_WORDS)
+            incremental = search_products(query, "pl")
+            search_mod._INDEX = fresh
+            try:
+                assert incremental == search_products(query, "pl")
+            finally:
+                search_mod._INDEX = live_index
+
+
+def test_health_reports_index_version():
+    body = create_app().test_client().get("/api/_health").get_json()
+    assert body["searchIndexVersion"] == search_mod.SEARCH_INDEX.version
+    assert set(body["caches"]["search"]) >= {"hits", "misses", "entries", "bytes"}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pages_match_full_ranking(monkeypatch, seed):
+    rng = random.Random(seed)
+    items = _random_items(rng, 80)
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    for _ in range(20):
+        query = _random_query(rng, items)
+        full = _reference_search(query, items)
+        limit, offset = rng.randint(1, 10), rng.randint(0, 12)
+        page, total = search_products_page(query, "pl", limit, offset)
+        assert total == len(full)
+        assert page == full[offset : offset + limit]
+
+
+def test_search_endpoint_pages(monkeypatch):
+    items = [
+        {"id": f"prod.{i}", "strings": [f"ser {i:02d}"], "name": f"ser {i:02d}"}
+        for i in range(60)
+    ]
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    client = create_app().test_client()
+
+    resp = client.get("/api/search?q=ser&locale=pl")
+    assert resp.headers["X-Total-Count"] == "60"
+    assert len(resp.get_json()) == 50
+
+    resp = client.get("/api/search?q=ser&locale=pl&limit=5&offset=55")
+    assert [r["productId"] for r in resp.get_json()] == [f"prod.{i}" for i in range(55, 60)]
+
+    assert client.get("/api/search?q=ser&limit=0").status_code == 400
+    assert client.get("/api/search?q=ser&offset=-1").status_code == 400
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_typeahead_with_prefix_cache_matches_linear_scan(monkeypatch, seed):
+    rng = random.Random(seed)
+    items = _random_items(rng, 60)
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    monkeypatch.setattr(search_mod, "SEARCH_CACHE", SearchCache())
+    for _ in range(10):
+        query = _random_query(rng, items)
+        for end in range(1, len(query) + 1):
+            assert search_products(query[:end], "pl") == _reference_search(query[:end], items)
+    assert search_mod.SEARCH_CACHE.prefix_hits > 0
+
+
+def test_cache_counts_and_evicts(monkeypatch):
+    items = [{"id": f"p{i}", "strings": [f"kasza {i}"], "name": f"kasza {i}"} for i in range(20)]
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    cache = SearchCache(max_entries=2)
+    monkeypatch.setattr(search_mod, "SEARCH_CACHE", cache)
+
+    search_products("kas", "pl")
+    search_products("Kas ", "pl")
+    assert (cache.hits, cache.misses) == (1, 1)
+    search_products("kasz", "pl")
+    assert cache.prefix_hits == 1
+    search_products("ser", "pl")
+    assert cache.stats()["entries"] == 2
+    assert cache.evictions == 1
+
+    tiny = SearchCache(max_bytes=1)
+    monkeypatch.setattr(search_mod, "SEARCH_CACHE", tiny)
+    search_products("kas", "pl")
+    assert tiny.stats()["entries"] == 0
+
+
+def test_cache_misses_after_index_update(live_index):
+    save_products_nested(live_index.path, [_product("mleko")])
+    assert search_products("mle", "pl") == [{"productId": "mleko", "score": 3}]
+    save_products_nested(live_index.path, [_product("mleko"), _product("mleczko")])
+    assert [r["productId"] for r in search_products("mle", "pl")] == ["mleczko", "mleko"]
+
+
+def test_batch_endpoint_matches_single_searches(monkeypatch):
+    rng = random.Random(1)
+    items = _random_items(rng, 60)
+    monkeypatch.setattr(search_mod, "_INDEX", {"pl": items, "en": []})
+    cache = SearchCache()
+    monkeypatch.setattr(search_mod, "SEARCH_CACHE", cache)
+    queries = [_random_query(rng, items) for _ in range(40)]
+    queries += [queries[0].upper(), " " + queries[1], ""]
+
+    resp = create_app().test_client().post(
+        "/api/search/batch", json={"queries": queries, "locale": "pl", "limit": 3}
+    )
+    body = resp.get_json()
+    assert [entry["query"] for entry in body] == queries
+    distinct = {search_mod._normalize(q) for q in queries} - {""}
+    assert cache.misses == len(distinct)
+    for query, entry in zip(queries, body):
+        full = _reference_search(query, items)
+        assert entry["total"] == len(full)
+        assert entry["results"] == full[:3]
+
+
+def test_batch_endpoint_rejects_bad_payloads():
+    client = create_app().test_client()
+    assert client.post("/api/search/batch", json={"queries": "ser"}).status_code == 400
+    assert client.post("/api/search/batch", json={"queries": [], "locale": "de"}).status_code == 400
+    assert client.post("/api/search/batch", json={"queries": ["a"], "limit": 0}).status_code == 400
+    too_many = {"queries": ["a"] * 501}
+    assert client.post("/api/search/batch", json=too_many).status_code == 400
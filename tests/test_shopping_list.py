@@ -178,3 +178,28 @@ def test_mark_and_finalize_updates_pantry(tmp_path):
     assert rice["quantity"] == 600.0
     assert egg["quantity"] == 4.0
     assert water["quantity"] == 500.0
+
+
+def test_finalize_collapses_products_sharing_a_name(tmp_path):
+    _setup_data(tmp_path)
+    products = load_products_nested(routes.PRODUCTS_PATH)
+    rice = next(p for p in products if p["name"] == "prod.rice")
+    products.append(dict(rice, storage="fridge", quantity=50))
+    with open(routes.PRODUCTS_PATH, "w") as fh:
+        json.dump(convert_flat_to_nested(products), fh)
+    before = load_products_nested(routes.PRODUCTS_PATH)
+    last_rice = [p for p in before if p["name"] == "prod.rice"][-1]
+    client = create_app().test_client()
+
+    client.post("/api/shopping", json={"recipes": [{"id": "recipe.b", "servings": 2}]})
+    bought = next(
+        i for i in client.get("/api/shopping").get_json() if i["productId"] == "prod.rice"
+    )
+    client.patch("/api/shopping/prod.rice", json={"inCart": True})
+    client.post("/api/shopping/confirm")
+
+    # like a name-keyed map: the last duplicate is updated, the others dropped
+    rice = [p for p in load_products_nested(routes.PRODUCTS_PATH) if p["name"] == "prod.rice"]
+    assert len(rice) == 1
+    assert rice[0]["storage"] == last_rice["storage"]
+    assert rice[0]["quantity"] == last_rice["quantity"] + bought["quantity_to_buy"]
@@ -0,0 +1,164 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils import _safe_float
+from app.utils.product_io import ProductSnapshot
+from app.utils.shopping_matrix import SHOPPING_MATRICES, ShoppingMatrix
+from tests.utils import convert_flat_to_nested
+
+PIDS = [f"prod.p{i}" for i in range(10)]
+UNIT_IDS = ["unit.g", "unit.kg", "unit.ml", "unit.l", "unit.szt", "unit.pinch", None]
+
+
+def _data(rng, recipes=40, products=25):
+    recs = []
+    for r in range(recipes):
+        ings = [
+            {
+                "productId": rng.choice(PIDS),
+                "qty": rng.choice([0.1, 0.25, 1, 3, 150, 0.333, None]),
+                "unitId": rng.choice(UNIT_IDS),
+                "optional": rng.random() < 0.2,
+            }
+            for _ in range(rng.randint(0, 6))
+        ]
+        recs.append({"id": f"recipe.r{r}", "portions": rng.randint(0, 4), "ingredients": ings})
+    prods = [
+        {
+            "name": rng.choice(PIDS),
+            "quantity": rng.choice([0, 0.5, 2, 120, 1000]),
+            "unit": rng.choice(["g", "kg", "ml", "l", "szt"]),
+        }
+        for _ in range(products)
+    ]
+    selection = [
+        {
+            "id": f"recipe.r{rng.randrange(recipes + 3)}",
+            "servings": rng.choice([0, 1, 2.5, 4, "x"]),
+        }
+        for _ in range(rng.randint(0, 80))
+    ]
+    return recs, prods, selection
+
+
+def _reference(recipes, products, selection):
+    # the nested loops the matrix replaces
+    recipes_map = {r.get("id"): r for r in recipes}
+    aggregate, optional_map = {}, {}
+    for sel in selection:
+        servings = max(0.0, _safe_float(sel.get("servings", 0)))
+        recipe = recipes_map.get(sel.get("id"))
+        if not recipe:
+            continue
+        scale = servings / (recipe.get("portions") or 1)
+        for ing in recipe.get("ingredients", []):
+            pid, unit, qty = ing.get("productId"), ing.get("unitId"), ing.get("qty")
+            if not pid or not unit or qty is None:
+                continue
+            qty_base, base_unit = routes._to_base(qty * scale, unit)
+            key = (pid, base_unit)
+            aggregate[key] = aggregate.get(key, 0) + qty_base
+            if ing.get("optional"):
+                optional_map[key] = True
+            else:
+                optional_map.setdefault(key, False)
+    stock = {}
+    for prod in products:
+        qty_base, base_unit = routes._product_base(prod)
+        key = (prod["name"], base_unit)
+        stock[key] = stock.get(key, 0) + qty_base
+    items = []
+    for key, total in aggregate.items():
+        remaining = max(total - stock.get(key, 0), 0)
+        if remaining <= 0:
+            continue
+        items.append(
+            {
+                "productId": key[0],
+                "unitId": key[1],
+                "quantity_to_buy": remaining,
+                "optional": optional_map[key],
+                "in_cart": False,
+            }
+        )
+    return items
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_python_path_matches_nested_loops(seed):
+    recipes, products, selection = _data(random.Random(seed))
+    matrix = ShoppingMatrix(recipes, routes._to_base)
+    snap = ProductSnapshot.of(products)
+    got = matrix.shopping_list(selection, snap, routes._product_base, use_numpy=False)
+    assert got == _reference(recipes, products, selection)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_numpy_path_matches_nested_loops(seed):
+    pytest.importorskip("numpy")
+    recipes, products, selection = _data(random.Random(seed))
+    matrix = ShoppingMatrix(recipes, routes._to_base)
+    snap = ProductSnapshot.of(products)
+    got = matrix.shopping_list(selection, snap, routes._product_base, use_numpy=True)
+    assert got == _reference(recipes, products, selection)
+
+
+def test_matrix_is_compiled_once_per_recipes_version(tmp_path, monkeypatch):
+    recipes = [
+        {
+            "id": "recipe.a",
+            "names": {"pl": "A", "en": "A"},
+            "portions": 2,
+            "time": "",
+            "ingredients": [
+                {"productId": "prod.rice", "qty": 0.5, "unitId": "unit.kg", "optional": False}
+            ],
+            "steps": [],
+            "tags": [],
+        }
+    ]
+    products = [
+        {
+            "name": "prod.rice",
+            "quantity": 100,
+            "unit": "g",
+            "category": "category.grains",
+            "storage": "storage.pantry",
+            "threshold": 1,
+            "main": True,
+            "is_spice": False,
+            "tags": [],
+        }
+    ]
+    rec_path = tmp_path / "recipes.json"
+    prod_path = tmp_path / "products.json"
+    rec_path.write_text(json.dumps(recipes))
+    prod_path.write_text(json.dumps(convert_flat_to_nested(products)))
+    monkeypatch.setattr(routes, "RECIPES_PATH", str(rec_path))
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", str(prod_path))
+    monkeypatch.setattr(routes, "SHOPPING_PATH", str(tmp_path / "shopping.json"))
+    SHOPPING_MATRICES.clear()
+    client = create_app().test_client()
+
+    builds = SHOPPING_MATRICES.builds
+    for servings in (2, 4):
+        payload = {"recipes": [{"id": "recipe.a", "servings": servings}]}
+        resp = client.post("/api/shopping", json=payload)
+        assert resp.get_json()[0]["quantity_to_buy"] == 500.0 * servings / 2 - 100
+    assert SHOPPING_MATRICES.builds == builds + 1
+
+    recipes[0]["portions"] = 1
+    rec_path.write_text(json.dumps(recipes))
+    stat = os.stat(rec_path)
+    os.utime(rec_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    resp = client.post("/api/shopping", json={"recipes": [{"id": "recipe.a", "servings": 1}]})
+    assert resp.get_json()[0]["quantity_to_buy"] == 400.0
+    assert SHOPPING_MATRICES.builds == builds + 2
@@ -0,0 +1,218 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app.utils.product_io import load_products_nested, save_products_nested
+from app.utils.shopping_plan import SHOPPING_PLANS
+from app.utils.storage import SqliteBackend, get_backend, import_json
+from tests.utils import convert_flat_to_nested
+
+PIDS = [f"prod.p{i}" for i in range(8)]
+
+
+def _recipes(rng, count=12):
+    return [
+        {
+            "id": f"recipe.r{r}",
+            "names": {"pl": f"R{r}", "en": f"R{r}"},
+            "portions": rng.randint(1, 4),
+            "time": "",
+            "ingredients": [
+                {
+                    "productId": rng.choice(PIDS),
+                    "qty": rng.choice([0.2, 1, 3, 150]),
+                    "unitId": rng.choice(["unit.g", "unit.kg", "unit.szt"]),
+                    "optional": rng.random() < 0.2,
+                }
+                for _ in range(rng.randint(1, 4))
+            ],
+            "steps": [],
+            "tags": [],
+        }
+        for r in range(count)
+    ]
+
+
+def _product(name, quantity, unit):
+    return {
+        "name": name,
+        "quantity": quantity,
+        "unit": unit,
+        "category": "category.grains",
+        "storage": "storage.pantry",
+        "threshold": 1,
+        "main": True,
+        "is_spice": False,
+        "tags": [],
+    }
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    products = [
+        _product(pid, rng.choice([0, 1, 200]), rng.choice(["g", "szt"])) for pid in PIDS
+    ]
+    (tmp_path / "recipes.json").write_text(json.dumps(_recipes(rng)))
+    (tmp_path / "products.json").write_text(json.dumps(convert_flat_to_nested(products)))
+    monkeypatch.setattr(routes, "RECIPES_PATH", str(tmp_path / "recipes.json"))
+    monkeypatch.setattr(routes, "PRODUCTS_PATH", str(tmp_path / "products.json"))
+    monkeypatch.setattr(routes, "SHOPPING_PATH", str(tmp_path / "shopping_list.json"))
+    SHOPPING_PLANS.clear()
+    return create_app().test_client()
+
+
+def _by_key(items):
+    return {(i["productId"], i["unitId"]): i for i in items}
+
+
+def _assert_consistent(items, selection):
+    expected = _by_key(routes._generate_shopping_list(selection))
+    got = _by_key(items)
+    assert got.keys() == expected.keys()
+    for key, item in expected.items():
+        assert got[key]["quantity_to_buy"] == item["quantity_to_buy"]
+        assert got[key]["optional"] == item["optional"]
+
+
+def test_deltas_match_full_regeneration(client):
+    rng = random.Random(1)
+    client.post("/api/shopping", json={"recipes": [{"id": "recipe.r0", "servings": 2}]})
+    selection = {"recipe.r0": 2}
+    for _ in range(60):
+        rid = f"recipe.r{rng.randrange(12)}"
+        servings = rng.choice([0, 1, 2.5, 4])
+        if rid not in selection:
+            resp = client.post("/api/shopping/recipes", json={"id": rid, "servings": servings})
+            selection[rid] = servings
+        elif rng.random() < 0.4:
+            resp = client.delete(f"/api/shopping/recipes/{rid}")
+            del selection[rid]
+        else:
+            resp = client.patch(f"/api/shopping/recipes/{rid}", json={"servings": servings})
+            selection[rid] = servings
+        assert resp.status_code == 200
+        listed = client.get("/api/shopping/recipes").get_json()
+        assert {s["id"]: s["servings"] for s in listed} == selection
+        _assert_consistent(client.get("/api/shopping").get_json(), listed)
+
+
+def test_deltas_keep_cart_marks(client):
+    client.post("/api/shopping", json={"recipes": [{"id": "recipe.r1", "servings": 8}]})
+    items = client.get("/api/shopping").get_json()
+    marked = items[0]["productId"]
+    client.patch(f"/api/shopping/{marked}", json={"inCart": True})
+
+    for rid in ("recipe.r2", "recipe.r3"):
+        client.post("/api/shopping/recipes", json={"id": rid, "servings": 1})
+    client.patch("/api/shopping/recipes/recipe.r1", json={"servings": 9})
+    client.delete("/api/shopping/recipes/recipe.r3")
+    items = client.get("/api/shopping").get_json()
+    assert next(i for i in items if i["productId"] == marked)["in_cart"] is True
+    _assert_consistent(items, client.get("/api/shopping/recipes").get_json())
+
+
+def test_confirm_matches_full_rebuild(client):
+    selection = [{"id": f"recipe.r{r}", "servings": 3} for r in range(5)]
+    row = client.post("/api/shopping", json={"recipes": selection}).get_json()[1]
+    # confirming collapses products sharing a name, so the stock of a row
+    # that is not bought changes as well
+    unit = {"unit.g": "g", "unit.szt": "szt"}[row["unitId"]]
+    products = load_products_nested(routes.PRODUCTS_PATH)
+    for prod in products:
+        if prod["name"] == row["productId"]:
+            prod.update(unit=unit, quantity=1)
+            duplicate = dict(prod, storage="storage.fridge")
+    save_products_nested(routes.PRODUCTS_PATH, products + [duplicate])
+
+    items = client.post("/api/shopping", json={"recipes": selection}).get_json()
+    for item in items[::2]:
+        if item["productId"] != row["productId"]:
+            client.patch(f"/api/shopping/{item['productId']}", json={"inCart": True})
+    items = client.post("/api/shopping/confirm").get_json()
+    _assert_consistent(items, selection)
+    assert client.get("/api/shopping").get_json() == items
+
+    client.delete("/api/shopping/recipes/recipe.r2")
+    _assert_consistent(client.get("/api/shopping").get_json(), selection[:2] + selection[3:])
+
+
+def test_stock_edits_reach_rows_of_other_recipes(client):
+    client.post("/api/shopping", json={"recipes": [{"id": "recipe.r0", "servings": 4}]})
+    pid = client.get("/api/shopping").get_json()[0]["productId"]
+    products = load_products_nested(routes.PRODUCTS_PATH)
+    for prod in products:
+        if prod["name"] == pid:
+            prod["quantity"] = 0 if prod["quantity"] else 10_000
+    save_products_nested(routes.PRODUCTS_PATH, products)
+
+    items = client.post("/api/shopping/recipes", json={"id": "recipe.r5", "servings": 1}).get_json()
+    _assert_consistent(items, client.get("/api/shopping/recipes").get_json())
+
+
+def test_removed_rows_keep_the_order_of_the_rest(client):
+    selection = [{"id": f"recipe.r{r}", "servings": 4} for r in range(6)]
+    before = client.post("/api/shopping", json={"recipes": selection}).get_json()
+    after = client.delete("/api/shopping/recipes/recipe.r0").get_json()
+    order = {(i["productId"], i["unitId"]): pos for pos, i in enumerate(before)}
+    positions = [order[(i["productId"], i["unitId"])] for i in after]
+    assert positions == sorted(positions)
+
+
+def test_delta_errors(client):
+    client.post("/api/shopping", json={"recipes": [{"id": "recipe.r1", "servings": 1}]})
+    for payload in (
+        {"id": "recipe.r1", "servings": 1},  # already selected
+        {"id": "recipe.x", "servings": 1},  # unknown
+        {"id": "recipe.r2"},
+    ):
+        assert client.post("/api/shopping/recipes", json=payload).status_code == 400
+    assert client.patch("/api/shopping/recipes/recipe.r2", json={"servings": 1}).status_code == 404
+    assert client.patch("/api/shopping/recipes/recipe.r1", json={"servings": -1}).status_code == 400
+    assert client.delete("/api/shopping/recipes/recipe.r2").status_code == 404
+
+
+def test_sqlite_writes_only_changed_rows(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "sqlite")
+    import_json(str(tmp_path))
+    written = []
+    write = SqliteBackend.write
+
+    def spy(self, path, data, **kwargs):
+        changed = write(self, path, data, **kwargs)
+        if path == routes.SHOPPING_PATH:
+            written.append(changed)
+        return changed
+
+    updated = []
+    update_rows = SqliteBackend.update_rows
+
+    def spy_rows(self, path, items, removed):
+        updated.append(len(items) + len(removed))
+        return update_rows(self, path, items, removed)
+
+    monkeypatch.setattr(SqliteBackend, "write", spy)
+    monkeypatch.setattr(SqliteBackend, "update_rows", spy_rows)
+    try:
+        selection = [{"id": f"recipe.r{r}", "servings": 4} for r in range(6)]
+        full = client.post("/api/shopping", json={"recipes": selection}).get_json()
+        assert written == [len(full)] and len(full) > 2
+        items = client.delete("/api/shopping/recipes/recipe.r0").get_json()
+        _assert_consistent(items, selection[1:])
+        # only rows of recipe.r0's products
+        recipes = json.loads((tmp_path / "recipes.json").read_text())
+        touched = {
+            (ing["productId"], routes._to_base(1, ing["unitId"])[1])
+            for ing in recipes[0]["ingredients"]
+        }
+        assert written == [len(full)]
+        assert 0 < updated[-1] <= len(touched) < len(full)
+    finally:
+        get_backend().close()
@@ -0,0 +1,229 @@
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app.routes as routes
+from app import create_app
+from app import search as search_mod
+from app.utils import load_json, save_json
+from app.utils.product_io import load_products_nested, save_products_nested
+from app.utils.storage import DB_NAME, SqliteBackend, export_json, get_backend, import_json
+from scripts import sqlite_storage
+from tests.utils import convert_flat_to_nested
+
+
+def _product(name, **extra):
+    prod = {
+        "name": name,
+        "quantity": 1,
+        "unit": "szt",
+        "category": "uncategorized",
+        "storage": "pantry",
+        "threshold": 1,
+        "main": True,
+        "is_spice": False,
+        "tags": [],
+    }
+    prod.update(extra)
+    return prod
+
+
+@pytest.fixture
+def sqlite_backend(monkeypatch):
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "sqlite")
+    yield get_backend()
+    get_backend().close()
+
+
+def test_backend_switch(monkeypatch):
+    monkeypatch.delenv("APP_STORAGE_BACKEND", raising=False)
+    assert get_backend().name == "json"
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "sqlite")
+    assert get_backend().name == "sqlite"
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "bogus")
+    with pytest.raises(ValueError):
+        get_backend()
+
+
+def test_products_roundtrip_and_wal(tmp_path, sqlite_backend):
+    path = str(tmp_path / "products.json")
+    products = [
+        _product("milk", storage="storage.fridge", category="category.dairy"),
+        _product("rice", storage="storage.pantry", category="category.grains"),
+    ]
+    save_products_nested(path, products)
+    assert not os.path.exists(path)
+
+    flat = load_products_nested(path)
+    assert [p["name"] for p in flat] == ["milk", "rice"]
+    assert flat[0]["storage"] == "storage.fridge"
+
+    conn = sqlite3.connect(str(tmp_path / DB_NAME))
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {r[1] for r in conn.execute("PRAGMA index_list(products)")}
+    assert {"products_by_id", "products_by_storage", "products_by_category"} <= indexes
+    rows = conn.execute("SELECT product_id, storage FROM products ORDER BY seq").fetchall()
+    assert rows == [("milk", "storage.fridge"), ("rice", "storage.pantry")]
+    conn.close()
+
+
+def test_write_touches_only_changed_rows(tmp_path, sqlite_backend):
+    path = str(tmp_path / "products.json")
+    products = [_product(f"p{i}", storage="storage.pantry", category="category.a") for i in range(50)]
+    save_products_nested(path, products)
+
+    products[10]["quantity"] = 7
+    nested = convert_flat_to_nested(products)
+    assert sqlite_backend.write(path, nested) == 1
+    assert sqlite_backend.write(path, nested) == 0
+
+    products.append(_product("extra", storage="storage.pantry", category="category.a"))
+    assert sqlite_backend.write(path, convert_flat_to_nested(products)) == 1
+
+    # rows are matched by key, so edits near the front leave later rows alone
+    products.insert(0, _product("first", storage="storage.pantry", category="category.a"))
+    assert sqlite_backend.write(path, convert_flat_to_nested(products)) == 1
+    del products[3]
+    assert sqlite_backend.write(path, convert_flat_to_nested(products)) == 1
+    products[5], products[6] = products[6], products[5]
+    assert sqlite_backend.write(path, convert_flat_to_nested(products)) == 1
+    assert load_products_nested(path) == products
+
+
+def test_keyed_writes_keep_order_through_random_edits(tmp_path, sqlite_backend):
+    path = str(tmp_path / "shopping_list.json")
+    rng = random.Random(3)
+    items = []
+    for step in range(300):
+        pos = rng.randint(0, len(items))
+        action = rng.random()
+        if action < 0.5 or not items:
+            # duplicate keys are allowed and keep their relative order
+            pid = f"prod.p{rng.randrange(20)}"
+            items.insert(pos, {"productId": pid, "unitId": "unit.g", "step": step})
+        elif action < 0.7:
+            del items[pos % len(items)]
+        elif action < 0.85:
+            items[pos % len(items)]["step"] = step
+        else:
+            items.append(items.pop(pos % len(items)))
+        sqlite_backend.write(path, items)
+        assert sqlite_backend.read(path) == items
+    # repeated inserts into one gap eventually renumber the table
+    for step in range(20):
+        items.insert(1, {"productId": "prod.x", "unitId": "unit.g", "step": step})
+        sqlite_backend.write(path, items)
+        assert sqlite_backend.read(path) == items
+
+
+def test_cache_follows_dataset_version(tmp_path, sqlite_backend):
+    path = str(tmp_path / "history.json")
+    save_json(path, [{"date": "2024-01-01"}])
+    first = load_json(path, [])
+    assert load_json(path, []) is first
+    save_json(path, [{"date": "2024-01-01"}, {"date": "2024-01-02"}])
+    assert len(load_json(path, [])) == 2
+
+    conn = sqlite3.connect(str(tmp_path / DB_NAME))
+    dates = [r[0] for r in conn.execute("SELECT date FROM history ORDER BY seq")]
+    assert dates == ["2024-01-01", "2024-01-02"]
+    conn.close()
+
+
+def test_import_export_roundtrip(tmp_path, sqlite_backend):
+    products = convert_flat_to_nested([_product("rice")])
+    recipes = [{"id": "r1", "names": {"pl": "R", "en": "R"}}]
+    units = [{"id": "unit.g"}]
+    (tmp_path / "products.json").write_text(json.dumps(products))
+    (tmp_path / "recipes.json").write_text(json.dumps(recipes))
+    (tmp_path / "units.json").write_text(json.dumps(units))
+
+    assert sqlite_storage.main(["import", "--data-dir", str(tmp_path)]) == 0
+    assert load_json(str(tmp_path / "units.json"), []) == units
+
+    for name in ("products.json", "recipes.json", "units.json"):
+        (tmp_path / name).unlink()
+    export_json(str(tmp_path))
+    assert json.loads((tmp_path / "products.json").read_text()) == products
+    assert json.loads((tmp_path / "recipes.json").read_text()) == recipes
+    assert json.loads((tmp_path / "units.json").read_text()) == units
+
+
+def test_shopping_flow_on_sqlite(tmp_path, monkeypatch, sqlite_backend):
+    products = [_product("prod.rice", quantity=100, unit="g")]
+    recipes = [
+        {
+            "id": "recipe.a",
+            "names": {"pl": "A", "en": "A"},
+            "portions": 1,
+            "time": "",
+            "ingredients": [
+                {"productId": "prod.rice", "qty": 300, "unitId": "unit.g", "optional": False}
+            ],
+            "steps": [],
+            "tags": [],
+        }
+    ]
+    (tmp_path / "products.json").write_text(json.dumps(convert_flat_to_nested(products)))
+    (tmp_path / "recipes.json").write_text(json.dumps(recipes))
+    shutil.copy(os.path.join(routes.DATA_DIR, "units.json"), tmp_path / "units.json")
+    import_json(str(tmp_path))
+    for name in ("products.json", "recipes.json", "units.json"):
+        (tmp_path / name).unlink()
+
+    # every dataset the routes touch lives in tmp_path's database
+    for attr, name in (
+        ("PRODUCTS_PATH", "products.json"),
+        ("RECIPES_PATH", "recipes.json"),
+        ("UNITS_PATH", "units.json"),
+        ("HISTORY_PATH", "history.json"),
+        ("FAVORITES_PATH", "favorites.json"),
+        ("SHOPPING_PATH", "shopping_list.json"),
+    ):
+        monkeypatch.setattr(routes, attr, str(tmp_path / name))
+    monkeypatch.setattr(search_mod, "_INDEX", search_mod.SearchIndex(routes.PRODUCTS_PATH))
+    had_real_db = os.path.exists(os.path.join(routes.DATA_DIR, DB_NAME))
+    client = create_app().test_client()
+
+    resp = client.post("/api/shopping", json={"recipes": [{"id": "recipe.a", "servings": 1}]})
+    assert resp.get_json()[0]["quantity_to_buy"] == 200
+    client.patch("/api/shopping/prod.rice", json={"inCart": True})
+    assert client.post("/api/shopping/confirm").get_json() == []
+
+    rice = load_products_nested(routes.PRODUCTS_PATH)[0]
+    assert rice["quantity"] == 300
+    assert not (tmp_path / "shopping_list.json").exists()
+    assert os.path.exists(os.path.join(routes.DATA_DIR, DB_NAME)) == had_real_db
+
+
+def test_append_versions_and_document_conversion(tmp_path, sqlite_backend):
+    path = str(tmp_path / "history.json")
+    # a history kept as a single document row is converted on append
+    sqlite_backend.write(path, {"not": "a list"})
+    sqlite_backend.write(path, [{"date": "2024-01-01"}])
+    conn = sqlite_backend.connect(path)
+    conn.execute("DELETE FROM history")
+    conn.execute(
+        "INSERT INTO documents (name, doc) VALUES ('history', ?)",
+        (json.dumps([{"date": "2024-01-01"}]),),
+    )
+    conn.execute("UPDATE datasets SET kind = 'document' WHERE name = 'history'")
+    sqlite_backend.append(path, {"date": "2024-01-02"})
+    assert sqlite_backend.read(path) == [{"date": "2024-01-01"}, {"date": "2024-01-02"}]
+
+    # two connections appending in turn never reuse a version
+    other = SqliteBackend()
+    versions = {sqlite_backend.signature(path)}
+    for backend in (other, sqlite_backend, other):
+        backend.append(path, {"date": "2024-01-03"})
+        versions.add(sqlite_backend.signature(path))
+    other.close()
+    assert len(versions) == 4
+    assert len(sqlite_backend.read(path)) == 5